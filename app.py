@@ -4,14 +4,17 @@ This module provides the web interface for monitoring and controlling the tradin
 including real-time market data visualization and trading controls.
 """
 
-from flask import Flask, render_template, jsonify, request, send_from_directory
+from flask import Flask, render_template, jsonify, request, send_from_directory, Response, stream_with_context
 from bot import TradingBot
 from data_manager import DataManager
 from visualizer import MarketVisualizer
 from wallet_manager import WalletManager
-from config import SOLANA_NETWORKS, DEFAULT_NETWORK
+from scheduler import EventScheduler, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+from live_updates import LiveUpdateBroadcaster
+from config import (SOLANA_NETWORKS, DEFAULT_NETWORK, PRICE_POLL_INTERVAL, CHART_UPDATE_INTERVAL,
+                    MODEL_REFRESH_INTERVAL, LIVE_UPDATE_INTERVAL, BALANCE_REFRESH_INTERVAL)
+from rpc_gateway import get_gateway, gateway_metrics
 from solana.rpc.api import Client
-from solana.rpc.providers.http import HTTPProvider
 from solders.keypair import Keypair
 from solders.pubkey import Pubkey
 import logging
@@ -19,8 +22,7 @@ import threading
 import time
 import json
 import os
-import httpx
-from urllib.parse import urlparse
+from datetime import datetime
 
 # Set up logging
 logging.basicConfig(
@@ -34,26 +36,17 @@ logging.basicConfig(
 
 app = Flask(__name__, static_folder='static')
 
-# Patch the HTTPProvider class to not use proxy
-original_init = HTTPProvider.__init__
-def patched_init(self, endpoint, timeout=30, extra_headers=None, proxy=None):
-    self.endpoint = endpoint
-    self.endpoint_uri = urlparse(endpoint)
-    self.timeout = timeout
-    self.extra_headers = extra_headers or {}
-    self.session = httpx.Client(timeout=timeout)
-    self.health_uri = f"{endpoint}/health"
-
-HTTPProvider.__init__ = patched_init
-
-# Initialize Solana client
-solana_client = Client(SOLANA_NETWORKS[DEFAULT_NETWORK]['rpc_url'])
+# Initialize Solana client; it shares the network's pooled RPC gateway with the
+# bot and the wallet manager
+solana_client = get_gateway(DEFAULT_NETWORK).client()
 
 # Global variables
 bot = None
 bot_thread = None
+scheduler = None
 wallet = None
 is_running = False
+live_updates = LiveUpdateBroadcaster()  # Server-sent state deltas for the dashboard pages
 
 def initialize_components():
     """
@@ -115,9 +108,12 @@ def connect_wallet():
         # Create wallet object
         wallet = Keypair.from_public_key(Pubkey(wallet_data['public_key']))
         
-        # Initialize bot with wallet
+        # Initialize bot with wallet and fetch its balance in the background
         if bot:
             bot.wallet = wallet
+            if is_running and scheduler:
+                scheduler.post('refresh_balance', bot.refresh_balance, PRIORITY_LOW)
+        publish_status()
             
         return jsonify({
             'status': 'success',
@@ -133,7 +129,7 @@ def start_bot():
     """
     Start the trading bot.
     """
-    global bot_thread, is_running
+    global bot_thread, scheduler, is_running
     try:
         if not wallet:
             return jsonify({'error': 'Please connect wallet first'}), 400
@@ -145,11 +141,11 @@ def start_bot():
         if not bot and not initialize_components():
             return jsonify({'error': 'Failed to initialize bot'}), 500
             
-        # Start bot in a separate thread
+        # Start the bot's event scheduler in a separate thread
         is_running = True
-        bot_thread = threading.Thread(target=run_bot)
-        bot_thread.daemon = True
-        bot_thread.start()
+        scheduler = create_bot_scheduler()
+        bot_thread = scheduler.start()
+        publish_status()
         
         return jsonify({
             'status': 'success',
@@ -170,10 +166,11 @@ def stop_bot():
             return jsonify({'error': 'Bot is not running'}), 400
             
         is_running = False
-    if bot_thread:
-            bot_thread.join(timeout=5)
+        if scheduler:
+            scheduler.stop(timeout=5)
+        publish_status()
 
-    return jsonify({
+        return jsonify({
             'status': 'success',
             'message': 'Bot stopped successfully'
         })
@@ -187,47 +184,123 @@ def get_bot_status():
     Get the current status of the trading bot.
     """
     try:
-        status = {
-            'is_running': is_running,
-            'wallet_connected': wallet is not None,
-            'current_position': bot.position if bot else None,
-            'entry_price': bot.entry_price if bot else None
-        }
-        return jsonify(status)
+        return jsonify(bot_status_snapshot())
     except Exception as e:
         logging.error(f"Error getting bot status: {e}")
         return jsonify({'error': str(e)}), 500
 
-def run_bot():
+def bot_status_snapshot():
     """
-    Main bot loop that runs in a separate thread.
+    Build the bot status shared by /api/bot_status and the live updates from
+    the bot's published state snapshot.
+    
+    Returns:
+        dict: Running state, wallet state, position and last price
     """
-    global is_running
-    while is_running:
-        try:
-            # Update market data
-            bot.update_charts()
-            
-            # Check stop loss and take profit
-            bot.check_stop_loss_take_profit()
-            
-            # Get trading signals
-            signal = bot.get_ml_signal(bot.data_manager.get_market_data(
-                bot.symbol, bot.intervals[0], bot.lookback
-            ))
-            
-            # Execute trades based on signals
-            if signal == 'buy' and not bot.position:
-                quantity = bot.calculate_position_size()
-                bot.place_order('BUY', quantity)
-            elif signal == 'sell' and bot.position == 'BUY':
-                bot.close_position()
-                
-            # Sleep for a short interval
-            time.sleep(1)
-        except Exception as e:
-            logging.error(f"Error in bot thread: {e}")
-            time.sleep(5)  # Sleep longer on error
+    state = bot.state if bot else None
+    return {
+        'is_running': is_running,
+        'wallet_connected': wallet is not None,
+        'current_position': state.position if state else None,
+        'entry_price': state.entry_price if state else None,
+        'last_price': state.last_price if state else None
+    }
+
+def publish_status():
+    """Push the bot status to live update subscribers if it changed."""
+    live_updates.publish('status', bot_status_snapshot())
+
+def publish_live_updates():
+    """
+    Low-priority bot job: publish the status, signals, order book and open
+    orders once for all connected pages. Only the keys that changed are sent.
+    """
+    publish_status()
+    live_updates.publish('signals', bot.state.signals)
+    try:
+        live_updates.publish('order_book', order_book_snapshot())
+        live_updates.publish('open_orders', {'orders': open_orders_snapshot()})
+    except Exception as e:
+        logging.error(f"Error publishing live updates: {e}")
+
+def published_snapshot(topic, build):
+    """
+    Get the latest state of a live update topic. While the bot runs, its live
+    updates job keeps the topic current and requests make no RPC calls; when it
+    is not running (or has not published yet) the state is built and published
+    on the spot.
+    
+    Args:
+        topic (str): Live update topic
+        build (callable): Builds the current state of the topic
+        
+    Returns:
+        dict: State of the topic
+    """
+    snapshot = live_updates.snapshot(topic) if is_running else None
+    if snapshot is None:
+        snapshot = build()
+        live_updates.publish(topic, snapshot)
+    return snapshot
+
+@app.route('/api/stream')
+def stream_updates():
+    """
+    Server-Sent Events stream of status, signal, order book and open order
+    updates (see live_updates.py). The current state is sent on connect and
+    only changes afterwards.
+    """
+    publish_status()
+    subscriber = live_updates.subscribe()
+    return Response(
+        stream_with_context(live_updates.stream(subscriber)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def run_bot(intervals=None):
+    """
+    Candle-close job of the bot: recompute the ML signal of the primary
+    timeframe and trade on it.
+    
+    Args:
+        intervals (list, optional): Time intervals whose candles closed
+    """
+    df = bot.data_manager.get_market_data(bot.symbol, bot.intervals[0], bot.lookback)
+    df_features = bot.get_features(bot.intervals[0], df)
+    signal = None
+    if not df_features.empty:
+        signal = bot.get_ml_signal(df_features, df_features.iloc[-1])
+    
+    # Execute trades based on signals
+    if signal == 'buy' and not bot.position:
+        quantity = bot.calculate_position_size()
+        bot.place_order('BUY', quantity)
+    elif signal == 'sell' and bot.position == 'BUY':
+        bot.close_position()
+    bot.publish_state()
+
+def create_bot_scheduler():
+    """
+    Create the event scheduler that drives the bot thread: signals are
+    recomputed when a primary-timeframe candle closes, stop loss and take profit
+    are checked on every price tick, and charts, model hot-swaps, balance
+    refreshes and live updates for the web pages run on a low-priority cadence.
+    The trading jobs publish the bot state snapshot read by the API endpoints.
+    
+    Returns:
+        EventScheduler: Scheduler with the bot's jobs registered (not started)
+    """
+    bot_scheduler = EventScheduler()
+    bot_scheduler.post('initial_signal', run_bot, PRIORITY_NORMAL)
+    bot_scheduler.on_candle_close(bot.intervals[0], run_bot, PRIORITY_NORMAL)
+    bot_scheduler.every('price_tick', PRICE_POLL_INTERVAL, bot.on_price_tick, PRIORITY_HIGH)
+    bot_scheduler.every('update_charts', CHART_UPDATE_INTERVAL, bot.update_charts, PRIORITY_LOW)
+    bot_scheduler.every('refresh_model', MODEL_REFRESH_INTERVAL, bot.refresh_model,
+                        PRIORITY_LOW, run_now=False)
+    bot_scheduler.every('refresh_balance', BALANCE_REFRESH_INTERVAL, bot.refresh_balance, PRIORITY_LOW)
+    bot_scheduler.every('live_updates', LIVE_UPDATE_INTERVAL, publish_live_updates, PRIORITY_LOW)
+    return bot_scheduler
 
 @app.route('/api/market_data')
 def market_data():
@@ -280,13 +353,13 @@ def market_data():
 
 @app.route('/api/account_balance')
 def account_balance():
-    """Get current account balance"""
+    """Get the account balance from the last balance refresh of the bot"""
     if not bot:
         return jsonify({'status': 'error', 'message': 'Bot not initialized'}), 500
 
     try:
-        balance = bot.get_account_balance()
-        return jsonify({'status': 'success', 'balance': balance})
+        state = bot.state
+        return jsonify({'status': 'success', 'balance': state.balance, 'updated': state.balance_updated})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
@@ -302,9 +375,15 @@ def update_charts():
             bot.symbol, bot.intervals, bot.lookback
         )
         
+        # Reuse the indicator frames shared with the trading loop
+        feature_dict = {
+            interval: bot.get_features(interval, df)
+            for interval, df in data_dict.items()
+        }
+        
         # Create multi-timeframe chart
         chart_path = bot.visualizer.create_multi_timeframe_chart(
-            data_dict, bot.symbol
+            feature_dict, bot.symbol
         )
         
         # Create data quality dashboard
@@ -334,6 +413,7 @@ def notifications():
         return jsonify({'status': 'error', 'message': 'Bot not initialized'}), 500
 
     try:
+        state = bot.state
         notifications = []
         
         # Add system status notification
@@ -363,40 +443,30 @@ def notifications():
             })
         
         # Add position notification if any
-        if bot and hasattr(bot, 'position') and bot.position:
+        if state.position:
             notifications.append({
                 'type': 'info',
-                'message': f'Active {bot.position} position at {bot.entry_price}',
+                'message': f'Active {state.position} position at {state.entry_price}',
                 'time': datetime.now().isoformat()
             })
         
         # Add error notifications if any
-        if bot and hasattr(bot, 'last_error') and bot.last_error:
+        if state.last_error:
             notifications.append({
                 'type': 'danger',
-                'message': f'Error: {bot.last_error}',
+                'message': f'Error: {state.last_error}',
                 'time': datetime.now().isoformat()
             })
         
         # Add market condition notifications
-        try:
-            if solana_client:  # Check if client exists before making API call
-                ticker = solana_client.get_ticker(symbol='BTCUSDT')
-                price_change = float(ticker['priceChangePercent'])
-                
-                if abs(price_change) > 5:
-                    notifications.append({
-                        'type': 'warning',
-                        'message': f'High volatility detected: {price_change}% price change in 24h',
-                        'time': datetime.now().isoformat()
-                    })
-        except Exception as e:
-            logging.error(f"Error getting market data: {e}")
-            notifications.append({
-                'type': 'warning',
-                'message': 'Unable to fetch market data',
-                'time': datetime.now().isoformat()
-            })
+        if state.position and state.entry_price and state.last_price:
+            price_change = (state.last_price - state.entry_price) / state.entry_price * 100
+            if abs(price_change) > 5:
+                notifications.append({
+                    'type': 'warning',
+                    'message': f'High volatility detected: {price_change:.2f}% price change since entry',
+                    'time': datetime.now().isoformat()
+                })
         
         return jsonify({
             'status': 'success',
@@ -609,6 +679,14 @@ def get_transaction_history():
         logging.error(f"Error getting transaction history: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/api/rpc_metrics', methods=['GET'])
+def get_rpc_metrics():
+    """Get per-method RPC call counts, retries and latencies for each endpoint"""
+    return jsonify({
+        'status': 'success',
+        'metrics': gateway_metrics()
+    })
+
 @app.route('/api/available_networks', methods=['GET'])
 def get_available_networks():
     """Get list of available Solana networks"""
@@ -660,18 +738,19 @@ def get_settings():
         return jsonify({'status': 'error', 'message': 'Bot not initialized'}), 500
 
     try:
+        state = bot.state
         return jsonify({
             'status': 'success',
-            'trading_pair': bot.symbol if bot else 'BTCUSDT',
-            'position_size': bot.position_size if bot else 10,
-            'stop_loss': bot.stop_loss if bot else 2,
-            'take_profit': bot.take_profit if bot else 4,
+            'trading_pair': state.symbol,
+            'position_size': state.max_position_size * 100,  # Percentages, as entered on the settings page
+            'stop_loss': state.stop_loss_pct * 100,
+            'take_profit': state.take_profit_pct * 100,
             'email_notifications': True,  # Default values
             'trade_notifications': True,
             'error_notifications': True,
-            'max_daily_loss': 5,
-            'max_positions': 3,
-            'leverage': 1
+            'max_daily_loss': state.max_daily_loss,
+            'max_positions': state.max_positions,
+            'leverage': state.leverage
         })
     except Exception as e:
         logging.error(f"Error getting settings: {e}")
@@ -686,10 +765,12 @@ def update_trading_settings():
     try:
         data = request.get_json()
         if bot:
-            bot.symbol = data.get('trading_pair')
-            bot.position_size = float(data.get('position_size'))
-            bot.stop_loss = float(data.get('stop_loss'))
-            bot.take_profit = float(data.get('take_profit'))
+            bot.update_state(
+                symbol=data.get('trading_pair'),
+                max_position_size=float(data.get('position_size')) / 100,
+                stop_loss_pct=float(data.get('stop_loss')) / 100,
+                take_profit_pct=float(data.get('take_profit')) / 100
+            )
         return jsonify({'status': 'success'})
     except Exception as e:
         logging.error(f"Error updating trading settings: {e}")
@@ -719,9 +800,11 @@ def update_risk_settings():
     try:
         data = request.get_json()
         if bot:
-            bot.max_daily_loss = float(data.get('max_daily_loss'))
-            bot.max_positions = int(data.get('max_positions'))
-            bot.leverage = int(data.get('leverage'))
+            bot.update_state(
+                max_daily_loss=float(data.get('max_daily_loss')),
+                max_positions=int(data.get('max_positions')),
+                leverage=int(data.get('leverage'))
+            )
         return jsonify({'status': 'success'})
     except Exception as e:
         logging.error(f"Error updating risk settings: {e}")
@@ -750,105 +833,104 @@ def place_order():
 
 @app.route('/api/order_book')
 def get_order_book():
-    """Get current order book"""
+    """Get the current order book (see published_snapshot)"""
     if not bot:
         return jsonify({'status': 'error', 'message': 'Bot not initialized'}), 500
 
     try:
-        # Initialize Solana client if not already initialized
-        if not hasattr(solana_client, 'endpoint'):
-            solana_client.endpoint = SOLANA_NETWORKS[DEFAULT_NETWORK]['rpc_url']
-        
-        # Get current market price from Solana
-        try:
-            price_info = solana_client.get_token_supply("So11111111111111111111111111111111111111112")
-            current_price = float(price_info['result']['value']['uiAmount'] or 0)
-        except Exception as e:
-            logging.error(f"Error getting token supply: {e}")
-            # Fallback to a default price if we can't get the real one
-            current_price = 100.0
-        
-        # Simulate order book data since Solana doesn't have a direct order book
-        # In a real implementation, you would get this from a DEX or order book service
-        spread = current_price * 0.001  # 0.1% spread
-        
-        asks = []
-        bids = []
-        
-        # Generate simulated asks (sell orders)
-        for i in range(10):
-            price = current_price + (spread * (i + 1))
-            amount = 0.1 + (i * 0.1)  # Increasing amounts
-            asks.append({
-                'price': round(price, 2),
-                'amount': round(amount, 4)
-            })
-        
-        # Generate simulated bids (buy orders)
-        for i in range(10):
-            price = current_price - (spread * (i + 1))
-            amount = 0.1 + (i * 0.1)  # Increasing amounts
-            bids.append({
-                'price': round(price, 2),
-                'amount': round(amount, 4)
-            })
-        
-        return jsonify({
-            'status': 'success',
-            'asks': asks,
-            'bids': bids,
-            'current_price': round(current_price, 2)
-        })
+        return jsonify({'status': 'success', **published_snapshot('order_book', order_book_snapshot)})
     except Exception as e:
         logging.error(f"Error getting order book: {e}")
-        # Return simulated data even if there's an error
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+def order_book_snapshot():
+    """
+    Build the order book published by the live updates job and served by
+    /api/order_book.
+    
+    Returns:
+        dict: 'asks', 'bids' (lists of price/amount) and 'current_price'
+    """
+    # Get current market price from Solana
+    try:
+        price_info = solana_client.get_token_supply("So11111111111111111111111111111111111111112")
+        current_price = float(price_info['result']['value']['uiAmount'] or 0)
+    except Exception as e:
+        logging.error(f"Error getting token supply: {e}")
+        # Fallback to a default price if we can't get the real one
         current_price = 100.0
-        spread = current_price * 0.001
-        
-        asks = [{'price': round(current_price + (spread * (i + 1)), 2), 
-                'amount': round(0.1 + (i * 0.1), 4)} for i in range(10)]
-        bids = [{'price': round(current_price - (spread * (i + 1)), 2), 
-                'amount': round(0.1 + (i * 0.1), 4)} for i in range(10)]
-        
-        return jsonify({
-            'status': 'success',
-            'asks': asks,
-            'bids': bids,
-            'current_price': round(current_price, 2)
+    
+    # Simulate order book data since Solana doesn't have a direct order book
+    # In a real implementation, you would get this from a DEX or order book service
+    spread = current_price * 0.001  # 0.1% spread
+    
+    asks = []
+    bids = []
+    
+    # Generate simulated asks (sell orders)
+    for i in range(10):
+        price = current_price + (spread * (i + 1))
+        amount = 0.1 + (i * 0.1)  # Increasing amounts
+        asks.append({
+            'price': round(price, 2),
+            'amount': round(amount, 4)
         })
+    
+    # Generate simulated bids (buy orders)
+    for i in range(10):
+        price = current_price - (spread * (i + 1))
+        amount = 0.1 + (i * 0.1)  # Increasing amounts
+        bids.append({
+            'price': round(price, 2),
+            'amount': round(amount, 4)
+        })
+    
+    return {
+        'asks': asks,
+        'bids': bids,
+        'current_price': round(current_price, 2)
+    }
 
 @app.route('/api/open_orders')
 def get_open_orders():
-    """Get open orders"""
+    """Get the open orders (see published_snapshot)"""
     if not bot:
         return jsonify({'status': 'error', 'message': 'Bot not initialized'}), 500
 
     try:
-        if not wallet:
-            return jsonify({
-                'status': 'success',
-                'orders': []
-            })
-            
-        # Get token accounts for the wallet
-        token_accounts = solana_client.get_token_accounts_by_owner(
-            wallet.public_key,
-            {'programId': "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"}
-        )
-        
-        # Format the response
-        formatted_orders = []
-        
-        # In a real implementation, you would get actual open orders from a DEX
-        # For now, we'll return an empty list since Solana doesn't have a direct open orders API
+        open_orders = published_snapshot('open_orders', lambda: {'orders': open_orders_snapshot()})
         return jsonify({
             'status': 'success',
-            'orders': formatted_orders
+            'orders': open_orders['orders']
         })
     except Exception as e:
         logging.error(f"Error getting open orders: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+def open_orders_snapshot():
+    """
+    Build the open orders published by the live updates job and served by
+    /api/open_orders.
+    
+    Returns:
+        list: Open orders of the connected wallet
+    """
+    if not wallet:
+        return []
+        
+    # Get token accounts for the wallet
+    token_accounts = solana_client.get_token_accounts_by_owner(
+        wallet.public_key,
+        {'programId': "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"}
+    )
+    
+    # Format the response
+    formatted_orders = []
+    
+    # In a real implementation, you would get actual open orders from a DEX
+    # For now, we'll return an empty list since Solana doesn't have a direct open orders API
+    return formatted_orders
+
 # Analytics endpoints
 @app.route('/api/performance_metrics')
 def get_performance_metrics():
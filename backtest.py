@@ -0,0 +1,349 @@
+"""
+This module implements a vectorized backtesting engine for the strategy in strategy.py.
+
+Instead of calling `generate_signal` once per bar on a growing slice of the data
+(O(n^2)), it computes the six sub-signals (SMA crossover, RSI, MACD crossover,
+Bollinger Bands, Stochastic and volume) as whole-column NumPy arrays, combines
+them with the strategy weights in a single pass, and simulates positions with the
+stop-loss and take-profit levels from config.py.
+
+Usage:
+    python backtest.py --symbol BTCUSDT --interval 1m
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import kernels
+from config import STOP_LOSS_PCT, TAKE_PROFIT_PCT, INTERVAL_SECONDS
+from strategy import SIGNAL_WEIGHTS, BUY_THRESHOLD, SELL_THRESHOLD
+
+DATA_DIR = 'data_cache'  # Directory holding the {symbol}_{interval}.csv candle files
+SUB_SIGNAL_NAMES = ['sma', 'rsi', 'macd', 'bb', 'stoch', 'volume']
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+
+def load_cached_candles(symbol='BTCUSDT', interval='1m', data_dir=DATA_DIR):
+    """
+    Load OHLCV candles from the CSV data cache.
+
+    Args:
+        symbol (str): Trading pair symbol
+        interval (str): Candle interval
+        data_dir (str): Directory holding the cached CSV files
+
+    Returns:
+        pd.DataFrame: DataFrame with timestamp, open, high, low, close and volume columns
+    """
+    path = os.path.join(data_dir, f'{symbol}_{interval}.csv')
+    df = pd.read_csv(
+        path,
+        usecols=['timestamp', 'open', 'high', 'low', 'close', 'volume'],
+        parse_dates=['timestamp']
+    )
+    return df.sort_values('timestamp').reset_index(drop=True)
+
+
+def compute_indicator_arrays(df):
+    """
+    Compute the indicators used by generate_signal as float64 NumPy arrays.
+
+    Args:
+        df (pd.DataFrame or CompactCandles): OHLCV data ordered by time
+
+    Returns:
+        dict: Indicator name -> np.ndarray, all of length len(df)
+    """
+    close = kernels.as_array(df['close'])
+    high = kernels.as_array(df['high'])
+    low = kernels.as_array(df['low'])
+    volume = kernels.as_array(df['volume'])
+
+    macd, macd_signal, _ = kernels.macd(close)
+    bollinger = kernels.bollinger_bands(close)
+    stoch_k, stoch_d = kernels.stochastic(high, low, close)
+
+    return {
+        'close': close,
+        'volume': volume,
+        'sma_fast': kernels.sma(close, 5),
+        'sma_slow': kernels.sma(close, 20),
+        'rsi': kernels.rsi(close, 14),
+        'macd': macd,
+        'macd_signal': macd_signal,
+        'bb_upper': bollinger['hband'],
+        'bb_lower': bollinger['lband'],
+        'stoch_k': stoch_k,
+        'stoch_d': stoch_d,
+        'volume_sma': kernels.sma(volume, 20),
+    }
+
+
+def _previous(values):
+    """Shift an array one bar forward, filling the first bar with NaN."""
+    shifted = np.empty_like(values)
+    shifted[0] = np.nan
+    shifted[1:] = values[:-1]
+    return shifted
+
+
+def _crossover_signal(fast, slow):
+    """1 where `fast` crosses above `slow`, -1 where it crosses below, 0 otherwise."""
+    fast_prev = _previous(fast)
+    slow_prev = _previous(slow)
+    up = (fast > slow) & (fast_prev <= slow_prev)
+    down = (fast < slow) & (fast_prev >= slow_prev)
+    return up.astype(np.int8) - down.astype(np.int8)
+
+
+def compute_sub_signals(indicators):
+    """
+    Compute the six sub-signals of generate_signal for every bar at once.
+
+    The rules and NaN handling are identical to generate_signal evaluated on the
+    data up to each bar (comparisons involving NaN are false).
+
+    Args:
+        indicators (dict): Output of compute_indicator_arrays
+
+    Returns:
+        np.ndarray: int8 array of shape (6, n) in SUB_SIGNAL_NAMES order
+    """
+    close = indicators['close']
+    rsi = indicators['rsi']
+    stoch_k = indicators['stoch_k']
+    stoch_d = indicators['stoch_d']
+
+    sma_signal = _crossover_signal(indicators['sma_fast'], indicators['sma_slow'])
+    rsi_signal = (rsi < 30).astype(np.int8) - (rsi > 70).astype(np.int8)
+    macd_signal = _crossover_signal(indicators['macd'], indicators['macd_signal'])
+    bb_signal = (close < indicators['bb_lower']).astype(np.int8) - \
+        (close > indicators['bb_upper']).astype(np.int8)
+    stoch_signal = ((stoch_k < 20) & (stoch_d < 20)).astype(np.int8) - \
+        ((stoch_k > 80) & (stoch_d > 80)).astype(np.int8)
+    volume_signal = np.where(indicators['volume'] > indicators['volume_sma'], 1, -1).astype(np.int8)
+
+    return np.vstack([sma_signal, rsi_signal, macd_signal, bb_signal, stoch_signal, volume_signal])
+
+
+def combine_signals(sub_signals, weights=SIGNAL_WEIGHTS,
+                    buy_threshold=BUY_THRESHOLD, sell_threshold=SELL_THRESHOLD):
+    """
+    Combine sub-signals with a weighted average, as generate_signal does.
+
+    Args:
+        sub_signals (np.ndarray): Array of shape (6, n) from compute_sub_signals
+        weights (list): Weight of each sub-signal
+        buy_threshold (float): Weighted signal above which to buy
+        sell_threshold (float): Weighted signal below which to sell
+
+    Returns:
+        np.ndarray: int8 array of length n with 1 (buy), -1 (sell) or 0 (hold)
+    """
+    weights = np.asarray(weights, dtype=float)
+    weighted = (sub_signals * weights[:, None]).sum(axis=0) / weights.sum()
+    return (weighted > buy_threshold).astype(np.int8) - (weighted < sell_threshold).astype(np.int8)
+
+
+def _next_signal_index(signals):
+    """For each bar, the index of the first bar at or after it with a non-zero signal (n if none)."""
+    n = len(signals)
+    index = np.where(signals != 0, np.arange(n), n)
+    return np.minimum.accumulate(index[::-1])[::-1]
+
+
+def _find_exit(close, signals, start, side, entry_price, stop_loss_pct, take_profit_pct):
+    """
+    Find the first bar at or after `start` where a position must be closed, either
+    because the stop loss / take profit is hit or because the opposite signal fires.
+    The search scans geometrically growing chunks so long trades stay cheap.
+    """
+    n = len(close)
+    chunk = 64
+    lo = start
+    while lo < n:
+        hi = min(n, lo + chunk)
+        change = side * (close[lo:hi] / entry_price - 1.0)
+        hit = (change <= -stop_loss_pct) | (change >= take_profit_pct) | (signals[lo:hi] == -side)
+        if hit.any():
+            return lo + int(np.argmax(hit))
+        lo = hi
+        chunk *= 2
+    return n - 1
+
+
+def simulate_positions(close, signals, stop_loss_pct=STOP_LOSS_PCT,
+                       take_profit_pct=TAKE_PROFIT_PCT, fee_pct=0.0):
+    """
+    Simulate the bot's position handling on a signal array.
+
+    Follows TradingBot.trade: positions are entered at the close of a bar with a
+    buy/sell signal when not already on that side, closed when the stop loss or
+    take profit level is reached on a bar close, and reversed when the opposite
+    signal fires. A signal on the bar where a position was closed can open a new
+    one immediately, as the bot checks SL/TP before acting on signals.
+
+    The loop runs once per trade, not per bar; the bars inside a trade are
+    processed with vectorized NumPy operations.
+
+    Args:
+        close (np.ndarray): Close prices
+        signals (np.ndarray): 1 (buy), -1 (sell) or 0 (hold) per bar
+        stop_loss_pct (float): Stop loss as a fraction of the entry price
+        take_profit_pct (float): Take profit as a fraction of the entry price
+        fee_pct (float): Fee charged on entry and on exit, as a fraction of notional
+
+    Returns:
+        dict: Trade arrays ('entry_index', 'exit_index', 'side', 'return') and the
+        mark-to-market 'equity' curve per bar (starting at 1.0)
+    """
+    close = np.asarray(close, dtype=float)
+    signals = np.asarray(signals, dtype=np.int8)
+    n = len(close)
+    next_signal = _next_signal_index(signals)
+
+    entries, exits, sides = [], [], []
+    i = next_signal[0] if n else 0
+    while i < n - 1:
+        side = int(signals[i])
+        exit_index = _find_exit(close, signals, i + 1, side, close[i],
+                                stop_loss_pct, take_profit_pct)
+        entries.append(i)
+        exits.append(exit_index)
+        sides.append(side)
+        if exit_index >= n - 1:
+            break
+        i = next_signal[exit_index]
+
+    entry_index = np.asarray(entries, dtype=np.int64)
+    exit_index = np.asarray(exits, dtype=np.int64)
+    side = np.asarray(sides, dtype=np.int8)
+    entry_price = close[entry_index]
+    trade_return = side * (close[exit_index] / entry_price - 1.0) - 2 * fee_pct
+
+    # Mark-to-market equity: each trade compounds on the equity realised before it
+    equity = np.full(n, np.nan)
+    if n:
+        equity[0] = 1.0
+    if len(entry_index):
+        equity_before = np.concatenate([[1.0], np.cumprod(1.0 + trade_return)[:-1]])
+
+        # Trade id (1-based) for every bar held, 0 when flat
+        markers = np.zeros(n + 1, dtype=np.int64)
+        trade_ids = np.arange(1, len(entry_index) + 1)
+        np.add.at(markers, entry_index + 1, trade_ids)
+        np.add.at(markers, exit_index + 1, -trade_ids)
+        held = np.cumsum(markers[:-1])
+        bars = np.flatnonzero(held)
+        k = held[bars] - 1
+        equity[bars] = equity_before[k] * (1.0 + side[k] * (close[bars] / entry_price[k] - 1.0))
+        equity[exit_index] = equity_before * (1.0 + trade_return)
+
+        # Flat bars carry the last realised equity forward
+        filled = np.where(np.isnan(equity), 0, np.arange(n))
+        equity = equity[np.maximum.accumulate(filled)]
+
+    return {
+        'entry_index': entry_index,
+        'exit_index': exit_index,
+        'side': side,
+        'return': trade_return,
+        'equity': equity,
+    }
+
+
+def compute_metrics(result, interval='1m'):
+    """
+    Compute performance metrics from a simulate_positions result.
+
+    Args:
+        result (dict): Output of simulate_positions
+        interval (str): Candle interval, used to annualise the Sharpe ratio
+
+    Returns:
+        dict: total_return, trade count, win_rate, avg_trade, max_drawdown and sharpe_ratio
+    """
+    equity = result['equity']
+    trade_return = result['return']
+
+    if len(equity) > 1:
+        bar_returns = np.diff(equity) / equity[:-1]
+        running_max = np.maximum.accumulate(equity)
+        max_drawdown = float(np.min(equity / running_max - 1.0))
+        std = bar_returns.std()
+        bars_per_year = SECONDS_PER_YEAR / INTERVAL_SECONDS[interval]
+        sharpe = float(bar_returns.mean() / std * np.sqrt(bars_per_year)) if std > 0 else 0.0
+        total_return = float(equity[-1] - 1.0)
+    else:
+        max_drawdown = sharpe = total_return = 0.0
+
+    return {
+        'total_return': total_return,
+        'trades': int(len(trade_return)),
+        'win_rate': float(np.mean(trade_return > 0)) if len(trade_return) else 0.0,
+        'avg_trade': float(np.mean(trade_return)) if len(trade_return) else 0.0,
+        'max_drawdown': max_drawdown,
+        'sharpe_ratio': sharpe,
+    }
+
+
+def run_backtest(df, interval='1m', weights=SIGNAL_WEIGHTS,
+                 buy_threshold=BUY_THRESHOLD, sell_threshold=SELL_THRESHOLD,
+                 stop_loss_pct=STOP_LOSS_PCT, take_profit_pct=TAKE_PROFIT_PCT, fee_pct=0.0):
+    """
+    Backtest the strategy on a DataFrame of candles.
+
+    Args:
+        df (pd.DataFrame or CompactCandles): OHLCV data ordered by time
+        interval (str): Candle interval of the data
+        weights (list): Sub-signal weights
+        buy_threshold (float): Weighted signal above which to buy
+        sell_threshold (float): Weighted signal below which to sell
+        stop_loss_pct (float): Stop loss fraction
+        take_profit_pct (float): Take profit fraction
+        fee_pct (float): Fee per side as a fraction of notional
+
+    Returns:
+        dict: Performance metrics (see compute_metrics)
+    """
+    indicators = compute_indicator_arrays(df)
+    sub_signals = compute_sub_signals(indicators)
+    signals = combine_signals(sub_signals, weights, buy_threshold, sell_threshold)
+    result = simulate_positions(indicators['close'], signals,
+                                stop_loss_pct, take_profit_pct, fee_pct)
+    return compute_metrics(result, interval)
+
+
+def main():
+    """
+    Run a backtest on the cached candles and print the performance report.
+    """
+    parser = argparse.ArgumentParser(description='Backtest the trading strategy on cached candles')
+    parser.add_argument('--symbol', default='BTCUSDT', help='Trading pair symbol')
+    parser.add_argument('--interval', default='1m', choices=sorted(INTERVAL_SECONDS), help='Candle interval')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='Directory with cached candle CSVs')
+    parser.add_argument('--fee', type=float, default=0.0, help='Fee per side as a fraction of notional')
+    args = parser.parse_args()
+
+    df = load_cached_candles(args.symbol, args.interval, args.data_dir)
+    print(f"Loaded {len(df)} {args.interval} candles for {args.symbol}")
+
+    start = time.perf_counter()
+    metrics = run_backtest(df, args.interval, fee_pct=args.fee)
+    elapsed = time.perf_counter() - start
+
+    print(f"Backtest finished in {elapsed:.3f}s")
+    print(f"Total return: {metrics['total_return']:.2%}")
+    print(f"Trades: {metrics['trades']}")
+    print(f"Win rate: {metrics['win_rate']:.2%}")
+    print(f"Average trade: {metrics['avg_trade']:.4%}")
+    print(f"Max drawdown: {metrics['max_drawdown']:.2%}")
+    print(f"Sharpe ratio: {metrics['sharpe_ratio']:.2f}")
+
+
+if __name__ == '__main__':
+    main()
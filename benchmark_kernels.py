@@ -0,0 +1,160 @@
+"""
+Benchmark the NumPy indicator kernels in kernels.py against the `ta` library.
+
+Each candle file in the data cache is tiled `--scale` times (10,000 by default,
+so 100 cached candles become 1,000,000) and every indicator used by the strategy
+and the ML features is computed with both implementations. The report lists the
+time of each and the largest deviation of the kernel from `ta`, relative to
+max(1, |ta value|).
+
+Without Numba, the Bollinger deviation on long series is dominated by pandas'
+rolling variance, which accumulates rounding error as the window slides; the
+NumPy kernel does not reproduce that error. With Numba the kernel uses pandas'
+sliding update and matches it.
+
+Usage:
+    python benchmark_kernels.py --scale 10000
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import ta
+
+import kernels
+from backtest import DATA_DIR, load_cached_candles
+
+
+def _ta_indicators(df):
+    """Compute the benchmarked indicators with ta."""
+    close, high, low, volume = df['close'], df['high'], df['low'], df['volume']
+
+    def macd():
+        indicator = ta.trend.MACD(close)
+        return [indicator.macd(), indicator.macd_signal(), indicator.macd_diff()]
+
+    def bollinger():
+        indicator = ta.volatility.BollingerBands(close)
+        return [indicator.bollinger_mavg(), indicator.bollinger_hband(), indicator.bollinger_lband(),
+                indicator.bollinger_wband(), indicator.bollinger_pband()]
+
+    def stochastic():
+        indicator = ta.momentum.StochasticOscillator(high, low, close)
+        return [indicator.stoch(), indicator.stoch_signal()]
+
+    return {
+        'sma_fast': lambda: [ta.trend.sma_indicator(close, window=5)],
+        'sma_slow': lambda: [ta.trend.sma_indicator(close, window=20)],
+        'macd': macd,
+        'rsi': lambda: [ta.momentum.rsi(close, window=14)],
+        'bollinger': bollinger,
+        'stochastic': stochastic,
+        'atr': lambda: [ta.volatility.average_true_range(high, low, close)],
+        'obv': lambda: [ta.volume.on_balance_volume(close, volume)],
+    }
+
+
+def _kernel_indicators(arrays):
+    """Compute the benchmarked indicators with the kernels."""
+    close, high, low, volume = arrays['close'], arrays['high'], arrays['low'], arrays['volume']
+    return {
+        'sma_fast': lambda: [kernels.sma(close, 5)],
+        'sma_slow': lambda: [kernels.sma(close, 20)],
+        'macd': lambda: list(kernels.macd(close)),
+        'rsi': lambda: [kernels.rsi(close, 14)],
+        'bollinger': lambda: list(kernels.bollinger_bands(close).values()),
+        'stochastic': lambda: list(kernels.stochastic(high, low, close)),
+        'atr': lambda: [kernels.atr(high, low, close)],
+        'obv': lambda: [kernels.obv(close, volume)],
+    }
+
+
+def _timed(func, repeat):
+    """Run func `repeat` times and return (best time in seconds, last result)."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def max_deviation(expected, actual):
+    """
+    Largest deviation relative to max(1, |expected|), or inf if the NaN
+    positions differ.
+    """
+    expected = np.asarray(expected, dtype=np.float64)
+    actual = np.asarray(actual, dtype=np.float64)
+    missing = np.isnan(expected)
+    if not np.array_equal(missing, np.isnan(actual)):
+        return float('inf')
+    if missing.all():
+        return 0.0
+    difference = np.abs(actual[~missing] - expected[~missing])
+    return float(np.max(difference / np.maximum(1.0, np.abs(expected[~missing]))))
+
+
+def benchmark_file(path, scale, repeat):
+    """
+    Benchmark all indicators on one cached candle file tiled `scale` times.
+
+    Returns:
+        list: (indicator, ta seconds, kernel seconds, max deviation) rows
+    """
+    symbol, interval = os.path.splitext(os.path.basename(path))[0].rsplit('_', 1)
+    candles = load_cached_candles(symbol, interval, os.path.dirname(path))
+    arrays = {name: np.tile(candles[name].to_numpy(dtype=np.float64), scale)
+              for name in ('open', 'high', 'low', 'close', 'volume')}
+    df = pd.DataFrame(arrays)
+
+    ta_outputs = _ta_indicators(df)
+    kernel_outputs = _kernel_indicators(arrays)
+    # Compile the Numba kernels before timing
+    for func in kernel_outputs.values():
+        func()
+
+    rows = []
+    for name, kernel_func in kernel_outputs.items():
+        ta_time, expected = _timed(ta_outputs[name], repeat)
+        kernel_time, actual = _timed(kernel_func, repeat)
+        deviation = max(max_deviation(e, a) for e, a in zip(expected, actual))
+        rows.append((name, ta_time, kernel_time, deviation))
+    return rows
+
+
+def main():
+    """
+    Run the benchmark on every file of the data cache and print a report.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the indicator kernels against ta')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='Directory with cached candle CSVs')
+    parser.add_argument('--scale', type=int, default=10000, help='Times each file is tiled')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is reported)')
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.data_dir, '*.csv')))
+    if not paths:
+        print(f"No candle files found in {args.data_dir}")
+        return
+
+    print(f"Numba kernels: {'enabled' if kernels.NUMBA_AVAILABLE else 'not installed, using NumPy/SciPy'}")
+    for path in paths:
+        rows = benchmark_file(path, args.scale, args.repeat)
+        print(f"\n{os.path.basename(path)} x {args.scale}")
+        print(f"{'indicator':<12}{'ta (s)':>10}{'kernel (s)':>12}{'speedup':>10}{'max dev':>12}")
+        for name, ta_time, kernel_time, deviation in rows:
+            print(f"{name:<12}{ta_time:>10.4f}{kernel_time:>12.4f}"
+                  f"{ta_time / kernel_time:>9.1f}x{deviation:>12.1e}")
+        total_ta = sum(row[1] for row in rows)
+        total_kernel = sum(row[2] for row in rows)
+        print(f"{'total':<12}{total_ta:>10.4f}{total_kernel:>12.4f}{total_ta / total_kernel:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
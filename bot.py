@@ -4,23 +4,43 @@ strategies for automated cryptocurrency trading on Solana. It includes features
 position management, risk control, and real-time market visualization.
 """
 
-from solana.rpc.api import Client as SolanaClient
+from rpc_gateway import get_gateway
 from solana.rpc.commitment import Confirmed
 from solders.keypair import Keypair
 from solders.pubkey import Pubkey
 from solders.transaction import Transaction
 from solders.system_program import ID as SYS_PROGRAM_ID
 from solana.rpc.types import TxOpts
-from config import SOLANA_NETWORKS, DEFAULT_NETWORK, PROGRAM_IDS, MAX_RETRIES, COMMITMENT, PRIORITY_FEE
+from config import (SOLANA_NETWORKS, DEFAULT_NETWORK, PROGRAM_IDS, MAX_RETRIES, COMMITMENT, PRIORITY_FEE,
+                    PRICE_POLL_INTERVAL, CHART_UPDATE_INTERVAL, MODEL_REFRESH_INTERVAL,
+                    BALANCE_REFRESH_INTERVAL)
 import pandas as pd
 import numpy as np
 import time
+import os
+import threading
 import logging
 from datetime import datetime
 import joblib
-from features import calculate_technical_features
+from features import calculate_technical_features, FeatureCache
+from strategy import generate_signal
 from data_manager import DataManager
+from candle_store import CandleStore
 from visualizer import MarketVisualizer
+from compiled_model import COMPILED_MODEL_FILENAME, load_compiled_model
+from model_registry import ModelRegistry, LoadedModel
+from scheduler import EventScheduler, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+from bot_state import capture_state
+
+# Features used by models without a registry manifest, in training order
+ML_FEATURES = [
+    'sma_fast', 'sma_slow', 'rsi', 'macd', 'macd_signal', 
+    'macd_diff', 'bb_upper', 'bb_middle', 'bb_lower', 
+    'bb_width', 'bb_pband'
+]
+
+# Model class labels and the signals they map to
+ML_SIGNALS = {1: 'buy', -1: 'sell', 0: 'hold'}
 
 # Set up logging configuration
 logging.basicConfig(
@@ -53,8 +73,8 @@ class TradingBot:
             intervals (list): List of time intervals to analyze
             lookback (int): Number of historical candles to consider
         """
-        # Initialize Solana client
-        self.client = SolanaClient(SOLANA_NETWORKS[DEFAULT_NETWORK]['rpc_url'])
+        # Initialize Solana client on the network's shared RPC gateway
+        self.client = get_gateway(DEFAULT_NETWORK).client()
         self.symbol = symbol
         self.intervals = intervals
         self.lookback = lookback
@@ -63,20 +83,146 @@ class TradingBot:
         self.stop_loss_pct = 0.02  # 2% stop loss
         self.take_profit_pct = 0.04  # 4% take profit
         self.max_position_size = 0.1  # Maximum position size as fraction of balance
+        self.max_daily_loss = 5  # Maximum daily loss in percent
+        self.max_positions = 3  # Maximum number of open positions
+        self.leverage = 1
+        self.wallet = None  # Keypair of the connected wallet
+        self.balance = None  # SOL balance from the last balance refresh
+        self.balance_updated = None  # Time of the last balance refresh
+        self.last_error = None  # Last error reported to the web interface
         
         # Initialize data management and visualization components
-        self.data_manager = DataManager(self.client)
+        self.data_manager = DataManager(self.client, candle_store=CandleStore())
         self.visualizer = MarketVisualizer()
         
-        # Load machine learning model and scaler
+        # Indicator frames shared by the strategy, the ML model and the charts,
+        # recomputed only when a new candle arrives
+        self.feature_cache = FeatureCache()
+        
+        # Latest strategy and ML signals per interval, updated when its candle closes
+        self.signals = {}
+        self.last_price = None  # Price seen by the last price tick
+        
+        # Load machine learning model and scaler; the model, scaler and feature
+        # list are swapped together as one LoadedModel when a new version is published
+        self.model_registry = ModelRegistry()
+        self.ml_model = None
+        self.load_model()
+
+        # Read model for the web interface, replaced as a whole after every job.
+        # Only writers take the lock; readers just load the reference
+        self._state_lock = threading.Lock()
+        self._state = capture_state(self)
+
+    @property
+    def state(self):
+        """
+        Latest published BotState snapshot. Safe to read from any thread.
+        """
+        return self._state
+
+    def publish_state(self):
+        """
+        Publish a new snapshot of the bot state. Called by the trading jobs on
+        the scheduler thread after they ran; readers holding the previous
+        snapshot are unaffected.
+        
+        Returns:
+            BotState: The published snapshot
+        """
+        with self._state_lock:
+            state = capture_state(self)
+            self._state = state
+        return state
+
+    def update_state(self, **fields):
+        """
+        Set bot attributes from outside the scheduler thread (a background job
+        or a web request) and republish the current snapshot with them. Other
+        live attributes are not read, so this is safe while a trading job runs.
+        
+        Args:
+            **fields: Attribute names (which must be BotState fields) and values,
+                e.g. stop_loss_pct=0.03
+        """
+        with self._state_lock:
+            # Under the writer lock, so a snapshot published concurrently is not overwritten
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self._state = self._state._replace(updated=time.time(), **fields)
+
+    def refresh_balance(self):
+        """
+        Background job: fetch the wallet balance and publish it with the state,
+        so the web interface never has to make the RPC call itself.
+        """
+        if self.wallet is None:
+            return
+        balance = self.get_account_balance()
+        self.update_state(balance=balance, balance_updated=time.time())
+
+    @property
+    def model(self):
+        return self.ml_model.model if self.ml_model else None
+
+    @property
+    def scaler(self):
+        return self.ml_model.scaler if self.ml_model else None
+
+    def load_model(self):
+        """
+        Load the ML model and scaler. The current version of the model registry is
+        preferred; without one, the compiled NumPy export and then the joblib files
+        in the working directory are used.
+        """
+        try:
+            loaded = self.model_registry.load()
+            if loaded:
+                self.ml_model = loaded
+                logging.info(f"ML model version {loaded.version} loaded from registry")
+                return
+        except Exception as e:
+            logging.error(f"Error loading ML model from registry: {e}")
+
+        if os.path.exists(COMPILED_MODEL_FILENAME):
+            try:
+                model, scaler, features = load_compiled_model(COMPILED_MODEL_FILENAME)
+                self.ml_model = LoadedModel(None, model, scaler, features, {})
+                logging.info("Compiled ML model loaded successfully")
+                return
+            except Exception as e:
+                logging.error(f"Error loading compiled ML model: {e}")
+
         try:
-            self.model = joblib.load('trading_model.joblib')
-            self.scaler = joblib.load('scaler.joblib')
+            model = joblib.load('trading_model.joblib')
+            scaler = joblib.load('scaler.joblib')
+            self.ml_model = LoadedModel(None, model, scaler, ML_FEATURES, {})
             logging.info("ML model and scaler loaded successfully")
         except Exception as e:
             logging.error(f"Error loading ML model: {e}")
-            self.model = None
-            self.scaler = None
+            self.ml_model = None
+
+    def refresh_model(self):
+        """
+        Hot-swap to the registry's current model version if it changed. The new
+        version is fully loaded and verified before it replaces the old one, so
+        signal updates running concurrently keep using a consistent model.
+        
+        Returns:
+            bool: True if a new version was loaded
+        """
+        try:
+            version = self.model_registry.current_version()
+            if version is None or (self.ml_model and self.ml_model.version == version):
+                return False
+            loaded = self.model_registry.load(version)
+            self.ml_model = loaded
+            self.update_state(model_version=version)
+            logging.info(f"Switched to ML model version {version}")
+            return True
+        except Exception as e:
+            logging.error(f"Error refreshing ML model: {e}")
+            return False
 
     def get_account_balance(self):
         """
@@ -95,6 +241,7 @@ class TradingBot:
             return 0
         except Exception as e:
             logging.error(f"Error getting account balance: {e}")
+            self.last_error = f"Error getting account balance: {e}"
             return 0
 
     def calculate_position_size(self):
@@ -155,17 +302,22 @@ class TradingBot:
             return result
         except Exception as e:
             logging.error(f"Error placing order: {e}")
+            self.last_error = f"Error placing order: {e}"
             return None
 
-    def check_stop_loss_take_profit(self):
+    def check_stop_loss_take_profit(self, current_price=None):
         """
         Check if current position has hit stop loss or take profit levels.
         Closes position if either level is reached.
+        
+        Args:
+            current_price (float, optional): Latest price; fetched if not given
         """
         if not self.position or not self.entry_price:
             return
 
-        current_price = self.get_current_price()
+        if current_price is None:
+            current_price = self.get_current_price()
         price_change = (current_price - self.entry_price) / self.entry_price
 
         if self.position == 'BUY':
@@ -202,47 +354,98 @@ class TradingBot:
                 self.entry_price = None
         except Exception as e:
             logging.error(f"Error closing position: {e}")
+            self.last_error = f"Error closing position: {e}"
 
-    def get_ml_signal(self, df):
+    def get_ml_signal(self, df, features=None):
         """
         Get trading signal from the machine learning model.
         
         Args:
             df (pd.DataFrame): Market data with technical indicators
+            features (dict or pd.Series, optional): Latest indicator values, e.g. the
+                last row of a FeatureCache frame. When given, the features are not
+                recomputed from `df`.
             
         Returns:
             str: 'buy', 'sell', or 'hold' signal, or None if model not available
         """
-        if self.model is None or self.scaler is None:
+        if self.ml_model is None:
             return None
 
         try:
-            # Calculate technical features using only the features the model was trained with
-            df_features = calculate_technical_features(df.copy())
-            
-            # Define the exact features used during training
-            expected_features = [
-                'sma_fast', 'sma_slow', 'rsi', 'macd', 'macd_signal', 
-                'macd_diff', 'bb_upper', 'bb_middle', 'bb_lower', 
-                'bb_width', 'bb_pband'
-            ]
+            if features is None:
+                # Calculate technical features using only the features the model was trained with
+                features = calculate_technical_features(df.copy()).iloc[-1]
+        except Exception as e:
+            logging.error(f"Error getting ML signal: {e}")
+            return None
+        
+        prediction = self.get_ml_signals({'latest': features})['latest']
+        return prediction['signal'] if prediction else None
+
+    def get_ml_signals(self, feature_rows):
+        """
+        Get ML predictions for several feature rows with a single scaler transform
+        and a single predict_proba call.
+        
+        Args:
+            feature_rows (dict): Key (e.g. interval, or (symbol, interval)) -> latest
+                indicator values as a dict or pd.Series
             
-            # Create a new DataFrame with only the expected features in the correct order
-            latest_features = pd.DataFrame(
-                df_features[expected_features].iloc[-1:].values,
-                columns=expected_features
+        Returns:
+            dict: Key -> {'signal': 'buy'/'sell'/'hold', 'confidence': probability of
+            the predicted class, 'probabilities': signal -> probability}, or None for
+            keys that could not be predicted (no model or incomplete features)
+        """
+        predictions = dict.fromkeys(feature_rows)
+        ml_model = self.ml_model  # Use one version for the whole batch
+        if ml_model is None or not feature_rows:
+            return predictions
+
+        try:
+            matrix = np.array(
+                [[features[name] for name in ml_model.features] for features in feature_rows.values()],
+                dtype=float
             )
             
-            # Scale features using the pre-trained scaler
-            scaled_features = self.scaler.transform(latest_features)
+            # Rows with missing indicators (e.g. during warm-up) cannot be scored
+            valid = np.isfinite(matrix).all(axis=1)
+            if not valid.any():
+                return predictions
             
-            # Get prediction from the model
-            prediction = self.model.predict(scaled_features)[0]
+            # Scale and predict all rows at once (sklearn scalers expect named columns)
+            rows = matrix[valid]
+            if hasattr(ml_model.scaler, 'feature_names_in_'):
+                rows = pd.DataFrame(rows, columns=ml_model.features)
+            scaled_features = ml_model.scaler.transform(rows)
+            probabilities = ml_model.model.predict_proba(scaled_features)
             
-            return 'buy' if prediction == 1 else 'sell' if prediction == -1 else 'hold'
+            classes = [ML_SIGNALS.get(label, 'hold') for label in ml_model.model.classes_]
+            best = probabilities.argmax(axis=1)
+            # Select the keys in Python: NumPy would turn tuple keys into array rows
+            valid_keys = [key for key, ok in zip(feature_rows, valid) if ok]
+            for row, key in enumerate(valid_keys):
+                predictions[key] = {
+                    'signal': classes[best[row]],
+                    'confidence': float(probabilities[row, best[row]]),
+                    'probabilities': dict(zip(classes, probabilities[row].tolist())),
+                }
         except Exception as e:
-            logging.error(f"Error getting ML signal: {e}")
-            return None
+            logging.error(f"Error getting ML signals: {e}")
+        return predictions
+
+    def get_features(self, interval, df):
+        """
+        Get the shared indicator frame for an interval.
+        
+        Args:
+            interval (str): Time interval of the data
+            df (pd.DataFrame): Market data for the interval
+            
+        Returns:
+            pd.DataFrame: Market data with all strategy and ML indicators
+        """
+        return self.feature_cache.get_features(self.symbol, interval, df)
 
     def update_charts(self):
         """
@@ -255,9 +458,15 @@ class TradingBot:
                 self.symbol, self.intervals, self.lookback
             )
             
+            # Reuse the indicator frames computed for trading
+            feature_dict = {
+                interval: self.get_features(interval, df)
+                for interval, df in data_dict.items()
+            }
+            
             # Create multi-timeframe chart
             chart_path = self.visualizer.create_multi_timeframe_chart(
-                data_dict, self.symbol
+                feature_dict, self.symbol
             )
             
             if chart_path:
@@ -275,43 +484,56 @@ class TradingBot:
         except Exception as e:
             logging.error(f"Error updating charts: {e}")
 
-    def trade(self):
+    def update_signals(self, data_dict):
         """
-        Main trading logic that combines signals from multiple timeframes and strategies.
+        Recompute the strategy and ML signals for the given intervals. The ML
+        model scores all intervals in one batch.
+        
+        Args:
+            data_dict (dict): Interval -> market data for the intervals to update
+            
+        Returns:
+            dict: Interval -> {'sma', 'ml', 'ml_confidence'} for the updated intervals
+        """
+        feature_rows = {}
+        sma_signals = {}
+        for interval, df in data_dict.items():
+            if df is None or df.empty:
+                self.signals.pop(interval, None)
+                continue
+
+            latest = df.iloc[-1]
+            logging.info(f"Latest {interval} data for {self.symbol}: "
+                       f"Open={latest['open']:.2f}, "
+                       f"High={latest['high']:.2f}, "
+                       f"Low={latest['low']:.2f}, "
+                       f"Close={latest['close']:.2f}, "
+                       f"Volume={latest['volume']:.2f}")
+
+            # Indicators are computed once per candle and shared by both strategies
+            df_features = self.get_features(interval, df)
+            sma_signals[interval] = generate_signal(df_features)
+            feature_rows[interval] = df_features.iloc[-1]
+
+        predictions = self.get_ml_signals(feature_rows)
+        for interval, sma_signal in sma_signals.items():
+            prediction = predictions.get(interval)
+            ml_signal = prediction['signal'] if prediction else None
+            confidence = prediction['confidence'] if prediction else None
+            self.signals[interval] = {'sma': sma_signal, 'ml': ml_signal, 'ml_confidence': confidence}
+            logging.info(f"{interval} signals - SMA: {sma_signal}, ML: {ml_signal}"
+                         + (f" ({confidence:.0%})" if confidence is not None else ""))
+        return {interval: self.signals[interval] for interval in sma_signals}
+
+    def evaluate_signals(self):
+        """
+        Combine the latest signals of all timeframes and open or close positions.
         Implements a consensus-based approach requiring agreement between:
         - Technical analysis (SMA strategy)
         - Machine learning predictions
         - Multiple timeframes
         """
-        # Get data for all timeframes
-        data_dict = self.data_manager.get_multiple_timeframes(
-            self.symbol, self.intervals, self.lookback
-        )
-        
-        if not data_dict:
-            return
-
-        # Log the latest market data for each timeframe
-        for interval, df in data_dict.items():
-            if not df.empty:
-                latest = df.iloc[-1]
-                logging.info(f"Latest {interval} data for {self.symbol}: "
-                           f"Open={latest['open']:.2f}, "
-                           f"High={latest['high']:.2f}, "
-                           f"Low={latest['low']:.2f}, "
-                           f"Close={latest['close']:.2f}, "
-                           f"Volume={latest['volume']:.2f}")
-
-        # Check stop loss and take profit levels
-        self.check_stop_loss_take_profit()
-
-        # Get signals from both strategies for each timeframe
-        signals = {}
-        for interval, df in data_dict.items():
-            sma_signal = sma_strategy(df)
-            ml_signal = self.get_ml_signal(df)
-            signals[interval] = {'sma': sma_signal, 'ml': ml_signal}
-            logging.info(f"{interval} signals - SMA: {sma_signal}, ML: {ml_signal}")
+        signals = self.signals
 
         # Combine signals (require agreement across timeframes)
         buy_signals = sum(1 for s in signals.values() 
@@ -350,37 +572,101 @@ class TradingBot:
                     self.entry_price = float(order['fills'][0]['price'])
                     logging.info(f"Entered short position at {self.entry_price}")
 
+    def on_candle_close(self, intervals):
+        """
+        Candle-close event: refresh only the intervals that closed, then re-evaluate.
+        
+        Args:
+            intervals (list): Time intervals whose candles closed
+        """
+        data_dict = self.data_manager.get_multiple_timeframes(
+            self.symbol, intervals, self.lookback
+        )
+        self.update_signals({interval: data_dict.get(interval) for interval in intervals})
+        self.evaluate_signals()
+        self.publish_state()
+
+    def on_price_tick(self, price=None):
+        """
+        Price event: check stop loss and take profit against the new price.
+        
+        Args:
+            price (float, optional): New price pushed by a feed; polled if not given
+        """
+        if price is None:
+            price = self.get_current_price()
+        if price == self.last_price:
+            return
+        self.last_price = price
+        self.check_stop_loss_take_profit(price)
+        self.publish_state()
+
+    def trade(self):
+        """
+        Run the full trading pipeline once: refresh every timeframe, check stop
+        loss and take profit, and evaluate the combined signals.
+        """
+        # Get data for all timeframes
+        data_dict = self.data_manager.get_multiple_timeframes(
+            self.symbol, self.intervals, self.lookback
+        )
+        
+        if not data_dict:
+            return
+
+        # Check stop loss and take profit levels
+        self.check_stop_loss_take_profit()
+
+        # Get signals from both strategies for each timeframe
+        self.update_signals(data_dict)
+
+        self.evaluate_signals()
+        self.publish_state()
+
+    def create_scheduler(self, chart_update_interval=CHART_UPDATE_INTERVAL,
+                         price_poll_interval=PRICE_POLL_INTERVAL):
+        """
+        Create an event scheduler driving the bot: signals update when a candle
+        of their interval closes, stop loss and take profit are checked on every
+        price tick, and charts, model hot-swaps and balance refreshes run on
+        their own low-priority cadence. Each job publishes a new state snapshot.
+        
+        Args:
+            chart_update_interval (float): Seconds between chart updates (None to disable)
+            price_poll_interval (float): Seconds between price ticks
+            
+        Returns:
+            EventScheduler: Scheduler with the bot's jobs registered (not started)
+        """
+        scheduler = EventScheduler()
+        
+        # Compute the initial signals for every timeframe straight away
+        scheduler.post('initial_signals', self.trade, PRIORITY_NORMAL)
+        scheduler.on_candle_close(self.intervals, self.on_candle_close, PRIORITY_NORMAL)
+        scheduler.every('price_tick', price_poll_interval, self.on_price_tick, PRIORITY_HIGH)
+        if chart_update_interval:
+            scheduler.every('update_charts', chart_update_interval, self.update_charts, PRIORITY_LOW)
+        scheduler.every('refresh_model', MODEL_REFRESH_INTERVAL, self.refresh_model,
+                        PRIORITY_LOW, run_now=False)
+        scheduler.every('refresh_balance', BALANCE_REFRESH_INTERVAL, self.refresh_balance, PRIORITY_LOW)
+        return scheduler
+
 def main():
     """
     Main function to run the trading bot.
-    Implements the main trading loop with periodic chart updates.
+    Runs the event scheduler, which only wakes up for candle closes, price
+    ticks and periodic chart updates.
     """
     bot = TradingBot()
     logging.info("Trading bot started")
     
-    # Initial chart update
-    bot.update_charts()
-    
-    chart_update_interval = 300  # Update charts every 5 minutes
-    last_chart_update = time.time()
-    
-    while True:
-        try:
-            # Execute trading logic
-            bot.trade()
-            
-            # Update charts periodically
-            current_time = time.time()
-            if current_time - last_chart_update >= chart_update_interval:
-                bot.update_charts()
-                last_chart_update = current_time
-                
-            # Sleep to prevent excessive API calls
-            time.sleep(1)
-            
-        except Exception as e:
-            logging.error(f"Error in main loop: {e}")
-            time.sleep(5)  # Wait before retrying
+    scheduler = bot.create_scheduler()
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        logging.info("Trading bot stopped")
+    finally:
+        scheduler.stop()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,72 @@
+"""
+This module defines the read model of the trading bot for the web interface.
+
+The scheduler thread owns the live TradingBot attributes. After every trading
+job it builds a new BotState snapshot and swaps it in with a single reference
+assignment, which is atomic in CPython; background jobs and settings changes
+swap in a copy of the current snapshot with just their fields replaced. Writers
+serialize on a lock so neither kind of update overwrites the other.
+
+Flask handlers read `bot.state` once and use only that object, so a request
+always sees a consistent set of values (e.g. a position together with its own
+entry price) without taking a lock or making an RPC call.
+
+A snapshot is never modified after it is published: it is a namedtuple and its
+`intervals` and `signals` are copies made for it alone.
+"""
+
+import time
+from collections import namedtuple
+
+BotState = namedtuple('BotState', [
+    'updated',            # Epoch seconds when the snapshot was published
+    'symbol',             # Trading pair
+    'intervals',          # Tuple of analyzed intervals
+    'position',           # 'BUY', 'SELL' or None
+    'entry_price',        # Entry price of the position, or None
+    'last_price',         # Price seen by the last price tick, or None
+    'signals',            # Interval -> {'sma', 'ml', 'ml_confidence'}
+    'balance',            # SOL balance from the last balance refresh, or None
+    'balance_updated',    # Epoch seconds of the last balance refresh, or None
+    'last_error',         # Last error reported by the bot, or None
+    'model_version',      # Version of the loaded ML model, or None
+    'stop_loss_pct',      # Stop loss as a fraction of the entry price
+    'take_profit_pct',    # Take profit as a fraction of the entry price
+    'max_position_size',  # Maximum position size as a fraction of the balance
+    'max_daily_loss',     # Risk settings (percent, count, multiplier)
+    'max_positions',
+    'leverage',
+])
+
+
+def capture_state(bot):
+    """
+    Build a snapshot of a TradingBot. Must be called from the thread that
+    updates its signals and position (or while the bot is idle).
+
+    Args:
+        bot (TradingBot): The bot
+
+    Returns:
+        BotState: The snapshot
+    """
+    ml_model = getattr(bot, 'ml_model', None)
+    return BotState(
+        updated=time.time(),
+        symbol=bot.symbol,
+        intervals=tuple(bot.intervals),
+        position=bot.position,
+        entry_price=bot.entry_price,
+        last_price=bot.last_price,
+        signals={interval: dict(signal) for interval, signal in bot.signals.items()},
+        balance=bot.balance,
+        balance_updated=bot.balance_updated,
+        last_error=bot.last_error,
+        model_version=ml_model.version if ml_model else None,
+        stop_loss_pct=bot.stop_loss_pct,
+        take_profit_pct=bot.take_profit_pct,
+        max_position_size=bot.max_position_size,
+        max_daily_loss=bot.max_daily_loss,
+        max_positions=bot.max_positions,
+        leverage=bot.leverage,
+    )
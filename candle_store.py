@@ -0,0 +1,356 @@
+"""
+This module implements a persistent on-disk candle store.
+
+Candles are stored per symbol/interval in an append-only binary columnar layout:
+one flat little-endian file per column (int64 epoch-millisecond timestamps and
+float64 OHLCV), plus a small JSON metadata file. Columns are read through
+memory-mapped NumPy arrays, so a time range query only touches the pages it
+needs instead of parsing a whole CSV file.
+
+Layout:
+    <root>/<SYMBOL>/<interval>/meta.json
+    <root>/<SYMBOL>/<interval>/<column>.bin
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ROOT = 'candle_store'
+
+# Stored columns and their on-disk dtypes
+COLUMNS = {
+    'timestamp': '<i8',  # Candle open time, milliseconds since the epoch (UTC)
+    'open': '<f8',
+    'high': '<f8',
+    'low': '<f8',
+    'close': '<f8',
+    'volume': '<f8',
+}
+# Timestamps are written last so they define how many rows were fully committed
+WRITE_ORDER = ['open', 'high', 'low', 'close', 'volume', 'timestamp']
+
+
+def to_milliseconds(values):
+    """
+    Convert timestamps (datetime-like values, strings or epoch milliseconds) to int64 milliseconds.
+
+    Args:
+        values: Array-like of timestamps, or a single timestamp
+
+    Returns:
+        np.ndarray or int: Epoch milliseconds
+    """
+    if np.ndim(values) == 0:
+        if isinstance(values, (int, np.integer)):
+            return int(values)
+        return int(pd.Timestamp(values).value // 1_000_000)
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.integer):
+        return values.astype(np.int64)
+    return pd.DatetimeIndex(pd.to_datetime(values)).as_unit('ms').asi8
+
+
+class CandleStore:
+    """
+    Append-only columnar candle store keyed by symbol and interval.
+
+    Appends only add candles newer than the last stored one, and backfills
+    (prepend) only candles older than the first, so the timestamp column is
+    always sorted and range queries can use binary search.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT):
+        """
+        Args:
+            root (str): Root directory of the store
+        """
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _directory(self, symbol, interval):
+        """Directory holding the columns of a symbol/interval."""
+        return os.path.join(self.root, symbol.replace('/', '_'), interval)
+
+    def _column_path(self, symbol, interval, column):
+        return os.path.join(self._directory(symbol, interval), f'{column}.bin')
+
+    def _committed_rows(self, symbol, interval):
+        """Number of rows present in every column file."""
+        rows = []
+        for column, dtype in COLUMNS.items():
+            path = self._column_path(symbol, interval, column)
+            if not os.path.exists(path):
+                return 0
+            rows.append(os.path.getsize(path) // np.dtype(dtype).itemsize)
+        return min(rows)
+
+    def _open_column(self, symbol, interval, column, rows):
+        """Memory-map the first `rows` values of a column (read-only)."""
+        if rows == 0:
+            return np.empty(0, dtype=COLUMNS[column])
+        return np.memmap(self._column_path(symbol, interval, column),
+                         dtype=COLUMNS[column], mode='r', shape=(rows,))
+
+    def count(self, symbol, interval):
+        """
+        Returns:
+            int: Number of stored candles for the symbol/interval
+        """
+        return self._committed_rows(symbol, interval)
+
+    def first_timestamp(self, symbol, interval):
+        """
+        Returns:
+            int: Open time (epoch ms) of the oldest stored candle, or None if empty
+        """
+        rows = self._committed_rows(symbol, interval)
+        if rows == 0:
+            return None
+        return int(self._open_column(symbol, interval, 'timestamp', rows)[0])
+
+    def last_timestamp(self, symbol, interval):
+        """
+        Returns:
+            int: Open time (epoch ms) of the newest stored candle, or None if empty
+        """
+        rows = self._committed_rows(symbol, interval)
+        if rows == 0:
+            return None
+        return int(self._open_column(symbol, interval, 'timestamp', rows)[-1])
+
+    def append(self, symbol, interval, data):
+        """
+        Append candles, skipping any that are not newer than the last stored candle.
+
+        Args:
+            symbol (str): Trading pair symbol
+            interval (str): Candle interval
+            data: pd.DataFrame with OHLCV columns and timestamps (in a 'timestamp'
+                column or as the index), or a dict of equally long arrays
+
+        Returns:
+            int: Number of candles appended
+        """
+        arrays, order = self._sorted_candles(data)
+        if len(order) == 0:
+            return 0
+
+        with self._lock:
+            self._repair(symbol, interval)
+            os.makedirs(self._directory(symbol, interval), exist_ok=True)
+
+            last = self.last_timestamp(symbol, interval)
+            if last is not None:
+                order = order[arrays['timestamp'][order] > last]
+            if len(order) == 0:
+                return 0
+
+            for column in WRITE_ORDER:
+                values = np.ascontiguousarray(arrays[column][order], dtype=COLUMNS[column])
+                with open(self._column_path(symbol, interval, column), 'ab') as f:
+                    f.write(values.tobytes())
+
+            self._write_meta(symbol, interval)
+            return len(order)
+
+    @staticmethod
+    def _sorted_candles(data):
+        """
+        Convert incoming candles to column arrays.
+
+        Args:
+            data: pd.DataFrame with OHLCV columns and timestamps (in a 'timestamp'
+                column or as the index), or a dict of equally long arrays
+
+        Returns:
+            tuple: (column name -> array with epoch-ms timestamps, indices of the
+            candles in time order with duplicates removed, the last one winning)
+        """
+        if isinstance(data, pd.DataFrame):
+            if data.empty:
+                return {}, np.empty(0, dtype=np.int64)
+            timestamps = data['timestamp'] if 'timestamp' in data.columns else data.index
+            arrays = {column: data[column].to_numpy() for column in COLUMNS if column != 'timestamp'}
+        else:
+            timestamps = data['timestamp']
+            arrays = {column: np.asarray(data[column]) for column in COLUMNS if column != 'timestamp'}
+        arrays['timestamp'] = np.asarray(to_milliseconds(timestamps), dtype=np.int64)
+        if len(arrays['timestamp']) == 0:
+            return arrays, np.empty(0, dtype=np.int64)
+
+        order = np.argsort(arrays['timestamp'], kind='stable')
+        ts_sorted = arrays['timestamp'][order]
+        keep = np.append(ts_sorted[1:] != ts_sorted[:-1], True)
+        return arrays, order[keep]
+
+    def prepend(self, symbol, interval, data):
+        """
+        Backfill candles older than the first stored candle; others are skipped.
+
+        The columns are rewritten into a sibling directory which then replaces
+        the old one, so a reader never sees columns of different lengths. Open
+        memory maps keep reading the old files.
+
+        Args:
+            symbol (str): Trading pair symbol
+            interval (str): Candle interval
+            data: Candles, as for `append`
+
+        Returns:
+            int: Number of candles added
+        """
+        arrays, order = self._sorted_candles(data)
+        if len(order) == 0:
+            return 0
+
+        with self._lock:
+            self._repair(symbol, interval)
+            rows = self._committed_rows(symbol, interval)
+            if rows:
+                first = int(self._open_column(symbol, interval, 'timestamp', rows)[0])
+                order = order[arrays['timestamp'][order] < first]
+                if len(order) == 0:
+                    return 0
+
+            directory = self._directory(symbol, interval)
+            new_directory = directory + '.new'
+            shutil.rmtree(new_directory, ignore_errors=True)
+            os.makedirs(new_directory)
+            for column in WRITE_ORDER:
+                with open(os.path.join(new_directory, f'{column}.bin'), 'wb') as f:
+                    f.write(np.ascontiguousarray(arrays[column][order], dtype=COLUMNS[column]).tobytes())
+                    f.write(np.asarray(self._open_column(symbol, interval, column, rows)).tobytes())
+
+            old_directory = directory + '.old'
+            if os.path.exists(directory):
+                os.replace(directory, old_directory)
+            os.replace(new_directory, directory)
+            shutil.rmtree(old_directory, ignore_errors=True)
+            self._write_meta(symbol, interval)
+            return len(order)
+
+    def _repair(self, symbol, interval):
+        """
+        Truncate columns to the committed row count, dropping the partial tail a
+        crash during an append may have left behind, and restore the previous
+        columns if a crash interrupted a backfill between its two renames.
+        """
+        directory = self._directory(symbol, interval)
+        if not os.path.exists(directory) and os.path.exists(directory + '.old'):
+            logging.warning(f"Restoring {directory} after an interrupted backfill")
+            os.replace(directory + '.old', directory)
+        rows = self._committed_rows(symbol, interval)
+        for column, dtype in COLUMNS.items():
+            path = self._column_path(symbol, interval, column)
+            size = rows * np.dtype(dtype).itemsize
+            if os.path.exists(path) and os.path.getsize(path) != size:
+                logging.warning(f"Truncating {path} to {rows} committed rows")
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+
+    def _write_meta(self, symbol, interval):
+        meta = {
+            'symbol': symbol,
+            'interval': interval,
+            'columns': COLUMNS,
+            'rows': self._committed_rows(symbol, interval),
+        }
+        path = os.path.join(self._directory(symbol, interval), 'meta.json')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    def read_arrays(self, symbol, interval, start=None, end=None):
+        """
+        Read a time range as memory-mapped column arrays, without loading the rest of the file.
+
+        Args:
+            symbol (str): Trading pair symbol
+            interval (str): Candle interval
+            start (optional): Inclusive start time (datetime-like or epoch ms)
+            end (optional): Exclusive end time (datetime-like or epoch ms)
+
+        Returns:
+            dict: Column name -> read-only np.ndarray view
+        """
+        rows = self._committed_rows(symbol, interval)
+        timestamps = self._open_column(symbol, interval, 'timestamp', rows)
+        lo = 0 if start is None else int(np.searchsorted(timestamps, to_milliseconds(start), 'left'))
+        hi = rows if end is None else int(np.searchsorted(timestamps, to_milliseconds(end), 'left'))
+        return {
+            column: self._open_column(symbol, interval, column, rows)[lo:hi]
+            for column in COLUMNS
+        }
+
+    def read(self, symbol, interval, start=None, end=None):
+        """
+        Read a time range as a DataFrame.
+
+        Args:
+            symbol (str): Trading pair symbol
+            interval (str): Candle interval
+            start (optional): Inclusive start time (datetime-like or epoch ms)
+            end (optional): Exclusive end time (datetime-like or epoch ms)
+
+        Returns:
+            pd.DataFrame: timestamp, open, high, low, close and volume columns
+        """
+        return self._to_frame(self.read_arrays(symbol, interval, start, end))
+
+    def tail(self, symbol, interval, n):
+        """
+        Read the newest `n` candles.
+
+        Returns:
+            pd.DataFrame: timestamp, open, high, low, close and volume columns
+        """
+        rows = self._committed_rows(symbol, interval)
+        lo = max(0, rows - n)
+        return self._to_frame({
+            column: self._open_column(symbol, interval, column, rows)[lo:]
+            for column in COLUMNS
+        })
+
+    @staticmethod
+    def _to_frame(arrays):
+        """Copy memory-mapped columns into a DataFrame."""
+        df = pd.DataFrame({column: np.array(values) for column, values in arrays.items()},
+                          columns=list(COLUMNS))
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+
+    def import_csv(self, path, symbol, interval):
+        """
+        Import a Binance-style kline CSV (such as the files in data_cache/).
+
+        Args:
+            path (str): CSV file path
+            symbol (str): Trading pair symbol
+            interval (str): Candle interval
+
+        Returns:
+            int: Number of candles appended
+        """
+        df = pd.read_csv(path, usecols=list(COLUMNS), parse_dates=['timestamp'])
+        return self.append(symbol, interval, df)
+
+
+if __name__ == '__main__':
+    # Migrate the CSV data cache into the candle store
+    store = CandleStore()
+    data_dir = 'data_cache'
+    for filename in sorted(os.listdir(data_dir)):
+        if not filename.endswith('.csv'):
+            continue
+        symbol, interval = filename[:-len('.csv')].rsplit('_', 1)
+        added = store.import_csv(os.path.join(data_dir, filename), symbol, interval)
+        print(f"{symbol} {interval}: imported {added} candles "
+              f"({store.count(symbol, interval)} stored)")
@@ -0,0 +1,174 @@
+"""
+This module implements a lightweight runtime for the trained trading model.
+
+train_model.export_compiled_model flattens the fitted StandardScaler and
+RandomForestClassifier into a single .npz file of NumPy arrays: the scaler's
+mean and scale, and for every tree node its split feature, threshold, child
+indices and class probabilities. The classes below evaluate those arrays with
+plain NumPy, so loading and scoring the model needs neither sklearn nor joblib
+and a prediction avoids sklearn's per-call validation and joblib dispatch
+overhead.
+"""
+
+import os
+
+import numpy as np
+
+COMPILED_MODEL_FILENAME = 'trading_model.npz'
+
+
+class CompiledScaler:
+    """
+    NumPy equivalent of a fitted sklearn StandardScaler.
+    """
+
+    def __init__(self, mean, scale):
+        """
+        Args:
+            mean (np.ndarray): Per-feature mean (zeros if the scaler did not center)
+            scale (np.ndarray): Per-feature scale (ones if the scaler did not scale)
+        """
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+
+    def transform(self, X):
+        """
+        Standardize features.
+
+        Args:
+            X (array-like): Feature matrix of shape (n_samples, n_features)
+
+        Returns:
+            np.ndarray: Scaled features
+        """
+        return (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+
+
+class CompiledForest:
+    """
+    NumPy equivalent of a fitted sklearn RandomForestClassifier.
+
+    The nodes of all trees are stored in flat arrays, and every sample is
+    advanced through all trees at once, one level per step. Leaves point to
+    themselves with an infinite threshold, so a path that has reached its leaf
+    simply stays there.
+    """
+
+    def __init__(self, roots, feature, threshold, left, right, value, classes, max_depth):
+        """
+        Args:
+            roots (np.ndarray): Index of each tree's root node
+            feature (np.ndarray): Split feature of each node
+            threshold (np.ndarray): Split threshold of each node (samples with
+                feature <= threshold go left)
+            left (np.ndarray): Left child of each node
+            right (np.ndarray): Right child of each node
+            value (np.ndarray): Class probabilities of each node, (n_nodes, n_classes)
+            classes (np.ndarray): Class labels
+            max_depth (int): Depth of the deepest tree
+        """
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.right = np.asarray(right, dtype=np.intp)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+        self.max_depth = int(max_depth)
+        # Children interleaved as [right, left] so a node's next index is
+        # _children[2 * node + go_left]
+        self._children = np.stack([self.right, self.left], axis=1).ravel()
+
+    def apply(self, X):
+        """
+        Find the leaf each sample reaches in each tree.
+
+        Args:
+            X (array-like): Feature matrix of shape (n_samples, n_features)
+
+        Returns:
+            np.ndarray: Leaf node indices of shape (n_samples, n_trees)
+        """
+        # sklearn evaluates trees on float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        n_samples, n_features = X.shape
+        values = X.ravel()
+        n_trees = len(self.roots)
+
+        # One (sample, tree) path per entry; paths that reached a leaf are dropped
+        # from the active set, so later steps only touch the deeper paths
+        nodes = np.tile(self.roots, n_samples)
+        active = np.arange(n_samples * n_trees)
+        current = nodes.copy()
+        offsets = np.repeat(np.arange(n_samples) * n_features, n_trees)
+        for _ in range(self.max_depth):
+            go_left = values[offsets + self.feature[current]] <= self.threshold[current]
+            following = self._children[2 * current + go_left]
+            nodes[active] = following
+            moved = following != current
+            if moved.all():
+                current = following
+                continue
+            active, current, offsets = active[moved], following[moved], offsets[moved]
+            if len(active) == 0:
+                break
+        return nodes.reshape(n_samples, n_trees)
+
+    def predict_proba(self, X):
+        """
+        Args:
+            X (array-like): Feature matrix of shape (n_samples, n_features)
+
+        Returns:
+            np.ndarray: Class probabilities averaged over the trees, (n_samples, n_classes)
+        """
+        return self.value[self.apply(X)].mean(axis=1)
+
+    def predict(self, X):
+        """
+        Args:
+            X (array-like): Feature matrix of shape (n_samples, n_features)
+
+        Returns:
+            np.ndarray: Predicted class labels
+        """
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+# Arrays making up a compiled model
+COMPILED_ARRAYS = [
+    'roots', 'feature', 'threshold', 'left', 'right', 'value', 'classes',
+    'max_depth', 'scaler_mean', 'scaler_scale', 'feature_names'
+]
+
+
+def load_compiled_model(path=COMPILED_MODEL_FILENAME, mmap_mode=None):
+    """
+    Load a model exported by train_model.export_compiled_model.
+
+    Args:
+        path (str): Path of the .npz file, or of a directory holding one .npy file
+            per array (as written by the model registry)
+        mmap_mode (str, optional): Memory-map the arrays of a .npy directory
+            (e.g. 'r'), so several processes share one copy of the model
+
+    Returns:
+        tuple: (CompiledForest, CompiledScaler, list of feature names)
+    """
+    if os.path.isdir(path):
+        data = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode,
+                              allow_pickle=False)
+                for name in COMPILED_ARRAYS}
+        return _from_arrays(data)
+    with np.load(path, allow_pickle=False) as data:
+        return _from_arrays(data)
+
+
+def _from_arrays(data):
+    """Build the forest and scaler from a mapping of compiled arrays."""
+    forest = CompiledForest(
+        data['roots'], data['feature'], data['threshold'], data['left'],
+        data['right'], data['value'], data['classes'], data['max_depth']
+    )
+    scaler = CompiledScaler(data['scaler_mean'], data['scaler_scale'])
+    return forest, scaler, data['feature_names'].tolist()
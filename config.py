@@ -61,6 +61,18 @@ PRIORITY_FEE = 0.000005  # SOL
 SYMBOL = 'BTCUSDT'  # The trading pair to monitor and trade
 INTERVALS = ['1m', '5m', '15m', '1h']  # Time intervals for data collection
 LOOKBACK = 100  # Number of historical candles to consider for analysis
+PRICE_POLL_INTERVAL = 1  # Seconds between price ticks for stop-loss/take-profit checks
+CHART_UPDATE_INTERVAL = 300  # Seconds between chart refreshes
+MODEL_REFRESH_INTERVAL = 60  # Seconds between checks for a new model version
+LIVE_UPDATE_INTERVAL = 2  # Seconds between live update publishes to the web pages
+BALANCE_REFRESH_INTERVAL = 30  # Seconds between wallet balance refreshes for the web interface
+
+# Length of each supported candle interval in seconds
+INTERVAL_SECONDS = {
+    '1m': 60, '3m': 180, '5m': 300, '15m': 900, '30m': 1800,
+    '1h': 3600, '2h': 7200, '4h': 14400, '6h': 21600, '8h': 28800, '12h': 43200,
+    '1d': 86400
+}
 
 # Risk management parameters
 STOP_LOSS_PCT = 0.02  # Stop loss percentage (2% of entry price)
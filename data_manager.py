@@ -9,9 +9,143 @@ import numpy as np
 import logging
 from datetime import datetime, timedelta
 import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeoutError
 from solana.rpc.api import Client
 from solana.rpc.commitment import Confirmed
-from config import SOLANA_NETWORKS, DEFAULT_NETWORK
+from config import SOLANA_NETWORKS, DEFAULT_NETWORK, INTERVAL_SECONDS
+from synthetic_data import SyntheticMarket
+from compact_candles import CompactCandles
+
+FETCH_TIMEOUT = 10  # Seconds to wait for a single market data source
+MAX_FETCH_WORKERS = 8  # Concurrent market data fetches
+DEFAULT_CACHE_TTL = 60  # Seconds, for intervals without a known candle length
+MAX_CACHE_ENTRIES = 256  # Maximum number of cached DataFrames
+MAX_CACHE_BYTES = 256 * 1024 * 1024  # Maximum memory held by cached DataFrames
+STALE_CACHE_TTL = 3600  # Seconds an expired entry is kept for partial refreshes and fallbacks
+
+
+class MarketDataCache:
+    """
+    Size-bounded LRU cache of market data DataFrames with TTL expiry.
+    
+    Memory is accounted per entry with memory_usage(deep=True), which both
+    DataFrame and CompactCandles provide. When
+    the entry or byte limit is exceeded, the least recently used entries are
+    evicted. Expired entries are still available through `peek` (for partial
+    refreshes and stale fallbacks) until they are `stale_ttl` seconds past expiry,
+    after which they are dropped.
+    """
+    
+    def __init__(self, max_entries=MAX_CACHE_ENTRIES, max_bytes=MAX_CACHE_BYTES,
+                 stale_ttl=STALE_CACHE_TTL):
+        """
+        Args:
+            max_entries (int): Maximum number of entries
+            max_bytes (int): Maximum total size of the cached DataFrames in bytes
+            stale_ttl (float): Seconds expired entries are retained
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()  # key -> (data, expiry, nbytes), oldest first
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def __contains__(self, key):
+        return key in self._entries
+    
+    def get(self, key):
+        """
+        Get a fresh (unexpired) entry and mark it as recently used.
+        
+        Returns:
+            pd.DataFrame: Cached data, or None on a miss or if the entry has expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() >= entry[1]:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def peek(self, key):
+        """
+        Get an entry even if it has expired, without affecting statistics.
+        
+        Returns:
+            pd.DataFrame: Cached data, or None if absent
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry is not None else None
+    
+    def put(self, key, data, expiry):
+        """
+        Insert or replace an entry, then enforce the TTL and size limits.
+        
+        Args:
+            key (str): Cache key
+            data (pd.DataFrame or CompactCandles): Data to cache
+            expiry (float): UNIX time at which the entry becomes stale
+        """
+        nbytes = int(data.memory_usage(deep=True).sum())
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[2]
+            self._entries[key] = (data, expiry, nbytes)
+            self.bytes += nbytes
+            self._drop_expired()
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or self.bytes > self.max_bytes):
+                _, (_, _, evicted_bytes) = self._entries.popitem(last=False)
+                self.bytes -= evicted_bytes
+                self.evictions += 1
+    
+    def _drop_expired(self):
+        """Remove entries that expired more than `stale_ttl` seconds ago."""
+        cutoff = time.time() - self.stale_ttl
+        for key in [k for k, (_, expiry, _) in self._entries.items() if expiry < cutoff]:
+            self.bytes -= self._entries.pop(key)[2]
+            self.expirations += 1
+    
+    def clear(self):
+        """Remove all entries (statistics are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+    
+    def stats(self):
+        """
+        Get cache statistics.
+        
+        Returns:
+            dict: Entry count, memory usage and hit/miss/eviction counters
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
 
 class DataManager:
     """
@@ -19,16 +153,34 @@ class DataManager:
     Handles data fetching from multiple sources and timeframes.
     """
     
-    def __init__(self, client):
+    def __init__(self, client, candle_store=None, fetch_timeout=FETCH_TIMEOUT,
+                 max_workers=MAX_FETCH_WORKERS, max_cache_entries=MAX_CACHE_ENTRIES,
+                 max_cache_bytes=MAX_CACHE_BYTES, compact=False):
         """
         Initialize the data manager with a Solana client.
         
         Args:
             client: Solana RPC client instance
+            candle_store (CandleStore, optional): Persistent candle store. Closed
+                candles are appended to it and historical queries are served from it.
+            fetch_timeout (float): Seconds to wait for each data source before
+                falling back to stale or stored data
+            max_workers (int): Number of threads used for concurrent fetches
+            max_cache_entries (int): Maximum number of cached DataFrames
+            max_cache_bytes (int): Maximum memory used by cached DataFrames
+            compact (bool): Cache and return market data as CompactCandles (int64
+                timestamps, float32 OHLCV) instead of float64 DataFrames
         """
         self.client = client
-        self.cache = {}  # In-memory cache for market data
-        self.cache_expiry = {}  # Cache expiration timestamps
+        self.candle_store = candle_store
+        self.fetch_timeout = fetch_timeout
+        self.compact = compact
+        self.cache = MarketDataCache(max_cache_entries, max_cache_bytes)  # In-memory cache for market data
+        self._lock = threading.RLock()  # Guards the cache and the in-flight fetches
+        self._in_flight = {}  # cache_key -> Future of the fetch currently running
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='market-data')
+        self._synthetic_markets = {}  # (symbol, interval) -> SyntheticMarket for dummy data
         
     def get_market_data(self, symbol, interval, lookback):
         """
@@ -40,44 +192,180 @@ class DataManager:
             lookback (int): Number of candles to fetch
             
         Returns:
-            pd.DataFrame: Market data with OHLCV columns
+            pd.DataFrame: Market data with OHLCV columns (CompactCandles in compact mode)
+        """
+        future = self._market_data_future(symbol, interval, lookback)
+        return self._resolve(future, symbol, interval, lookback, self.fetch_timeout)
+    
+    def get_multiple_timeframes(self, symbol, intervals, lookback):
+        """
+        Get market data for multiple timeframes.
+        
+        All cache misses are fetched concurrently, so the latency is that of the
+        slowest source rather than the sum of all of them. A source that does not
+        answer within `fetch_timeout` falls back to stale cached or stored data.
+        
+        Args:
+            symbol (str): Trading pair symbol
+            intervals (list): List of time intervals
+            lookback (int): Number of candles to fetch
+            
+        Returns:
+            dict: Dictionary of DataFrames for each interval
+        """
+        futures = {
+            interval: self._market_data_future(symbol, interval, lookback)
+            for interval in intervals
+        }
+        deadline = time.monotonic() + self.fetch_timeout
+        data_dict = {}
+        for interval, future in futures.items():
+            remaining = max(0.0, deadline - time.monotonic())
+            data_dict[interval] = self._resolve(future, symbol, interval, lookback, remaining)
+        return data_dict
+    
+    def _market_data_future(self, symbol, interval, lookback):
+        """
+        Get a Future for the market data of a symbol/interval.
+        
+        Returns an already completed Future on a cache hit. Concurrent callers
+        asking for the same key while a fetch is running share that fetch.
+        """
+        cache_key = f"{symbol}_{interval}"
+        with self._lock:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                future = Future()
+                future.set_result(cached)
+                return future
+            
+            future = self._in_flight.get(cache_key)
+            if future is None:
+                future = self._executor.submit(
+                    self._load_market_data, cache_key, symbol, interval, lookback
+                )
+                self._in_flight[cache_key] = future
+                future.add_done_callback(lambda f: self._release_fetch(cache_key, f))
+            return future
+    
+    def _release_fetch(self, cache_key, future):
+        """Forget a finished in-flight fetch."""
+        with self._lock:
+            if self._in_flight.get(cache_key) is future:
+                del self._in_flight[cache_key]
+    
+    def _resolve(self, future, symbol, interval, lookback, timeout):
+        """
+        Wait for a market data Future, falling back to stale cached data or the
+        candle store if it does not complete in time.
         """
         try:
-            # Check cache first
-            cache_key = f"{symbol}_{interval}"
-            if self._is_cache_valid(cache_key):
-                return self.cache[cache_key]
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            logging.warning(f"Timed out fetching {symbol} {interval} market data")
+            with self._lock:
+                stale = self.cache.peek(f"{symbol}_{interval}")
+            if stale is not None:
+                return stale
+            return self._read_store_tail(symbol, interval, lookback)
+        except Exception as e:
+            logging.error(f"Error getting market data: {e}")
+            return self._empty_data()
+    
+    def _load_market_data(self, cache_key, symbol, interval, lookback):
+        """
+        Fetch, process, persist and cache market data (runs on the fetch executor).
+        
+        Returns:
+            pd.DataFrame: Market data with OHLCV columns (CompactCandles in compact mode)
+        """
+        try:
+            with self._lock:
+                cached = self.cache.peek(cache_key)
+            
+            # Only the candles since the cached ones need fetching, plus the newest
+            # cached candle, which may have still been forming
+            fetch_count = self._candles_to_refresh(cached, interval, lookback)
             
             # Fetch data from DEX
             # This is a placeholder - you'll need to implement actual DEX data fetching
             # using the appropriate program ID and instruction data
-            data = self._fetch_dex_data(symbol, interval, lookback)
+            data = self._fetch_dex_data(symbol, interval, fetch_count)
             
             # Process and cache the data
             df = self._process_market_data(data)
-            self._update_cache(cache_key, df)
+            if df.empty:
+                # Fall back to the newest stored candles if the source is unavailable
+                return self._read_store_tail(symbol, interval, lookback)
+            # Persist the fetched candles at full precision; the cached candles
+            # merged in below were stored when they were fetched
+            self._persist_candles(symbol, interval, df)
+            if self.compact:
+                df = CompactCandles.from_frame(df)
+            if fetch_count < lookback:
+                df = self._merge_candles(cached, df, lookback)
+            with self._lock:
+                self._update_cache(cache_key, df, interval)
             
             return df
         except Exception as e:
             logging.error(f"Error getting market data: {e}")
-            return pd.DataFrame()
+            return self._empty_data()
     
-    def get_multiple_timeframes(self, symbol, intervals, lookback):
+    def get_historical_data(self, symbol, interval, start=None, end=None):
         """
-        Get market data for multiple timeframes.
+        Get stored historical candles for a time range from the candle store.
         
         Args:
             symbol (str): Trading pair symbol
-            intervals (list): List of time intervals
-            lookback (int): Number of candles to fetch
+            interval (str): Time interval
+            start (optional): Inclusive start time (datetime-like or epoch ms)
+            end (optional): Exclusive end time (datetime-like or epoch ms)
             
         Returns:
-            dict: Dictionary of DataFrames for each interval
+            pd.DataFrame: Market data indexed by timestamp (CompactCandles in compact
+            mode), empty if no store is configured
         """
-        data_dict = {}
-        for interval in intervals:
-            data_dict[interval] = self.get_market_data(symbol, interval, lookback)
-        return data_dict
+        if self.candle_store is None:
+            return self._empty_data()
+        try:
+            if self.compact:
+                return CompactCandles.from_store(self.candle_store, symbol, interval, start, end)
+            df = self.candle_store.read(symbol, interval, start, end)
+            return df.set_index('timestamp')
+        except Exception as e:
+            logging.error(f"Error reading historical data: {e}")
+            return self._empty_data()
+    
+    def _read_store_tail(self, symbol, interval, lookback):
+        """
+        Read the newest `lookback` stored candles, or an empty DataFrame if unavailable.
+        """
+        if self.candle_store is None:
+            return self._empty_data()
+        try:
+            if self.compact:
+                return CompactCandles.from_store(self.candle_store, symbol, interval, tail=lookback)
+            return self.candle_store.tail(symbol, interval, lookback).set_index('timestamp')
+        except Exception as e:
+            logging.error(f"Error reading stored candles: {e}")
+            return self._empty_data()
+    
+    def _empty_data(self):
+        """Empty market data of the type this manager returns."""
+        return CompactCandles.empty_candles() if self.compact else pd.DataFrame()
+    
+    def _persist_candles(self, symbol, interval, df):
+        """
+        Append closed candles to the candle store. The newest candle may still be
+        forming, so it is only stored once a later candle has been seen.
+        """
+        if self.candle_store is None or len(df) < 2:
+            return
+        try:
+            self.candle_store.append(symbol, interval, df.sort_index().iloc[:-1])
+        except Exception as e:
+            logging.error(f"Error persisting candles: {e}")
     
     def _fetch_dex_data(self, symbol, interval, lookback):
         """
@@ -89,7 +377,7 @@ class DataManager:
             lookback (int): Number of candles to fetch
             
         Returns:
-            list: Raw market data
+            list or dict: Raw market data, as rows or column arrays
         """
         try:
             # This is a placeholder - implement actual DEX data fetching
@@ -99,7 +387,7 @@ class DataManager:
             # 3. Process the trades into OHLCV data
             
             # For now, return dummy data
-            return self._generate_dummy_data(lookback)
+            return self._generate_dummy_data(lookback, interval, symbol)
         except Exception as e:
             logging.error(f"Error fetching DEX data: {e}")
             return []
@@ -109,7 +397,7 @@ class DataManager:
         Process raw market data into a DataFrame.
         
         Args:
-            data (list): Raw market data
+            data (list or dict): Raw market data (rows or column arrays)
             
         Returns:
             pd.DataFrame: Processed market data
@@ -124,31 +412,28 @@ class DataManager:
             logging.error(f"Error processing market data: {e}")
             return pd.DataFrame()
     
-    def _generate_dummy_data(self, lookback):
+    def _generate_dummy_data(self, lookback, interval='1m', symbol=None):
         """
         Generate dummy market data for testing.
         
+        Uses one seeded SyntheticMarket per symbol/interval, so consecutive calls
+        continue the same price path with candles aligned to the interval.
+        
         Args:
             lookback (int): Number of candles to generate
+            interval (str): Candle interval
+            symbol (str, optional): Trading pair symbol
             
         Returns:
-            list: Dummy market data
-        """
-        now = int(time.time())
-        data = []
-        for i in range(lookback):
-            timestamp = now - (i * 60)  # 1-minute intervals
-            price = 100 + np.random.normal(0, 1)  # Random price around 100
-            volume = np.random.uniform(1000, 5000)  # Random volume
-            data.append([
-                timestamp,
-                price,
-                price + np.random.uniform(0, 1),
-                price - np.random.uniform(0, 1),
-                price + np.random.normal(0, 0.5),
-                volume
-            ])
-        return data
+            dict: Arrays of the newest `lookback` candles in time order
+        """
+        key = (symbol, interval)
+        with self._lock:
+            market = self._synthetic_markets.get(key)
+            if market is None:
+                market = SyntheticMarket(interval=interval if interval in INTERVAL_SECONDS else '1m')
+                self._synthetic_markets[key] = market
+            return market.latest(lookback)
     
     def _is_cache_valid(self, cache_key):
         """
@@ -160,20 +445,85 @@ class DataManager:
         Returns:
             bool: True if cache is valid, False otherwise
         """
-        if cache_key not in self.cache or cache_key not in self.cache_expiry:
-            return False
-        return time.time() < self.cache_expiry[cache_key]
+        return self.cache.get(cache_key) is not None
     
-    def _update_cache(self, cache_key, data):
+    def _update_cache(self, cache_key, data, interval=None):
         """
         Update the cache with new data.
         
+        The entry expires when the interval's current candle closes, so each
+        interval is refetched once per candle and right after a new one starts.
+        
         Args:
             cache_key (str): Cache key
             data (pd.DataFrame): Data to cache
+            interval (str, optional): Candle interval of the data
+        """
+        self.cache.put(cache_key, data, self._next_candle_close(interval))
+    
+    @staticmethod
+    def _next_candle_close(interval, now=None):
+        """
+        Get the time at which the interval's current candle closes.
+        
+        Args:
+            interval (str): Candle interval (e.g. '1m', '1h')
+            now (float, optional): Current UNIX time
+            
+        Returns:
+            float: UNIX time of the next candle boundary
+        """
+        now = time.time() if now is None else now
+        seconds = INTERVAL_SECONDS.get(interval)
+        if not seconds:
+            return now + DEFAULT_CACHE_TTL
+        return (now // seconds + 1) * seconds
+    
+    @staticmethod
+    def _candles_to_refresh(cached, interval, lookback):
+        """
+        Number of candles to fetch to bring a cached frame up to date.
+        
+        Args:
+            cached (pd.DataFrame or CompactCandles): Cached market data indexed by
+                timestamp, or None
+            interval (str): Candle interval
+            lookback (int): Number of candles wanted
+            
+        Returns:
+            int: Candle count to request, `lookback` for a full refresh
+        """
+        seconds = INTERVAL_SECONDS.get(interval)
+        if cached is None or cached.empty or not seconds or len(cached) < lookback:
+            return lookback
+        last_candle = cached.index.max().timestamp()
+        elapsed = int((time.time() - last_candle) // seconds)
+        return min(lookback, max(elapsed, 0) + 1)
+    
+    @staticmethod
+    def _merge_candles(cached, fresh, lookback):
+        """
+        Merge freshly fetched candles into a cached frame; fresh rows replace
+        cached rows with the same timestamp.
+        
+        Returns:
+            pd.DataFrame: The newest `lookback` candles in time order (CompactCandles
+            if the fresh candles are compact)
+        """
+        if isinstance(fresh, CompactCandles):
+            return CompactCandles.concat([cached, fresh], keep_last=lookback)
+        merged = pd.concat([cached, fresh])
+        merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+        return merged.iloc[-lookback:]
+    
+    def get_cache_stats(self):
+        """
+        Get market data cache statistics.
+        
+        Returns:
+            dict: Entry count, memory usage in bytes and hit/miss/eviction counters
         """
-        self.cache[cache_key] = data
-        self.cache_expiry[cache_key] = time.time() + 60  # Cache for 1 minute
+        return self.cache.stats()
     
     def get_data_quality_report(self):
         """
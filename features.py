@@ -2,10 +2,21 @@
 This module provides functionality for calculating technical analysis indicators
 that are used as features for the trading model. It includes various technical
 indicators such as moving averages, RSI, MACD, and Bollinger Bands.
+
+The indicators are computed with the NumPy kernels in kernels.py.
+
+It also provides a FeatureCache that computes the full indicator set once per
+candle and shares the resulting frame between the strategy, the ML model and
+the charts.
 """
 
+import copy
+import threading
+import numpy as np
 import pandas as pd
-import ta
+import kernels
+from compact_candles import as_frame
+from streaming_indicators import IndicatorEngine, FEATURE_COLUMNS, candle_timestamps
 
 def calculate_technical_features(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -14,7 +25,8 @@ def calculate_technical_features(df: pd.DataFrame) -> pd.DataFrame:
     used in trading strategies.
 
     Args:
-        df: Pandas DataFrame with at least 'high', 'low', 'close', 'volume' columns.
+        df: Pandas DataFrame with at least 'high', 'low', 'close', 'volume' columns,
+            or CompactCandles (expanded to a float64 DataFrame).
             It's assumed the 'close' column is numeric.
 
     Returns:
@@ -24,40 +36,151 @@ def calculate_technical_features(df: pd.DataFrame) -> pd.DataFrame:
         - MACD (Moving Average Convergence Divergence) and its components
         - Bollinger Bands and related indicators
     """
+    df = as_frame(df)
     # Ensure 'close' is numeric (it should be from bot.py's get_data)
     df['close'] = pd.to_numeric(df['close'])
 
+    close = kernels.as_array(df['close'])
+
     # Simple Moving Averages (SMA)
     # Fast SMA (5 periods) for short-term trend
-    df['sma_fast'] = ta.trend.sma_indicator(df['close'], window=5)
+    df['sma_fast'] = kernels.sma(close, 5)
     # Slow SMA (20 periods) for long-term trend
-    df['sma_slow'] = ta.trend.sma_indicator(df['close'], window=20)
+    df['sma_slow'] = kernels.sma(close, 20)
 
     # Relative Strength Index (RSI)
     # Standard 14-period RSI for momentum
-    df['rsi'] = ta.momentum.rsi(df['close'], window=14)
+    df['rsi'] = kernels.rsi(close, 14)
 
     # Moving Average Convergence Divergence (MACD)
     # MACD is calculated using 12 and 26 periods by default
-    macd = ta.trend.MACD(df['close'])
-    df['macd'] = macd.macd()  # MACD line
-    df['macd_signal'] = macd.macd_signal()  # Signal line
-    df['macd_diff'] = macd.macd_diff()  # MACD histogram
+    macd, macd_signal, macd_diff = kernels.macd(close)
+    df['macd'] = macd  # MACD line
+    df['macd_signal'] = macd_signal  # Signal line
+    df['macd_diff'] = macd_diff  # MACD histogram
 
     # Bollinger Bands
     # Standard 20-period Bollinger Bands with 2 standard deviations
-    bollinger = ta.volatility.BollingerBands(df['close'])
-    df['bb_upper'] = bollinger.bollinger_hband()  # Upper band
-    df['bb_middle'] = bollinger.bollinger_mavg()  # Middle band (20-period SMA)
-    df['bb_lower'] = bollinger.bollinger_lband()  # Lower band
-    df['bb_width'] = bollinger.bollinger_wband()  # Bandwidth indicator
-    df['bb_pband'] = bollinger.bollinger_pband()  # %B indicator
+    bollinger = kernels.bollinger_bands(close)
+    df['bb_upper'] = bollinger['hband']  # Upper band
+    df['bb_middle'] = bollinger['mavg']  # Middle band (20-period SMA)
+    df['bb_lower'] = bollinger['lband']  # Lower band
+    df['bb_width'] = bollinger['wband']  # Bandwidth indicator
+    df['bb_pband'] = bollinger['pband']  # %B indicator
 
     # Drop rows with NaN values created by indicators (especially at the beginning)
     # df.dropna(inplace=True) # We'll handle NaNs in train_model.py after target creation
 
     return df
 
+
+class FeatureCache:
+    """
+    Shared cache of feature frames keyed by (symbol, interval) and the latest candle.
+
+    Each frame holds the OHLCV data plus the union of the indicators used by
+    `strategy.generate_signal` and the ML model (see FEATURE_COLUMNS). A frame is
+    rebuilt only when a new candle appears or the latest candle changes; the
+    indicators for those candles are obtained from a per-(symbol, interval)
+    IndicatorEngine, so the cost of a new candle is O(1) instead of a full
+    recomputation over the lookback window.
+
+    The latest candle may still be forming, and DataManager replaces it when it
+    is refetched. The engine state from before that candle is therefore kept as
+    a checkpoint, and every rebuild re-feeds the engine from the checkpoint, so
+    the indicators never include a superseded version of a candle.
+    """
+
+    def __init__(self):
+        self._entries = {}  # (symbol, interval) -> {'timestamp', 'last_candle', 'frame', 'checkpoint'}
+        self._lock = threading.Lock()
+
+    def get_features(self, symbol, interval, df):
+        """
+        Get the feature frame for the latest candle of `df`.
+
+        Args:
+            symbol (str): Trading pair symbol
+            interval (str): Time interval of the data
+            df (pd.DataFrame or CompactCandles): OHLCV data ordered by time
+
+        Returns:
+            pd.DataFrame: Copy of `df` with the FEATURE_COLUMNS added. The same
+            object is returned until a new candle arrives or the latest candle
+            changes, so callers must not modify it in place.
+        """
+        df = as_frame(df)
+        if df.empty:
+            return df
+
+        key = (symbol, interval)
+        timestamps = candle_timestamps(df)
+        columns = df[['high', 'low', 'close', 'volume']].to_numpy(dtype=float)
+        last_candle = tuple(columns[-1])
+        with self._lock:
+            entry = self._entries.get(key)
+            if (entry is not None and entry['timestamp'] == timestamps[-1]
+                    and entry['last_candle'] == last_candle):
+                return entry['frame']
+
+            if entry is not None and entry['timestamp'] in timestamps:
+                # Resume from the state before the previous latest candle, which may have changed
+                start = timestamps.get_loc(entry['timestamp'])
+                engine = copy.deepcopy(entry['checkpoint'])
+                old_values = self._previous_values(entry['frame'], timestamps[:start])
+            else:
+                start = 0
+                engine = IndicatorEngine()
+                old_values = np.empty((0, len(FEATURE_COLUMNS)))
+
+            new_values, checkpoint = self._feed(engine, columns, timestamps, start)
+            frame = df.copy()
+            frame[FEATURE_COLUMNS] = np.vstack([old_values, new_values])
+            self._entries[key] = {'timestamp': timestamps[-1], 'last_candle': last_candle,
+                                  'frame': frame, 'checkpoint': checkpoint}
+            return frame
+
+    @staticmethod
+    def _previous_values(previous, timestamps):
+        """Feature values of the given candles, copied from the previous frame."""
+        positions = candle_timestamps(previous).get_indexer(timestamps)
+        values = previous[FEATURE_COLUMNS].to_numpy()[positions]
+        values[positions < 0] = np.nan
+        return values
+
+    @staticmethod
+    def _feed(engine, columns, timestamps, start):
+        """
+        Feed the candles from `start` on through the incremental engine.
+
+        Returns:
+            tuple: (feature values of the fed candles, copy of the engine taken
+            before the last candle was fed)
+        """
+        new_values = []
+        checkpoint = None
+        for i in range(start, len(columns)):
+            if i == len(columns) - 1:
+                checkpoint = copy.deepcopy(engine)
+            high, low, close, volume = columns[i]
+            latest = engine.update({'high': high, 'low': low, 'close': close, 'volume': volume},
+                                   timestamp=timestamps[i])
+            new_values.append([latest[name] for name in FEATURE_COLUMNS])
+        return np.asarray(new_values, dtype=float).reshape(-1, len(FEATURE_COLUMNS)), checkpoint
+
+    def invalidate(self, symbol=None, interval=None):
+        """
+        Drop cached frames so they are rebuilt on the next request.
+
+        Args:
+            symbol (str, optional): Only drop frames for this symbol
+            interval (str, optional): Only drop frames for this interval
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if (symbol is None or key[0] == symbol) and (interval is None or key[1] == interval):
+                    del self._entries[key]
+
 if __name__ == '__main__':
     # Example usage with sample data
     # This section is for testing the function if run directly
@@ -0,0 +1,461 @@
+"""
+This module provides NumPy kernels for the technical indicators used by the
+strategy and the ML features: SMA, EMA/MACD, Wilder RSI, Bollinger Bands,
+Stochastic oscillator, ATR and OBV.
+
+The kernels take and return contiguous float64 NumPy arrays and never build
+pandas objects. Rolling means are direct window sums (np.convolve) and rolling
+extrema use scipy.ndimage filters. The recursive indicators (EMA and Wilder
+smoothing) and the rolling deviation run as Numba-compiled loops when Numba is
+installed; otherwise EMA and Wilder smoothing are an IIR filter
+(scipy.signal.lfilter) and the rolling deviation comes from blocked cumulative
+sums.
+
+Every kernel reproduces the definition used by the `ta` library, including its
+warm-up NaNs, and agrees with it to 1e-9 (see benchmark_kernels.py). The one
+exception is the Bollinger deviation on very long series without Numba, where
+pandas' sliding variance accumulates rounding error that the cumulative sums
+do not reproduce.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.ndimage import maximum_filter1d, minimum_filter1d
+from scipy.signal import lfilter
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional
+    njit = None
+
+NUMBA_AVAILABLE = njit is not None
+
+# Windows processed at a time by the two-pass rolling_std
+ROLLING_BLOCK_SIZE = 1 << 14
+# Windows per cumulative-sum block of rolling_std; each block is centered on its
+# own mean, which bounds the magnitude (and rounding error) of the running sums
+CUMSUM_BLOCK_SIZE = 1 << 12
+# A sliding variance update that keeps less than 3 significant digits of the
+# previous sum of squares is redone from scratch (pandas' InvCondTol)
+INV_COND_TOL = np.finfo(np.float64).eps * 1e3
+
+
+def as_array(values):
+    """
+    Convert a Series or array-like to a contiguous float64 array.
+
+    Returns:
+        np.ndarray: The values
+    """
+    return np.ascontiguousarray(np.asarray(values, dtype=np.float64))
+
+
+def _smooth_loop(values, alpha, start, out):
+    """Exponential smoothing y[i] = (1 - alpha) * y[i - 1] + alpha * x[i], seeded with x[start]."""
+    weighted = values[start]
+    out[start] = weighted
+    for i in range(start + 1, len(values)):
+        weighted = ((1.0 - alpha) * weighted + alpha * values[i]) / ((1.0 - alpha) + alpha)
+        out[i] = weighted
+
+
+if NUMBA_AVAILABLE:
+    _smooth_loop = njit(cache=True, nogil=True)(_smooth_loop)
+
+
+def _smooth(values, alpha, start):
+    """
+    Exponentially smooth values[start:] (the update of pandas ewm(adjust=False)).
+    Entries before `start` are NaN.
+    """
+    out = np.full(len(values), np.nan)
+    if start >= len(values):
+        return out
+    if NUMBA_AVAILABLE:
+        _smooth_loop(values, alpha, start, out)
+    else:
+        out[start] = values[start]
+        out[start + 1:] = lfilter([alpha], [1.0, alpha - 1.0], values[start + 1:],
+                                  zi=[(1.0 - alpha) * values[start]])[0]
+    return out
+
+
+def _first_valid(values):
+    """Index of the first non-NaN value (len(values) if there is none)."""
+    valid = np.flatnonzero(~np.isnan(values))
+    return int(valid[0]) if len(valid) else len(values)
+
+
+def _pad(values, n):
+    """Prefix rolling results with NaN so they align with an input of length n."""
+    out = np.full(n, np.nan)
+    if len(values):
+        out[n - len(values):] = values
+    return out
+
+
+def sma(values, window):
+    """
+    Simple moving average (ta.trend.sma_indicator).
+
+    Args:
+        values (array-like): Input series
+        window (int): Number of periods
+
+    Returns:
+        np.ndarray: Moving average, NaN for the first window - 1 entries
+    """
+    values = as_array(values)
+    if len(values) < window:
+        return np.full(len(values), np.nan)
+    # Direct sum of each window, so no rounding error carries over between windows
+    return _pad(np.convolve(values, np.ones(window), 'valid') / window, len(values))
+
+
+def _add_var(val, nobs, mean_x, ssqdm_x, compensation, unstable):
+    """Add an observation to a running variance (pandas add_var)."""
+    if val != val:
+        return nobs, mean_x, ssqdm_x, compensation, unstable
+    prev_m2 = ssqdm_x
+    nobs += 1.0
+    prev_mean = mean_x - compensation
+    y = val - compensation
+    t = y - mean_x
+    compensation = t + mean_x - y
+    mean_x = mean_x + t / nobs
+    ssqdm_x = ssqdm_x + (val - prev_mean) * (val - mean_x)
+    return nobs, mean_x, ssqdm_x, compensation, unstable or prev_m2 * INV_COND_TOL > ssqdm_x
+
+
+def _remove_var(val, nobs, mean_x, ssqdm_x, compensation, unstable):
+    """Remove an observation from a running variance (pandas remove_var)."""
+    if val != val:
+        return nobs, mean_x, ssqdm_x, compensation, unstable
+    nobs -= 1.0
+    if not nobs:
+        return nobs, 0.0, 0.0, compensation, False
+    prev_m2 = ssqdm_x
+    prev_mean = mean_x - compensation
+    y = val - compensation
+    t = y - mean_x
+    compensation = t + mean_x - y
+    mean_x = mean_x - t / nobs
+    ssqdm_x = ssqdm_x - (val - prev_mean) * (val - mean_x)
+    return nobs, mean_x, ssqdm_x, compensation, unstable or prev_m2 * INV_COND_TOL > ssqdm_x
+
+
+def _rolling_var_loop(values, window, out):
+    """
+    Sliding population variance with the update of pandas' rolling var: Welford's
+    method with Kahan-compensated means, recomputing the window when an update
+    cancels catastrophically. Windows with fewer than `window` non-NaN values are NaN.
+    """
+    nobs = mean_x = ssqdm_x = compensation_add = compensation_remove = 0.0
+    unstable = False
+    for i in range(len(values)):
+        if i:
+            if i >= window:
+                nobs, mean_x, ssqdm_x, compensation_remove, unstable = _remove_var(
+                    values[i - window], nobs, mean_x, ssqdm_x, compensation_remove, unstable)
+            nobs, mean_x, ssqdm_x, compensation_add, unstable = _add_var(
+                values[i], nobs, mean_x, ssqdm_x, compensation_add, unstable)
+        if not i or unstable:
+            nobs = mean_x = ssqdm_x = compensation_add = compensation_remove = 0.0
+            for j in range(max(i - window + 1, 0), i + 1):
+                nobs, mean_x, ssqdm_x, compensation_add, unstable = _add_var(
+                    values[j], nobs, mean_x, ssqdm_x, compensation_add, unstable)
+            unstable = False
+        out[i] = ssqdm_x / nobs if nobs >= window else np.nan
+
+
+if NUMBA_AVAILABLE:
+    _add_var = njit(cache=True, nogil=True)(_add_var)
+    _remove_var = njit(cache=True, nogil=True)(_remove_var)
+    _rolling_var_loop = njit(cache=True, nogil=True)(_rolling_var_loop)
+
+
+def rolling_std(values, window, exact=False, block_size=ROLLING_BLOCK_SIZE):
+    """
+    Rolling population standard deviation (pandas rolling std with ddof=0).
+
+    When Numba is installed, the variance is updated window by window exactly as
+    pandas does it, in O(n), so the result matches pandas (and `ta`).
+
+    Otherwise the window sums of the values and their squares are taken from
+    cumulative sums, also in O(n). The cumulative sums restart every
+    CUMSUM_BLOCK_SIZE windows on values centered on the block mean, so they stay
+    small; windows of identical values are exactly 0, as in pandas. This is
+    closer to the true deviation than pandas' sliding update, so on long series
+    the two differ by the rounding error pandas accumulates (about 1e-7).
+
+    With `exact=True` each window's deviation is computed from its own mean
+    (two-pass), in blocks of `block_size` windows so the temporaries stay in
+    cache. It is the slowest and most exact option.
+
+    Returns:
+        np.ndarray: Standard deviation, NaN for the first window - 1 entries
+    """
+    values = as_array(values)
+    n = len(values)
+    if n < window:
+        return np.full(n, np.nan)
+    if exact:
+        return _rolling_std_two_pass(values, window, block_size)
+    if NUMBA_AVAILABLE:
+        out = np.empty(n)
+        _rolling_var_loop(values, window, out)
+        np.maximum(out, 0.0, out=out)
+        return np.sqrt(out, out=out)
+    if np.isnan(values).any():
+        return _rolling_std_two_pass(values, window, block_size)
+
+    windows = n - window + 1
+    blocks = -(-windows // CUMSUM_BLOCK_SIZE)
+    span = CUMSUM_BLOCK_SIZE + window - 1
+    # Pad with the last value so every block is complete; the padding is trimmed below
+    padded = np.concatenate([values, np.full(blocks * CUMSUM_BLOCK_SIZE + window - 1 - n, values[-1])])
+    segments = sliding_window_view(padded, span)[::CUMSUM_BLOCK_SIZE]
+    centered = segments - segments.mean(axis=1, keepdims=True)
+
+    sums = np.zeros((blocks, span + 1))
+    np.cumsum(centered, axis=1, out=sums[:, 1:])
+    window_sums = sums[:, window:] - sums[:, :-window]
+    np.multiply(centered, centered, out=centered)
+    np.cumsum(centered, axis=1, out=sums[:, 1:])
+    variance = sums[:, window:] - sums[:, :-window]
+    window_sums *= window_sums
+    window_sums /= window
+    variance -= window_sums
+    variance /= window
+
+    # Windows without a change of value have no deviation (pandas reports exactly 0)
+    changes = np.zeros(n, dtype=np.int32)
+    np.cumsum(values[1:] != values[:-1], out=changes[1:])
+    variance = variance.reshape(-1)[:windows]
+    variance[changes[window - 1:] == changes[:windows]] = 0.0
+
+    out = np.full(n, np.nan)
+    np.maximum(variance, 0.0, out=variance)
+    np.sqrt(variance, out=out[window - 1:])
+    return out
+
+
+def _rolling_std_two_pass(values, window, block_size=ROLLING_BLOCK_SIZE):
+    """Rolling standard deviation with each window's deviation from its own mean."""
+    windows = sliding_window_view(values, window)
+    out = np.empty(len(windows))
+    for start in range(0, len(windows), block_size):
+        block = windows[start:start + block_size]
+        deviations = block - block.mean(axis=1)[:, None]
+        out[start:start + block_size] = np.sqrt(np.einsum('ij,ij->i', deviations, deviations) / window)
+    return _pad(out, len(values))
+
+
+def _rolling_extremum(values, window, mode):
+    """Rolling minimum or maximum, NaN for the first window - 1 entries."""
+    values = as_array(values)
+    if len(values) < window:
+        return np.full(len(values), np.nan)
+    if np.isnan(values).any():
+        # The ndimage filters do not propagate NaN like pandas does
+        windows = sliding_window_view(values, window)
+        return _pad(windows.min(axis=1) if mode == 'min' else windows.max(axis=1), len(values))
+    rolling_filter = minimum_filter1d if mode == 'min' else maximum_filter1d
+    # With this origin, entry i holds the extremum of values[i - window + 1:i + 1]
+    out = rolling_filter(values, window, origin=(window - 1) // 2)
+    out[:window - 1] = np.nan
+    return out
+
+
+def rolling_min(values, window):
+    """Rolling minimum, NaN for the first window - 1 entries."""
+    return _rolling_extremum(values, window, 'min')
+
+
+def rolling_max(values, window):
+    """Rolling maximum, NaN for the first window - 1 entries."""
+    return _rolling_extremum(values, window, 'max')
+
+
+def ema(values, window=None, alpha=None, min_periods=None):
+    """
+    Exponential moving average (pandas ewm(adjust=False), as used by ta).
+
+    Leading NaNs are skipped, so the EMA of an indicator that is itself still
+    warming up (e.g. the MACD signal line) starts at its first value.
+
+    Args:
+        values (array-like): Input series
+        window (int, optional): Span of the EMA (alpha = 2 / (window + 1))
+        alpha (float, optional): Smoothing factor, instead of a span
+        min_periods (int, optional): Values needed before the first output
+            (defaults to the window)
+
+    Returns:
+        np.ndarray: EMA, NaN until min_periods values have been seen
+    """
+    values = as_array(values)
+    if alpha is None:
+        alpha = 2.0 / (window + 1.0)
+    if min_periods is None:
+        min_periods = window or 1
+    start = _first_valid(values)
+    out = _smooth(values, alpha, start)
+    out[:start + min_periods - 1] = np.nan
+    return out
+
+
+def macd(close, window_slow=26, window_fast=12, window_sign=9):
+    """
+    MACD line, signal line and histogram (ta.trend.MACD).
+
+    Args:
+        close (array-like): Close prices
+        window_slow (int): Slow EMA span
+        window_fast (int): Fast EMA span
+        window_sign (int): Signal EMA span
+
+    Returns:
+        tuple: (macd, macd_signal, macd_diff) arrays
+    """
+    close = as_array(close)
+    macd_line = ema(close, window_fast) - ema(close, window_slow)
+    signal = ema(macd_line, window_sign)
+    return macd_line, signal, macd_line - signal
+
+
+def rsi(close, window=14):
+    """
+    Wilder's Relative Strength Index (ta.momentum.rsi).
+
+    Args:
+        close (array-like): Close prices
+        window (int): Number of periods
+
+    Returns:
+        np.ndarray: RSI, NaN for the first window - 1 entries
+    """
+    close = as_array(close)
+    n = len(close)
+    diff = np.empty(n)
+    if n:
+        diff[0] = np.nan
+        diff[1:] = close[1:] - close[:-1]
+    # Comparisons with the leading NaN are false, so the first gain and loss are 0
+    gains = np.where(diff > 0, diff, 0.0)
+    losses = -np.where(diff < 0, diff, 0.0)
+    avg_gain = ema(gains, alpha=1.0 / window, min_periods=window)
+    avg_loss = ema(losses, alpha=1.0 / window, min_periods=window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative_strength = avg_gain / avg_loss
+        return np.where(avg_loss == 0, 100.0, 100.0 - (100.0 / (1.0 + relative_strength)))
+
+
+def bollinger_bands(close, window=20, window_dev=2, exact=False):
+    """
+    Bollinger Bands (ta.volatility.BollingerBands).
+
+    Args:
+        close (array-like): Close prices
+        window (int): Number of periods
+        window_dev (float): Number of standard deviations of the bands
+        exact (bool): Use the two-pass rolling deviation (see rolling_std)
+
+    Returns:
+        dict: 'mavg', 'hband', 'lband', 'wband' (bandwidth in %) and 'pband' (%B) arrays
+    """
+    close = as_array(close)
+    mavg = sma(close, window)
+    std = rolling_std(close, window, exact=exact)
+    # Updated in place to avoid temporaries on long series; the operations are those of ta
+    std *= window_dev
+    hband = mavg + std
+    lband = np.subtract(mavg, std, out=std)
+    width = hband - lband
+    with np.errstate(divide='ignore', invalid='ignore'):
+        wband = width / mavg
+        wband *= 100
+        width[width == 0] = np.nan
+        pband = close - lband
+        pband /= width
+    return {'mavg': mavg, 'hband': hband, 'lband': lband, 'wband': wband, 'pband': pband}
+
+
+def stochastic(high, low, close, window=14, smooth_window=3):
+    """
+    Stochastic oscillator (ta.momentum.StochasticOscillator).
+
+    Args:
+        high (array-like): High prices
+        low (array-like): Low prices
+        close (array-like): Close prices
+        window (int): Look-back of the highest high and lowest low
+        smooth_window (int): SMA window of the signal line
+
+    Returns:
+        tuple: (%K, %D) arrays
+    """
+    close = as_array(close)
+    lowest = rolling_min(low, window)
+    highest = rolling_max(high, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stoch_k = 100 * (close - lowest) / (highest - lowest)
+    return stoch_k, sma(stoch_k, smooth_window)
+
+
+def true_range(high, low, close):
+    """
+    True range; the first candle, which has no previous close, uses high - low.
+
+    Returns:
+        np.ndarray: True range
+    """
+    high, low, close = as_array(high), as_array(low), as_array(close)
+    ranges = high - low
+    if len(close) > 1:
+        previous = close[:-1]
+        ranges[1:] = np.fmax(ranges[1:], np.fmax(np.abs(high[1:] - previous), np.abs(low[1:] - previous)))
+    return ranges
+
+
+def atr(high, low, close, window=14):
+    """
+    Average True Range with Wilder smoothing (ta.volatility.average_true_range).
+
+    Like ta, the first value is the mean true range of the first window and the
+    entries before it are 0.
+
+    Args:
+        high (array-like): High prices
+        low (array-like): Low prices
+        close (array-like): Close prices
+        window (int): Number of periods
+
+    Returns:
+        np.ndarray: ATR
+    """
+    ranges = true_range(high, low, close)
+    out = np.zeros(len(ranges))
+    if len(ranges) < window:
+        return out
+    seeded = ranges[window - 1:].copy()
+    seeded[0] = ranges[:window].mean()
+    out[window - 1:] = _smooth(seeded, 1.0 / window, 0)
+    return out
+
+
+def obv(close, volume):
+    """
+    On-Balance Volume (ta.volume.on_balance_volume).
+
+    Args:
+        close (array-like): Close prices
+        volume (array-like): Volumes
+
+    Returns:
+        np.ndarray: OBV
+    """
+    close, volume = as_array(close), as_array(volume)
+    signed = volume.copy()
+    signed[1:][close[1:] < close[:-1]] *= -1
+    return np.cumsum(signed)
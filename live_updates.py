@@ -0,0 +1,177 @@
+"""
+This module implements the server-push channel of the web interface.
+
+The bot publishes snapshots of its state (status, signals, order book, open
+orders, ...) to a LiveUpdateBroadcaster under a topic name. The broadcaster
+keeps the latest snapshot of each topic and sends every subscriber only the
+top-level keys that changed since the previous publish, once, however many
+browser tabs are open. A new subscriber first receives the full current state.
+
+Subscribers are served as Server-Sent Events (see stream): each message is an
+SSE event named after its topic, whose data is a JSON object
+
+    {"full": true|false, "changed": {key: value, ...}, "removed": [key, ...]}
+
+A client keeps one object per topic, replaces it when `full` is set, and
+otherwise merges `changed` and deletes `removed` (see static/js/live_updates.js).
+"""
+
+import json
+import logging
+import queue
+import threading
+
+SUBSCRIBER_QUEUE_SIZE = 256  # Pending events per subscriber before it is dropped
+KEEPALIVE_INTERVAL = 15  # Seconds between SSE comments that keep idle connections open
+
+
+def _json_default(value):
+    """Serialize NumPy scalars and other non-JSON values."""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def format_event(topic, message, event_id=None):
+    """
+    Format one Server-Sent Event.
+
+    Args:
+        topic (str): Event name
+        message (dict): Event data, serialized as JSON
+        event_id (int, optional): Event id
+
+    Returns:
+        str: The event, terminated by a blank line
+    """
+    lines = [] if event_id is None else [f'id: {event_id}']
+    lines.append(f'event: {topic}')
+    lines.append(f'data: {json.dumps(message, default=_json_default)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscriber:
+    """
+    Queue of pending events of one connected client.
+    """
+
+    def __init__(self, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.closed = False
+
+    def put(self, event):
+        """
+        Queue an event.
+
+        Returns:
+            bool: False if the subscriber is not keeping up and was closed
+        """
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except queue.Full:
+            self.closed = True
+            return False
+
+
+class LiveUpdateBroadcaster:
+    """
+    Fan-out of per-topic state deltas to all subscribers.
+    """
+
+    def __init__(self):
+        self._state = {}  # topic -> latest snapshot
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._event_id = 0
+
+    def publish(self, topic, snapshot):
+        """
+        Publish the current state of a topic; subscribers receive only the
+        top-level keys that changed.
+
+        Args:
+            topic (str): Topic name
+            snapshot (dict): Full current state of the topic
+
+        Returns:
+            bool: True if anything changed and an event was sent
+        """
+        with self._lock:
+            previous = self._state.get(topic)
+            if previous is None:
+                message = {'full': True, 'changed': snapshot, 'removed': []}
+            else:
+                changed = {key: value for key, value in snapshot.items()
+                           if key not in previous or previous[key] != value}
+                removed = [key for key in previous if key not in snapshot]
+                if not changed and not removed:
+                    return False
+                message = {'full': False, 'changed': changed, 'removed': removed}
+            self._state[topic] = dict(snapshot)
+
+            # Serialized once and shared by all subscribers
+            self._event_id += 1
+            event = format_event(topic, message, self._event_id)
+            for subscriber in list(self._subscribers):
+                if not subscriber.put(event):
+                    logging.warning("Dropping a live update subscriber that is not keeping up")
+                    self._subscribers.discard(subscriber)
+            return True
+
+    def subscribe(self):
+        """
+        Register a subscriber, queueing the full current state of every topic.
+
+        Returns:
+            Subscriber: The subscriber
+        """
+        subscriber = Subscriber()
+        with self._lock:
+            for topic, snapshot in self._state.items():
+                subscriber.put(format_event(topic, {'full': True, 'changed': snapshot, 'removed': []},
+                                            self._event_id))
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Remove a subscriber."""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+        subscriber.closed = True
+
+    def stream(self, subscriber, keepalive=KEEPALIVE_INTERVAL):
+        """
+        Generate the Server-Sent Events of a subscriber until it disconnects.
+
+        Args:
+            subscriber (Subscriber): Subscriber from `subscribe`
+            keepalive (float): Seconds without events before a keep-alive comment
+
+        Yields:
+            str: SSE-formatted events
+        """
+        try:
+            # Tell the browser how long to wait before reconnecting
+            yield 'retry: 3000\n\n'
+            while not subscriber.closed:
+                try:
+                    yield subscriber.queue.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+        finally:
+            self.unsubscribe(subscriber)
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def snapshot(self, topic):
+        """
+        Returns:
+            dict: Latest published state of a topic, or None
+        """
+        with self._lock:
+            state = self._state.get(topic)
+            return dict(state) if state is not None else None
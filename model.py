@@ -1,35 +1,478 @@
 """
 This module handles the machine learning model for trading signal prediction.
 It loads a pre-trained model and provides functionality to make predictions on new data.
+
+The model was trained on the columns of ta.add_all_ta_features. Running that
+function on every call computes all ~90 indicators over the whole frame to score
+a single row, so instead the indicators are described in a table below, and only
+those producing a column the model actually splits on are computed, each on a
+tail of the frame just long enough to warm it up. The indicators whose ta
+implementation loops over rows in Python have faster drop-in subclasses. The
+model is loaded on first use.
 """
 
+import threading
+from collections import namedtuple
+
 import joblib
+import numpy as np
 import pandas as pd
-import ta
+from ta.momentum import (
+    AwesomeOscillatorIndicator, KAMAIndicator, PercentagePriceOscillator,
+    PercentageVolumeOscillator, ROCIndicator, RSIIndicator, StochasticOscillator,
+    StochRSIIndicator, TSIIndicator, UltimateOscillator, WilliamsRIndicator
+)
+from ta.others import CumulativeReturnIndicator, DailyLogReturnIndicator, DailyReturnIndicator
+from ta.trend import (
+    MACD, ADXIndicator, AroonIndicator, CCIIndicator, DPOIndicator, EMAIndicator,
+    IchimokuIndicator, KSTIndicator, MassIndex, PSARIndicator, SMAIndicator,
+    STCIndicator, TRIXIndicator, VortexIndicator
+)
+from ta.volatility import AverageTrueRange, BollingerBands, DonchianChannel, KeltnerChannel, UlcerIndex
+from ta.volume import (
+    AccDistIndexIndicator, ChaikinMoneyFlowIndicator, EaseOfMovementIndicator,
+    ForceIndexIndicator, MFIIndicator, NegativeVolumeIndexIndicator,
+    OnBalanceVolumeIndicator, VolumePriceTrendIndicator, VolumeWeightedAveragePrice
+)
+
+MODEL_PATH = "model.pkl"
+
+class FastNegativeVolumeIndex(NegativeVolumeIndexIndicator):
+    """NegativeVolumeIndexIndicator with the per-row loop replaced by a cumulative product."""
+
+    def _run(self):
+        price_change = self._close.pct_change().to_numpy()
+        vol_decrease = (self._volume.shift(1) > self._volume).to_numpy()
+        factors = np.where(vol_decrease, 1.0 + price_change, 1.0)
+        factors[0] = 1000
+        self._nvi = pd.Series(np.cumprod(factors), index=self._close.index, name="nvi")
+
+
+class FastAverageTrueRange(AverageTrueRange):
+    """AverageTrueRange with the Wilder smoothing loop run over plain floats."""
+
+    def _run(self):
+        true_range = self._true_range(self._high, self._low, self._close.shift(1))
+        values = true_range.tolist()
+        atr = [0.0] * len(values)
+        if len(values) >= self._window:
+            atr[self._window - 1] = true_range[0:self._window].mean()
+            for i in range(self._window, len(atr)):
+                atr[i] = (atr[i - 1] * (self._window - 1) + values[i]) / float(self._window)
+        self._atr = pd.Series(data=atr, index=true_range.index)
+
+
+class FastADXIndicator(ADXIndicator):
+    """ADXIndicator with the smoothing loops run over plain floats."""
+
+    def _smooth(self, values):
+        values = pd.Series(values)
+        smoothed = [0.0] * (len(self._close) - (self._window - 1))
+        smoothed[0] = values.dropna().iloc[0:self._window].sum()
+        values = values.tolist()
+        for i in range(1, len(smoothed) - 1):
+            smoothed[i] = smoothed[i - 1] - (smoothed[i - 1] / float(self._window)) + values[self._window + i]
+        return np.array(smoothed)
+
+    def _run(self):
+        if self._window == 0:
+            raise ValueError("window may not be 0")
+        close_shift = self._close.shift(1).to_numpy()
+        high = self._high.to_numpy()
+        low = self._low.to_numpy()
+
+        self._trs_initial = np.zeros(self._window - 1)
+        self._trs = self._smooth(np.amax([high, close_shift], axis=0) - np.amin([low, close_shift], axis=0))
+
+        diff_up = self._high - self._high.shift(1)
+        diff_down = self._low.shift(1) - self._low
+        self._dip = self._smooth(abs(((diff_up > diff_down) & (diff_up > 0)) * diff_up).to_numpy())
+        self._din = self._smooth(abs(((diff_down > diff_up) & (diff_down > 0)) * diff_down).to_numpy())
+
+
+class FastPSARIndicator(PSARIndicator):
+    """PSARIndicator with the trend-following loop run over plain floats."""
+
+    def _run(self):
+        high = self._high.tolist()
+        low = self._low.tolist()
+        psar = self._close.tolist()
+        psar_up = [np.nan] * len(psar)
+        psar_down = [np.nan] * len(psar)
+
+        up_trend = True
+        acceleration_factor = self._step
+        up_trend_high = high[0] if high else np.nan
+        down_trend_low = low[0] if low else np.nan
+
+        for i in range(2, len(psar)):
+            reversal = False
+            if up_trend:
+                psar[i] = psar[i - 1] + acceleration_factor * (up_trend_high - psar[i - 1])
+                if low[i] < psar[i]:
+                    reversal = True
+                    psar[i] = up_trend_high
+                    down_trend_low = low[i]
+                    acceleration_factor = self._step
+                else:
+                    if high[i] > up_trend_high:
+                        up_trend_high = high[i]
+                        acceleration_factor = min(acceleration_factor + self._step, self._max_step)
+                    if low[i - 2] < psar[i]:
+                        psar[i] = low[i - 2]
+                    elif low[i - 1] < psar[i]:
+                        psar[i] = low[i - 1]
+            else:
+                psar[i] = psar[i - 1] - acceleration_factor * (psar[i - 1] - down_trend_low)
+                if high[i] > psar[i]:
+                    reversal = True
+                    psar[i] = down_trend_low
+                    up_trend_high = high[i]
+                    acceleration_factor = self._step
+                else:
+                    if low[i] < down_trend_low:
+                        down_trend_low = low[i]
+                        acceleration_factor = min(acceleration_factor + self._step, self._max_step)
+                    if high[i - 2] > psar[i]:
+                        psar[i] = high[i - 2]
+                    elif high[i - 1] > psar[i]:
+                        psar[i] = high[i - 1]
+
+            up_trend = up_trend != reversal
+            if up_trend:
+                psar_up[i] = psar[i]
+            else:
+                psar_down[i] = psar[i]
+
+        index = self._close.index
+        self._psar = pd.Series(psar, index=index, dtype="float64")
+        self._psar_up = pd.Series(psar_up, index=index, dtype="float64")
+        self._psar_down = pd.Series(psar_down, index=index, dtype="float64")
+
+
+# Warm-up of indicators defined by a recursion (EMA, Wilder smoothing, KAMA,
+# PSAR) rather than a fixed lookback. Their dependence on older candles decays
+# geometrically; after this many candles the latest values agree with a
+# full-history computation to about 1e-8 relative
+RECURSIVE_WARMUP = 500
+
+OHLCV_FEATURES = ['open', 'high', 'low', 'close', 'volume']
+
+# One ta indicator: its class, the OHLCV columns and parameters it is built with,
+# the output columns mapped to the methods producing them, and the number of
+# candles needed to compute its latest value (None if it depends on the whole
+# history, e.g. cumulative volume indicators)
+Indicator = namedtuple('Indicator', ['cls', 'inputs', 'params', 'outputs', 'warmup'])
+
+# The indicators of ta.add_all_ta_features, with the same parameters and column order
+TA_INDICATORS = [
+    # Volume
+    Indicator(AccDistIndexIndicator, ('high', 'low', 'close', 'volume'), {},
+              {'volume_adi': 'acc_dist_index'}, None),
+    Indicator(OnBalanceVolumeIndicator, ('close', 'volume'), {},
+              {'volume_obv': 'on_balance_volume'}, None),
+    Indicator(ChaikinMoneyFlowIndicator, ('high', 'low', 'close', 'volume'), {},
+              {'volume_cmf': 'chaikin_money_flow'}, 20),
+    Indicator(ForceIndexIndicator, ('close', 'volume'), {'window': 13},
+              {'volume_fi': 'force_index'}, RECURSIVE_WARMUP),
+    Indicator(EaseOfMovementIndicator, ('high', 'low', 'volume'), {'window': 14},
+              {'volume_em': 'ease_of_movement', 'volume_sma_em': 'sma_ease_of_movement'}, 15),
+    Indicator(VolumePriceTrendIndicator, ('close', 'volume'), {},
+              {'volume_vpt': 'volume_price_trend'}, None),
+    Indicator(VolumeWeightedAveragePrice, ('high', 'low', 'close', 'volume'), {'window': 14},
+              {'volume_vwap': 'volume_weighted_average_price'}, 14),
+    Indicator(MFIIndicator, ('high', 'low', 'close', 'volume'), {'window': 14},
+              {'volume_mfi': 'money_flow_index'}, 15),
+    Indicator(FastNegativeVolumeIndex, ('close', 'volume'), {},
+              {'volume_nvi': 'negative_volume_index'}, None),
+    # Volatility
+    Indicator(BollingerBands, ('close',), {'window': 20, 'window_dev': 2},
+              {'volatility_bbm': 'bollinger_mavg', 'volatility_bbh': 'bollinger_hband',
+               'volatility_bbl': 'bollinger_lband', 'volatility_bbw': 'bollinger_wband',
+               'volatility_bbp': 'bollinger_pband', 'volatility_bbhi': 'bollinger_hband_indicator',
+               'volatility_bbli': 'bollinger_lband_indicator'}, 20),
+    Indicator(KeltnerChannel, ('high', 'low', 'close'), {'window': 10},
+              {'volatility_kcc': 'keltner_channel_mband', 'volatility_kch': 'keltner_channel_hband',
+               'volatility_kcl': 'keltner_channel_lband', 'volatility_kcw': 'keltner_channel_wband',
+               'volatility_kcp': 'keltner_channel_pband',
+               'volatility_kchi': 'keltner_channel_hband_indicator',
+               'volatility_kcli': 'keltner_channel_lband_indicator'}, 10),
+    Indicator(DonchianChannel, ('high', 'low', 'close'), {'window': 20, 'offset': 0},
+              {'volatility_dcl': 'donchian_channel_lband', 'volatility_dch': 'donchian_channel_hband',
+               'volatility_dcm': 'donchian_channel_mband', 'volatility_dcw': 'donchian_channel_wband',
+               'volatility_dcp': 'donchian_channel_pband'}, 20),
+    Indicator(FastAverageTrueRange, ('high', 'low', 'close'), {'window': 10},
+              {'volatility_atr': 'average_true_range'}, RECURSIVE_WARMUP),
+    Indicator(UlcerIndex, ('close',), {'window': 14},
+              {'volatility_ui': 'ulcer_index'}, 27),
+    # Trend
+    Indicator(MACD, ('close',), {'window_slow': 26, 'window_fast': 12, 'window_sign': 9},
+              {'trend_macd': 'macd', 'trend_macd_signal': 'macd_signal',
+               'trend_macd_diff': 'macd_diff'}, RECURSIVE_WARMUP),
+    Indicator(SMAIndicator, ('close',), {'window': 12},
+              {'trend_sma_fast': 'sma_indicator'}, 12),
+    Indicator(SMAIndicator, ('close',), {'window': 26},
+              {'trend_sma_slow': 'sma_indicator'}, 26),
+    Indicator(EMAIndicator, ('close',), {'window': 12},
+              {'trend_ema_fast': 'ema_indicator'}, RECURSIVE_WARMUP),
+    Indicator(EMAIndicator, ('close',), {'window': 26},
+              {'trend_ema_slow': 'ema_indicator'}, RECURSIVE_WARMUP),
+    Indicator(VortexIndicator, ('high', 'low', 'close'), {'window': 14},
+              {'trend_vortex_ind_pos': 'vortex_indicator_pos',
+               'trend_vortex_ind_neg': 'vortex_indicator_neg',
+               'trend_vortex_ind_diff': 'vortex_indicator_diff'}, 15),
+    Indicator(TRIXIndicator, ('close',), {'window': 15},
+              {'trend_trix': 'trix'}, RECURSIVE_WARMUP),
+    Indicator(MassIndex, ('high', 'low'), {'window_fast': 9, 'window_slow': 25},
+              {'trend_mass_index': 'mass_index'}, RECURSIVE_WARMUP),
+    Indicator(DPOIndicator, ('close',), {'window': 20},
+              {'trend_dpo': 'dpo'}, 31),
+    Indicator(KSTIndicator, ('close',),
+              {'roc1': 10, 'roc2': 15, 'roc3': 20, 'roc4': 30,
+               'window1': 10, 'window2': 10, 'window3': 10, 'window4': 15, 'nsig': 9},
+              {'trend_kst': 'kst', 'trend_kst_sig': 'kst_sig', 'trend_kst_diff': 'kst_diff'}, 53),
+    Indicator(IchimokuIndicator, ('high', 'low'),
+              {'window1': 9, 'window2': 26, 'window3': 52, 'visual': False},
+              {'trend_ichimoku_conv': 'ichimoku_conversion_line',
+               'trend_ichimoku_base': 'ichimoku_base_line',
+               'trend_ichimoku_a': 'ichimoku_a', 'trend_ichimoku_b': 'ichimoku_b'}, 52),
+    Indicator(STCIndicator, ('close',),
+              {'window_slow': 50, 'window_fast': 23, 'cycle': 10, 'smooth1': 3, 'smooth2': 3},
+              {'trend_stc': 'stc'}, RECURSIVE_WARMUP),
+    Indicator(FastADXIndicator, ('high', 'low', 'close'), {'window': 14},
+              {'trend_adx': 'adx', 'trend_adx_pos': 'adx_pos', 'trend_adx_neg': 'adx_neg'},
+              RECURSIVE_WARMUP),
+    Indicator(CCIIndicator, ('high', 'low', 'close'), {'window': 20, 'constant': 0.015},
+              {'trend_cci': 'cci'}, 20),
+    Indicator(IchimokuIndicator, ('high', 'low'),
+              {'window1': 9, 'window2': 26, 'window3': 52, 'visual': True},
+              {'trend_visual_ichimoku_a': 'ichimoku_a', 'trend_visual_ichimoku_b': 'ichimoku_b'}, 78),
+    Indicator(AroonIndicator, ('high', 'low'), {'window': 25},
+              {'trend_aroon_up': 'aroon_up', 'trend_aroon_down': 'aroon_down',
+               'trend_aroon_ind': 'aroon_indicator'}, 26),
+    Indicator(FastPSARIndicator, ('high', 'low', 'close'), {'step': 0.02, 'max_step': 0.20},
+              {'trend_psar_up': 'psar_up', 'trend_psar_down': 'psar_down',
+               'trend_psar_up_indicator': 'psar_up_indicator',
+               'trend_psar_down_indicator': 'psar_down_indicator'}, RECURSIVE_WARMUP),
+    # Momentum
+    Indicator(RSIIndicator, ('close',), {'window': 14},
+              {'momentum_rsi': 'rsi'}, RECURSIVE_WARMUP),
+    Indicator(StochRSIIndicator, ('close',), {'window': 14, 'smooth1': 3, 'smooth2': 3},
+              {'momentum_stoch_rsi': 'stochrsi', 'momentum_stoch_rsi_k': 'stochrsi_k',
+               'momentum_stoch_rsi_d': 'stochrsi_d'}, RECURSIVE_WARMUP),
+    Indicator(TSIIndicator, ('close',), {'window_slow': 25, 'window_fast': 13},
+              {'momentum_tsi': 'tsi'}, RECURSIVE_WARMUP),
+    Indicator(UltimateOscillator, ('high', 'low', 'close'),
+              {'window1': 7, 'window2': 14, 'window3': 28,
+               'weight1': 4.0, 'weight2': 2.0, 'weight3': 1.0},
+              {'momentum_uo': 'ultimate_oscillator'}, 29),
+    Indicator(StochasticOscillator, ('high', 'low', 'close'), {'window': 14, 'smooth_window': 3},
+              {'momentum_stoch': 'stoch', 'momentum_stoch_signal': 'stoch_signal'}, 16),
+    Indicator(WilliamsRIndicator, ('high', 'low', 'close'), {'lbp': 14},
+              {'momentum_wr': 'williams_r'}, 14),
+    Indicator(AwesomeOscillatorIndicator, ('high', 'low'), {'window1': 5, 'window2': 34},
+              {'momentum_ao': 'awesome_oscillator'}, 34),
+    Indicator(ROCIndicator, ('close',), {'window': 12},
+              {'momentum_roc': 'roc'}, 13),
+    Indicator(PercentagePriceOscillator, ('close',),
+              {'window_slow': 26, 'window_fast': 12, 'window_sign': 9},
+              {'momentum_ppo': 'ppo', 'momentum_ppo_signal': 'ppo_signal',
+               'momentum_ppo_hist': 'ppo_hist'}, RECURSIVE_WARMUP),
+    Indicator(PercentageVolumeOscillator, ('volume',),
+              {'window_slow': 26, 'window_fast': 12, 'window_sign': 9},
+              {'momentum_pvo': 'pvo', 'momentum_pvo_signal': 'pvo_signal',
+               'momentum_pvo_hist': 'pvo_hist'}, RECURSIVE_WARMUP),
+    Indicator(KAMAIndicator, ('close',), {'window': 10, 'pow1': 2, 'pow2': 30},
+              {'momentum_kama': 'kama'}, RECURSIVE_WARMUP),
+    # Others
+    Indicator(DailyReturnIndicator, ('close',), {},
+              {'others_dr': 'daily_return'}, 2),
+    Indicator(DailyLogReturnIndicator, ('close',), {},
+              {'others_dlr': 'daily_log_return'}, 2),
+    Indicator(CumulativeReturnIndicator, ('close',), {},
+              {'others_cr': 'cumulative_return'}, None),
+]
+
+# Columns of ta.add_all_ta_features, in order
+TA_FEATURES = [column for indicator in TA_INDICATORS for column in indicator.outputs]
+
+_model = None
+_predictor = None
+_model_lock = threading.Lock()
+
+
+def get_model(path=MODEL_PATH):
+    """
+    Load the pre-trained model on first use.
+
+    Args:
+        path (str): Path of the joblib model file
+
+    Returns:
+        The trained classifier
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = joblib.load(path)
+    return _model
+
+
+def model_features(model):
+    """
+    Get the feature columns the model was trained on, in training order.
+
+    Models fitted on a DataFrame record their columns; otherwise the columns of
+    ta.add_all_ta_features on an OHLCV frame (without 'timestamp') are assumed.
+
+    Returns:
+        list: Feature column names
+    """
+    names = getattr(model, 'feature_names_in_', None)
+    if names is not None:
+        return list(names)
+    features = OHLCV_FEATURES + TA_FEATURES
+    n_features = getattr(model, 'n_features_in_', len(features))
+    if n_features != len(features):
+        raise ValueError(f"Model expects {n_features} features but its feature names are unknown")
+    return features
+
+
+def split_features(model, n_features):
+    """
+    Get the indices of the features the model splits on.
+
+    Tree ensembles never read a feature that none of their nodes splits on, so
+    the value of such a feature does not affect the prediction. Other models
+    use all features.
+
+    Args:
+        model: Trained classifier
+        n_features (int): Number of model features
+
+    Returns:
+        np.ndarray: Sorted feature indices
+    """
+    if hasattr(model, 'tree_'):
+        trees = [model.tree_]
+    else:
+        trees = [estimator.tree_ for estimator in np.ravel(getattr(model, 'estimators_', []))
+                 if hasattr(estimator, 'tree_')]
+    if not trees:
+        return np.arange(n_features)
+    used = np.concatenate([tree.feature[tree.feature >= 0] for tree in trees])
+    return np.unique(used)
+
+
+def latest_indicators(df, indicators):
+    """
+    Compute the latest value of ta indicators.
+
+    Each indicator runs on the shortest tail of the frame that covers its
+    warm-up; indicators depending on the whole history run on the full frame.
+
+    Args:
+        df (pd.DataFrame): OHLCV data ordered by time
+        indicators (list): Indicator entries of TA_INDICATORS
+
+    Returns:
+        dict: Latest value of each indicator column
+    """
+    values = {}
+    for indicator in indicators:
+        source = df if indicator.warmup is None else df.iloc[-indicator.warmup:]
+        # Some ta indicators index their input by label, so pass a 0-based index
+        instance = indicator.cls(**{name: source[name].reset_index(drop=True) for name in indicator.inputs},
+                                 **indicator.params)
+        for column, method in indicator.outputs.items():
+            values[column] = getattr(instance, method)().iloc[-1]
+    return values
+
+
+class SignalPredictor:
+    """
+    Scores the latest candle of an OHLCV frame with the trained model,
+    computing only the features the model uses.
+    """
+
+    def __init__(self, model):
+        """
+        Args:
+            model: Trained classifier using ta.add_all_ta_features columns
+        """
+        self.model = model
+        self.features = model_features(model)
+        used = split_features(model, len(self.features))
+        self.used_features = [self.features[i] for i in used]
+
+        used_set = set(self.used_features)
+        self.indicators = [indicator for indicator in TA_INDICATORS
+                           if used_set.intersection(indicator.outputs)]
+        self.input_features = [feature for feature in self.used_features if feature not in TA_FEATURES]
+
+    def latest_features(self, df):
+        """
+        Compute the features of the latest candle. Features the model never
+        splits on are set to 0.
+
+        Args:
+            df (pd.DataFrame): OHLCV data ordered by time
+
+        Returns:
+            pd.DataFrame: One feature row in model order
+        """
+        values = latest_indicators(df, self.indicators)
+        for feature in self.input_features:
+            values[feature] = df[feature].iloc[-1]
+        row = [values[feature] if feature in values else 0.0 for feature in self.features]
+        return pd.DataFrame([row], columns=self.features, index=df.index[-1:], dtype=np.float64)
+
+    def predict(self, df):
+        """
+        Predict the class of the latest candle.
+
+        Args:
+            df (pd.DataFrame): OHLCV data ordered by time
+
+        Returns:
+            The predicted class label
+
+        Raises:
+            ValueError: If the frame is too short to compute the used features
+        """
+        X = self.latest_features(df)
+        missing = X[self.used_features].columns[X[self.used_features].isna().iloc[0]]
+        if len(missing):
+            raise ValueError(f"Not enough data to compute the model features: {', '.join(missing)}")
+        if getattr(self.model, 'feature_names_in_', None) is None:
+            X = X.to_numpy()
+        return self.model.predict(X)[0]
+
+
+def get_predictor():
+    """
+    Returns:
+        SignalPredictor: Predictor for the model, built on first use
+    """
+    global _predictor
+    if _predictor is None:
+        model = get_model()
+        with _model_lock:
+            if _predictor is None:
+                _predictor = SignalPredictor(model)
+    return _predictor
 
-# Load the pre-trained machine learning model
-model = joblib.load("model.pkl")
 
 def predict_signal(df):
     """
     Predicts trading signals (buy/sell) based on the input dataframe.
-    
+
     Args:
         df (pandas.DataFrame): Input dataframe containing OHLCV data
-        
+
     Returns:
         str: 'buy' if prediction is 1, 'sell' if prediction is 0
     """
-    # Add technical analysis features to the dataframe
-    df = ta.add_all_ta_features(df, "open", "high", "low", "close", "volume")
-    df = df.dropna()
-    
-    # Get the latest data point for prediction
-    latest = df.iloc[-1:]
-    
-    # Prepare features by dropping timestamp column
-    X = latest.drop(['timestamp'], axis=1, errors='ignore')
-    
-    # Make prediction and convert to trading signal
-    prediction = model.predict(X)[0]
+    prediction = get_predictor().predict(df)
     return "buy" if prediction == 1 else "sell"
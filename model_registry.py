@@ -0,0 +1,256 @@
+"""
+This module implements a versioned on-disk registry for the trained model.
+
+Each training run is published as a new, immutable version directory holding
+the joblib model and scaler, the compiled NumPy arrays (see compiled_model) and
+a manifest with the feature list, metrics and SHA-256 checksums of every
+artifact. A version is written under a temporary name and renamed into place
+once complete, and the CURRENT pointer file is swapped with os.replace, so a
+reader always sees either the old or the new version, never a partial one.
+
+Artifacts are loaded memory-mapped (joblib.load(mmap_mode='r') and np.load
+with mmap_mode='r'), so several bot processes serving the same version share
+one copy of the arrays through the page cache.
+
+Layout:
+    <root>/CURRENT
+    <root>/versions/<version>/manifest.json
+    <root>/versions/<version>/model.joblib
+    <root>/versions/<version>/scaler.joblib
+    <root>/versions/<version>/compiled/<array>.npy
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from collections import namedtuple
+
+import joblib
+import numpy as np
+
+from compiled_model import COMPILED_ARRAYS, load_compiled_model
+
+REGISTRY_DIR = 'model_registry'
+MANIFEST_FILENAME = 'manifest.json'
+CURRENT_FILENAME = 'CURRENT'
+
+# A model version loaded from the registry; swapped as one object so the model,
+# scaler and feature list always belong to the same version
+LoadedModel = namedtuple('LoadedModel', ['version', 'model', 'scaler', 'features', 'manifest'])
+
+
+def file_checksum(path, chunk_size=1 << 20):
+    """
+    Compute the SHA-256 checksum of a file.
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Versioned model store with an atomically switched current version.
+    """
+
+    def __init__(self, root=REGISTRY_DIR):
+        """
+        Args:
+            root (str): Root directory of the registry
+        """
+        self.root = root
+        self.versions_dir = os.path.join(root, 'versions')
+
+    def _version_dir(self, version):
+        return os.path.join(self.versions_dir, version)
+
+    def list_versions(self):
+        """
+        Returns:
+            list: Published versions, oldest first
+        """
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.versions_dir)
+            if os.path.exists(os.path.join(self.versions_dir, name, MANIFEST_FILENAME))
+        )
+
+    def current_version(self):
+        """
+        Returns:
+            str: Version the CURRENT pointer refers to, or None if nothing is published
+        """
+        try:
+            with open(os.path.join(self.root, CURRENT_FILENAME)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def set_current(self, version):
+        """
+        Atomically point CURRENT at a published version.
+
+        Args:
+            version (str): Version to activate
+        """
+        if version not in self.list_versions():
+            raise ValueError(f"Unknown model version: {version}")
+        path = os.path.join(self.root, CURRENT_FILENAME)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _new_version(self):
+        """Generate a version name that sorts after all existing versions."""
+        version = time.strftime('v%Y%m%d_%H%M%S')
+        existing = set(self.list_versions())
+        suffix = 1
+        candidate = version
+        while candidate in existing or os.path.exists(self._version_dir(candidate)):
+            candidate = f'{version}_{suffix}'
+            suffix += 1
+        return candidate
+
+    def publish(self, model, scaler, features, metrics=None, compiled=None, activate=True):
+        """
+        Publish a trained model as a new version.
+
+        Args:
+            model: Trained classifier
+            scaler: Fitted feature scaler
+            features (list): Feature columns in training order
+            metrics (dict, optional): Evaluation metrics stored in the manifest
+            compiled (dict, optional): Compiled model arrays (train_model.flatten_forest)
+            activate (bool): Point CURRENT at the new version
+
+        Returns:
+            str: The new version
+        """
+        os.makedirs(self.versions_dir, exist_ok=True)
+        version = self._new_version()
+        tmp_dir = os.path.join(self.versions_dir, f'.{version}.tmp')
+        os.makedirs(tmp_dir)
+        try:
+            # Uncompressed joblib files can be memory-mapped on load
+            joblib.dump(model, os.path.join(tmp_dir, 'model.joblib'))
+            joblib.dump(scaler, os.path.join(tmp_dir, 'scaler.joblib'))
+            artifacts = ['model.joblib', 'scaler.joblib']
+
+            if compiled is not None:
+                os.makedirs(os.path.join(tmp_dir, 'compiled'))
+                for name in COMPILED_ARRAYS:
+                    np.save(os.path.join(tmp_dir, 'compiled', f'{name}.npy'), compiled[name])
+                    artifacts.append(f'compiled/{name}.npy')
+
+            manifest = {
+                'version': version,
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'features': list(features),
+                'metrics': metrics or {},
+                'checksums': {
+                    name: file_checksum(os.path.join(tmp_dir, name)) for name in artifacts
+                },
+            }
+            with open(os.path.join(tmp_dir, MANIFEST_FILENAME), 'w') as f:
+                json.dump(manifest, f, indent=2)
+
+            # The version becomes visible only once all of its files are complete
+            os.rename(tmp_dir, self._version_dir(version))
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        if activate:
+            self.set_current(version)
+        logging.info(f"Published model version {version}")
+        return version
+
+    def prune(self, keep):
+        """
+        Delete all but the newest `keep` versions. The current version is never deleted.
+
+        Args:
+            keep (int): Number of versions to keep
+
+        Returns:
+            list: Deleted versions
+        """
+        current = self.current_version()
+        versions = self.list_versions()
+        removable = [version for version in versions[:max(0, len(versions) - keep)]
+                     if version != current]
+        for version in removable:
+            shutil.rmtree(self._version_dir(version), ignore_errors=True)
+        return removable
+
+    def manifest(self, version):
+        """
+        Returns:
+            dict: Manifest of a published version
+        """
+        with open(os.path.join(self._version_dir(version), MANIFEST_FILENAME)) as f:
+            return json.load(f)
+
+    def verify(self, version):
+        """
+        Check the artifacts of a version against the checksums in its manifest.
+
+        Raises:
+            ValueError: If an artifact is missing or does not match its checksum
+        """
+        directory = self._version_dir(version)
+        for name, checksum in self.manifest(version)['checksums'].items():
+            path = os.path.join(directory, name)
+            if not os.path.exists(path) or file_checksum(path) != checksum:
+                raise ValueError(f"Checksum mismatch for {name} in model version {version}")
+
+    def load(self, version=None, compiled=True, mmap_mode='r', verify=True):
+        """
+        Load a model version.
+
+        Args:
+            version (str, optional): Version to load (defaults to CURRENT)
+            compiled (bool): Use the compiled NumPy model when the version has one
+            mmap_mode (str, optional): Memory-map mode for the artifacts
+            verify (bool): Verify artifact checksums before loading
+
+        Returns:
+            LoadedModel: The loaded version, or None if nothing is published
+        """
+        version = version or self.current_version()
+        if version is None:
+            return None
+        if verify:
+            self.verify(version)
+
+        manifest = self.manifest(version)
+        directory = self._version_dir(version)
+        compiled_dir = os.path.join(directory, 'compiled')
+        if compiled and os.path.isdir(compiled_dir):
+            model, scaler, _ = load_compiled_model(compiled_dir, mmap_mode=mmap_mode)
+        else:
+            model = joblib.load(os.path.join(directory, 'model.joblib'), mmap_mode=mmap_mode)
+            scaler = joblib.load(os.path.join(directory, 'scaler.joblib'), mmap_mode=mmap_mode)
+        return LoadedModel(version, model, scaler, manifest['features'], manifest)
+
+
+if __name__ == '__main__':
+    # List published versions and their metrics
+    registry = ModelRegistry()
+    current = registry.current_version()
+    for version in registry.list_versions():
+        manifest = registry.manifest(version)
+        marker = '*' if version == current else ' '
+        print(f"{marker} {version}  {len(manifest['features'])} features  {manifest['metrics']}")
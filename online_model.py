@@ -0,0 +1,227 @@
+"""
+This module implements an online-learning variant of the trading model.
+
+Instead of refitting a random forest on the whole history, an SGDClassifier
+(logistic loss, so it provides predict_proba) and a StandardScaler are updated
+with partial_fit on the rows labelled since the previous update. Only a bounded
+tail of candles is kept between updates: enough to warm up the indicators of
+calculate_technical_features and to label rows once their future price is
+known. Memory use therefore does not grow with the length of the history.
+
+Usage (e.g. hourly from cron):
+    python online_model.py --symbol BTCUSDT --interval 1h
+"""
+
+import argparse
+import logging
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+
+from candle_store import CandleStore
+from features import calculate_technical_features
+from model_registry import ModelRegistry
+from train_model import (
+    SYMBOL, INTERVAL, DATA_START_STRING, CANDLE_STORE_DIR, MODEL_REGISTRY_DIR,
+    TARGET_SHIFT_PERIODS, PRICE_CHANGE_THRESHOLD, LABELS,
+    create_target_variable, sync_historical_data
+)
+
+ONLINE_STATE_FILENAME = 'online_model_state.joblib'  # Persisted learner between runs
+WARMUP_CANDLES = 300  # Candles kept before the first unlabelled row to warm up the indicators
+CHUNK_SIZE = 10000  # Candles per update when training from the candle store
+MAX_KEPT_VERSIONS = 24  # Registry versions kept when publishing every update
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+class OnlineTradingModel:
+    """
+    Incrementally trained classifier over the technical features.
+    """
+
+    def __init__(self, shift_periods=TARGET_SHIFT_PERIODS, price_change_threshold=PRICE_CHANGE_THRESHOLD,
+                 warmup_candles=WARMUP_CANDLES, alpha=1e-4, random_state=42):
+        """
+        Args:
+            shift_periods (int): Number of periods to look ahead for the target
+            price_change_threshold (float): Minimum price change for a buy/sell label
+            warmup_candles (int): Candles kept for indicator warm-up
+            alpha (float): L2 regularization strength of the SGD classifier
+            random_state (int): Seed of the SGD classifier
+        """
+        self.shift_periods = shift_periods
+        self.price_change_threshold = price_change_threshold
+        self.warmup_candles = warmup_candles
+        self.model = SGDClassifier(loss='log_loss', alpha=alpha, random_state=random_state)
+        self.scaler = StandardScaler()
+        self.feature_columns = None
+        self.class_counts = np.zeros(len(LABELS))
+        self.rows_trained = 0
+        self.last_trained = None  # Timestamp of the newest row used for training
+        self._tail = pd.DataFrame(columns=OHLCV_COLUMNS)  # Candles kept between updates
+
+    def update(self, candles):
+        """
+        Add new candles and train on the rows that became labelled.
+
+        Args:
+            candles (pd.DataFrame): New OHLCV candles ordered by time; candles that
+                are not newer than the previous ones are ignored
+
+        Returns:
+            int: Number of rows trained on
+        """
+        candles = candles[OHLCV_COLUMNS].copy()
+        candles['timestamp'] = pd.to_datetime(candles['timestamp'])
+        if not self._tail.empty:
+            candles = candles[candles['timestamp'] > self._tail['timestamp'].iloc[-1]]
+        if candles.empty:
+            return 0
+
+        window = pd.concat([self._tail, candles], ignore_index=True) if not self._tail.empty else candles
+        window = window.reset_index(drop=True)
+        df = create_target_variable(calculate_technical_features(window.copy()),
+                                    self.shift_periods, self.price_change_threshold)
+        if self.feature_columns is None:
+            self.feature_columns = [col for col in df.columns if col not in OHLCV_COLUMNS + ['target']]
+
+        # Rows whose future price is known, that have all indicators and are new
+        labelled = df.iloc[:len(df) - self.shift_periods]
+        labelled = labelled.dropna(subset=self.feature_columns)
+        if self.last_trained is not None:
+            labelled = labelled[labelled['timestamp'] > self.last_trained]
+
+        trained = 0
+        if not labelled.empty:
+            trained = self._partial_fit(labelled[self.feature_columns].to_numpy(dtype=np.float64),
+                                        labelled['target'].to_numpy())
+            self.last_trained = labelled['timestamp'].iloc[-1]
+
+        # Keep the unlabelled rows plus enough history to warm up the indicators
+        self._tail = window.iloc[-(self.warmup_candles + self.shift_periods):].reset_index(drop=True)
+        return trained
+
+    def _partial_fit(self, X, y):
+        """Update the scaler and the classifier with one batch of labelled rows."""
+        # Weight classes inversely to their running frequency, like class_weight='balanced'
+        self.class_counts += np.array([(y == label).sum() for label in LABELS])
+        frequencies = self.class_counts / self.class_counts.sum()
+        class_weights = np.where(frequencies > 0, 1.0 / (len(LABELS) * np.maximum(frequencies, 1e-12)), 0.0)
+        sample_weight = class_weights[np.searchsorted(LABELS, y)]
+
+        self.scaler.partial_fit(X)
+        self.model.partial_fit(self.scaler.transform(X), y, classes=np.array(LABELS),
+                               sample_weight=sample_weight)
+        self.rows_trained += len(y)
+        return len(y)
+
+    def fit_store(self, store, symbol, interval, chunk_size=CHUNK_SIZE):
+        """
+        Train on the candles in a CandleStore newer than the last update, reading
+        them in bounded chunks.
+
+        Args:
+            store (CandleStore): Candle store
+            symbol (str): Trading pair symbol
+            interval (str): Candle interval
+            chunk_size (int): Candles read per update
+
+        Returns:
+            int: Number of rows trained on
+        """
+        start = None if self._tail.empty else self._tail['timestamp'].iloc[-1] + pd.Timedelta(milliseconds=1)
+        timestamps = store.read_arrays(symbol, interval, start=start)['timestamp']
+        trained = 0
+        for offset in range(0, len(timestamps), chunk_size):
+            end = timestamps[offset + chunk_size] if offset + chunk_size < len(timestamps) else None
+            trained += self.update(store.read(symbol, interval, start=int(timestamps[offset]),
+                                              end=None if end is None else int(end)))
+        return trained
+
+    @property
+    def is_fitted(self):
+        return self.rows_trained > 0
+
+    def predict_proba(self, X):
+        """
+        Args:
+            X (array-like): Unscaled feature rows
+
+        Returns:
+            np.ndarray: Class probabilities, columns ordered as self.model.classes_
+        """
+        return self.model.predict_proba(self.scaler.transform(np.asarray(X, dtype=np.float64)))
+
+    def save(self, path=ONLINE_STATE_FILENAME):
+        """Persist the learner and its candle tail atomically."""
+        tmp_path = f'{path}.tmp'
+        joblib.dump(self, tmp_path)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path=ONLINE_STATE_FILENAME, **kwargs):
+        """
+        Load a persisted learner, or create a new one if none exists.
+
+        Args:
+            path (str): State file
+            **kwargs: OnlineTradingModel parameters for a new learner
+
+        Returns:
+            OnlineTradingModel: The learner
+        """
+        if os.path.exists(path):
+            return joblib.load(path)
+        return OnlineTradingModel(**kwargs)
+
+
+def main():
+    """
+    Sync the newest candles, update the online model with them and publish it
+    to the model registry.
+    """
+    parser = argparse.ArgumentParser(description='Incrementally update the online trading model')
+    parser.add_argument('--symbol', default=SYMBOL, help='Trading pair symbol')
+    parser.add_argument('--interval', default=INTERVAL, help='Candle interval')
+    parser.add_argument('--start', default=DATA_START_STRING, help='History start for the first run')
+    parser.add_argument('--state', default=ONLINE_STATE_FILENAME, help='Online model state file')
+    parser.add_argument('--no-sync', action='store_true', help='Use only candles already in the store')
+    parser.add_argument('--no-publish', action='store_true', help='Do not publish to the model registry')
+    args = parser.parse_args()
+
+    store = CandleStore(CANDLE_STORE_DIR)
+    if not args.no_sync:
+        added = sync_historical_data(args.symbol, args.interval, args.start, store)
+        print(f"Stored {added} new candles for {args.symbol} {args.interval}")
+
+    online = OnlineTradingModel.load(args.state)
+    trained = online.fit_store(store, args.symbol, args.interval)
+    print(f"Trained on {trained} new rows ({online.rows_trained} in total)")
+    if trained == 0:
+        return
+    online.save(args.state)
+
+    if args.no_publish or not online.is_fitted:
+        return
+    registry = ModelRegistry(MODEL_REGISTRY_DIR)
+    metrics = {
+        'learner': 'online_sgd',
+        'rows_trained': int(online.rows_trained),
+        'last_trained': str(online.last_trained),
+        'class_counts': dict(zip(map(str, LABELS), online.class_counts.astype(int).tolist())),
+        'symbol': args.symbol,
+        'interval': args.interval,
+    }
+    version = registry.publish(online.model, online.scaler, online.feature_columns, metrics)
+    registry.prune(keep=MAX_KEPT_VERSIONS)
+    print(f"Model version {version} published and activated.")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
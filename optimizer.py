@@ -0,0 +1,272 @@
+"""
+This module implements a parallel parameter-sweep optimizer for the strategy weights
+and the buy/sell thresholds used by strategy.generate_signal.
+
+The indicator sub-signals are computed once in the parent process and placed in
+shared memory; worker processes in a ProcessPoolExecutor attach to that memory
+instead of receiving pickled DataFrames, so each task only transfers a small batch
+of parameter sets and returns their metrics. Ranked results are written to disk.
+
+Usage:
+    python optimizer.py --interval 1m --mode random --samples 5000 --workers 32
+"""
+
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest import (
+    DATA_DIR, SUB_SIGNAL_NAMES, load_cached_candles, compute_indicator_arrays,
+    compute_sub_signals, combine_signals, simulate_positions, compute_metrics
+)
+from config import STOP_LOSS_PCT, TAKE_PROFIT_PCT, INTERVAL_SECONDS
+
+RESULTS_DIR = 'optimizer_results'  # Output directory for ranked results
+BATCH_SIZE = 64  # Parameter sets evaluated per task
+
+# Grid search values
+WEIGHT_GRID = [0.0, 0.1, 0.2, 0.3]
+THRESHOLD_GRID = [0.2, 0.3, 0.4]
+
+# Arrays attached from shared memory in each worker process
+_worker_state = {}
+
+
+def _share_array(array):
+    """
+    Copy an array into a new shared memory block.
+
+    Returns:
+        tuple: (SharedMemory, descriptor dict that workers use to attach)
+    """
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    view = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+    view[...] = array
+    return shm, {'name': shm.name, 'shape': array.shape, 'dtype': array.dtype.str}
+
+
+def _attach_array(descriptor):
+    """
+    Attach to a shared array created by _share_array.
+
+    Returns:
+        tuple: (SharedMemory, np.ndarray view)
+    """
+    try:
+        # Python 3.13+: workers must not unlink the parent's segment on exit
+        shm = shared_memory.SharedMemory(name=descriptor['name'], track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=descriptor['name'])
+    array = np.ndarray(descriptor['shape'], dtype=np.dtype(descriptor['dtype']), buffer=shm.buf)
+    return shm, array
+
+
+def _init_worker(descriptors, interval, stop_loss_pct, take_profit_pct, fee_pct):
+    """
+    Process pool initializer: attach the shared arrays once per worker.
+    """
+    for key, descriptor in descriptors.items():
+        shm, array = _attach_array(descriptor)
+        _worker_state[key] = array
+        _worker_state[f'{key}_shm'] = shm  # Keep the mapping alive
+    _worker_state['interval'] = interval
+    _worker_state['stop_loss_pct'] = stop_loss_pct
+    _worker_state['take_profit_pct'] = take_profit_pct
+    _worker_state['fee_pct'] = fee_pct
+
+
+def _evaluate(params, sub_signals, close, interval, stop_loss_pct, take_profit_pct, fee_pct):
+    """
+    Backtest one parameter set.
+
+    Args:
+        params (dict): 'weights', 'buy_threshold' and 'sell_threshold'
+
+    Returns:
+        dict: Parameters and resulting metrics
+    """
+    signals = combine_signals(sub_signals, params['weights'],
+                              params['buy_threshold'], params['sell_threshold'])
+    result = simulate_positions(close, signals, stop_loss_pct, take_profit_pct, fee_pct)
+    metrics = compute_metrics(result, interval)
+
+    row = {f'w_{name}': weight for name, weight in zip(SUB_SIGNAL_NAMES, params['weights'])}
+    row['buy_threshold'] = params['buy_threshold']
+    row['sell_threshold'] = params['sell_threshold']
+    row.update(metrics)
+    return row
+
+
+def _evaluate_batch(batch):
+    """
+    Worker task: backtest a batch of parameter sets on the shared arrays.
+    """
+    state = _worker_state
+    return [
+        _evaluate(params, state['sub_signals'], state['close'], state['interval'],
+                  state['stop_loss_pct'], state['take_profit_pct'], state['fee_pct'])
+        for params in batch
+    ]
+
+
+def grid_parameters(weight_grid=WEIGHT_GRID, threshold_grid=THRESHOLD_GRID):
+    """
+    Generate every combination of sub-signal weights and symmetric thresholds.
+
+    Args:
+        weight_grid (list): Candidate values for each weight
+        threshold_grid (list): Candidate values for the buy threshold (sell = -buy)
+
+    Yields:
+        dict: Parameter set
+    """
+    for weights in itertools.product(weight_grid, repeat=len(SUB_SIGNAL_NAMES)):
+        if sum(weights) <= 0:
+            continue
+        for threshold in threshold_grid:
+            yield {'weights': list(weights), 'buy_threshold': threshold, 'sell_threshold': -threshold}
+
+
+def random_parameters(samples, seed=None):
+    """
+    Draw random parameter sets: weights from a flat Dirichlet distribution and
+    independent buy/sell thresholds.
+
+    Args:
+        samples (int): Number of parameter sets
+        seed (int, optional): Random seed
+
+    Yields:
+        dict: Parameter set
+    """
+    rng = np.random.default_rng(seed)
+    for _ in range(samples):
+        yield {
+            'weights': rng.dirichlet(np.ones(len(SUB_SIGNAL_NAMES))).round(4).tolist(),
+            'buy_threshold': round(float(rng.uniform(0.05, 0.6)), 4),
+            'sell_threshold': -round(float(rng.uniform(0.05, 0.6)), 4),
+        }
+
+
+def _batches(iterable, size):
+    """Split an iterable into lists of at most `size` items."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def optimize(df, parameters, interval='1m', workers=None, rank_by='sharpe_ratio',
+             stop_loss_pct=STOP_LOSS_PCT, take_profit_pct=TAKE_PROFIT_PCT, fee_pct=0.0,
+             batch_size=BATCH_SIZE):
+    """
+    Evaluate parameter sets in parallel and rank them.
+
+    Args:
+        df (pd.DataFrame): OHLCV data ordered by time
+        parameters (iterable): Parameter sets (see grid_parameters/random_parameters)
+        interval (str): Candle interval of the data
+        workers (int, optional): Number of worker processes (defaults to CPU count)
+        rank_by (str): Metric used to sort the results (descending)
+        stop_loss_pct (float): Stop loss fraction
+        take_profit_pct (float): Take profit fraction
+        fee_pct (float): Fee per side as a fraction of notional
+        batch_size (int): Parameter sets per task
+
+    Returns:
+        pd.DataFrame: One row per parameter set, best first
+    """
+    indicators = compute_indicator_arrays(df)
+    arrays = {
+        'sub_signals': np.ascontiguousarray(compute_sub_signals(indicators)),
+        'close': np.ascontiguousarray(indicators['close']),
+    }
+
+    segments = []
+    try:
+        descriptors = {}
+        for key, array in arrays.items():
+            shm, descriptors[key] = _share_array(array)
+            segments.append(shm)
+
+        rows = []
+        with ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(),
+            initializer=_init_worker,
+            initargs=(descriptors, interval, stop_loss_pct, take_profit_pct, fee_pct)
+        ) as executor:
+            futures = [executor.submit(_evaluate_batch, batch)
+                       for batch in _batches(parameters, batch_size)]
+            for future in as_completed(futures):
+                rows.extend(future.result())
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+    results = pd.DataFrame(rows)
+    if results.empty:
+        return results
+    return results.sort_values(rank_by, ascending=False).reset_index(drop=True)
+
+
+def save_results(results, symbol, interval, results_dir=RESULTS_DIR):
+    """
+    Write ranked results to a timestamped CSV file.
+
+    Returns:
+        str: Path of the written file
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    timestamp = time.strftime('%Y%m%d_%H%M%S')
+    path = os.path.join(results_dir, f'{symbol}_{interval}_{timestamp}.csv')
+    results.to_csv(path, index=False)
+    return path
+
+
+def main():
+    """
+    Run a parameter sweep on the cached candles and save the ranked results.
+    """
+    parser = argparse.ArgumentParser(description='Optimize strategy weights and thresholds')
+    parser.add_argument('--symbol', default='BTCUSDT', help='Trading pair symbol')
+    parser.add_argument('--interval', default='1m', choices=sorted(INTERVAL_SECONDS), help='Candle interval')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='Directory with cached candle CSVs')
+    parser.add_argument('--mode', choices=['grid', 'random'], default='random', help='Search mode')
+    parser.add_argument('--samples', type=int, default=1000, help='Parameter sets for random search')
+    parser.add_argument('--seed', type=int, default=None, help='Random search seed')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--rank-by', default='sharpe_ratio', help='Metric used to rank results')
+    parser.add_argument('--fee', type=float, default=0.0, help='Fee per side as a fraction of notional')
+    args = parser.parse_args()
+
+    df = load_cached_candles(args.symbol, args.interval, args.data_dir)
+    print(f"Loaded {len(df)} {args.interval} candles for {args.symbol}")
+
+    if args.mode == 'grid':
+        parameters = grid_parameters()
+    else:
+        parameters = random_parameters(args.samples, args.seed)
+
+    start = time.perf_counter()
+    results = optimize(df, parameters, args.interval, args.workers, args.rank_by, fee_pct=args.fee)
+    elapsed = time.perf_counter() - start
+    print(f"Evaluated {len(results)} parameter sets in {elapsed:.2f}s")
+
+    if results.empty:
+        return
+    path = save_results(results, args.symbol, args.interval)
+    print(f"Results saved to {path}")
+    print(results.head(10).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,420 @@
+"""
+This module provides the shared Solana RPC gateway.
+
+One RpcGateway exists per RPC endpoint (see get_gateway) and every component
+talks to the node through it: the solana-py Clients of app.py, TradingBot and
+WalletManager (built with RpcGateway.client) and the raw JSON-RPC calls of
+WalletManager. The gateway owns a single pooled httpx.Client, so connections
+are kept alive and reused instead of each component paying its own TCP/TLS
+setup, and HTTP/2 is negotiated when the optional `h2` package is installed.
+
+Requests are limited to `max_concurrency` in flight, retried with exponential
+backoff on connection errors, HTTP 429 and 5xx responses (config.MAX_RETRIES
+retries), and timed per JSON-RPC method (see RpcGateway.metrics).
+
+Read-only methods (CACHED_METHODS) are served from a short-lived response
+cache keyed by method and params. The TTL depends on the requested commitment:
+a processed read may change with every slot, a finalized one lags the cluster
+and changes more slowly. Identical requests made while one is in flight wait
+for its response instead of being sent again. Sending a transaction through
+the gateway clears the cache, so our own writes are visible to the next read.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import httpx
+from solana.rpc.api import Client
+from solana.rpc.providers.http import HTTPProvider
+
+from config import SOLANA_NETWORKS, DEFAULT_NETWORK, MAX_RETRIES
+
+try:
+    import h2  # noqa: F401  (HTTP/2 support for httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+RPC_TIMEOUT = 10  # Seconds per request attempt
+MAX_CONNECTIONS = 20  # Pooled connections per endpoint
+MAX_KEEPALIVE_CONNECTIONS = 10  # Idle connections kept open per endpoint
+MAX_CONCURRENCY = 16  # Requests in flight per endpoint
+RETRY_BACKOFF = 0.5  # Seconds before the first retry, doubled on each further retry
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Idempotent read methods served from the response cache
+CACHED_METHODS = {
+    'getAccountInfo', 'getBalance', 'getMultipleAccounts', 'getSignaturesForAddress',
+    'getTokenAccountBalance', 'getTokenAccountsByOwner', 'getTokenSupply',
+}
+# Methods that change state we may have cached; they clear the cache
+WRITE_METHODS = {'sendTransaction', 'requestAirdrop'}
+# Seconds a cached response is fresh, per commitment (the node's default is finalized)
+COMMITMENT_TTLS = {'processed': 0.4, 'confirmed': 2.0, 'finalized': 10.0}
+MAX_CACHED_RESPONSES = 1024
+
+
+class RpcError(Exception):
+    """Error returned by the RPC node for a JSON-RPC request."""
+
+
+class RpcGateway:
+    """
+    Pooled, rate-limited and instrumented HTTP transport to one RPC endpoint.
+    """
+
+    def __init__(self, rpc_url, max_connections=MAX_CONNECTIONS,
+                 max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                 max_concurrency=MAX_CONCURRENCY, max_retries=MAX_RETRIES,
+                 retry_backoff=RETRY_BACKOFF, timeout=RPC_TIMEOUT, http2=True):
+        """
+        Args:
+            rpc_url (str): RPC endpoint
+            max_connections (int): Maximum pooled connections
+            max_keepalive_connections (int): Maximum idle connections kept alive
+            max_concurrency (int): Maximum requests in flight
+            max_retries (int): Retries of a failed request
+            retry_backoff (float): Seconds before the first retry
+            timeout (float): Seconds per request attempt
+            http2 (bool): Use HTTP/2 when the h2 package is installed
+        """
+        self.rpc_url = rpc_url
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        if http2 and not HTTP2_AVAILABLE:
+            logging.warning(f"h2 is not installed, RPC gateway for {rpc_url} falls back to HTTP/1.1 "
+                            f"(pip install 'httpx[http2]')")
+        self.session = httpx.Client(
+            http2=http2 and HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_keepalive_connections),
+            timeout=timeout
+        )
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._metrics = {}  # label -> {'calls', 'errors', 'retries', 'total_time', 'max_time', ...}
+        self._metrics_lock = threading.Lock()
+        self._request_ids = iter(range(1, 1 << 62))
+        self._cache = OrderedDict()  # (method, params) -> (parsed response body, expiry), oldest first
+        self._in_flight = {}  # (method, params) -> Future of the body of the request being sent
+        self._cache_lock = threading.Lock()
+        self._cache_generation = 0  # Bumped by invalidate, so older responses are not stored
+
+    def send(self, request_kwargs, label):
+        """
+        POST a request to the endpoint, retrying transient failures.
+
+        Args:
+            request_kwargs (dict): httpx.Client.post arguments (url, headers, content or json)
+            label (str): Metrics label, normally the JSON-RPC method
+
+        Returns:
+            httpx.Response: Successful response
+
+        Raises:
+            httpx.HTTPError: If the last attempt failed
+        """
+        start = time.perf_counter()
+        retries = 0
+        try:
+            while True:
+                try:
+                    with self._semaphore:
+                        response = self.session.post(**request_kwargs)
+                    if response.status_code not in RETRY_STATUS_CODES or retries >= self.max_retries:
+                        response.raise_for_status()
+                        break
+                except httpx.TransportError as e:
+                    if retries >= self.max_retries:
+                        raise
+                    logging.warning(f"RPC {label} to {self.rpc_url} failed ({e}), retrying")
+                # Back off outside the semaphore so other requests can proceed
+                time.sleep(self.retry_backoff * 2 ** retries)
+                retries += 1
+        except httpx.HTTPError:
+            self._record(label, time.perf_counter() - start, retries, error=True)
+            raise
+        self._record(label, time.perf_counter() - start, retries, error=False)
+        return response
+
+    def request(self, request_kwargs, method, params, request_id=None):
+        """
+        Send a single JSON-RPC request through the response cache.
+
+        Read-only methods are answered from the cache while fresh, and joined to
+        an identical request already in flight. Write methods clear the cache.
+
+        Args:
+            request_kwargs (dict): httpx.Client.post arguments
+            method (str): JSON-RPC method
+            params (list): JSON-RPC params
+            request_id (optional): JSON-RPC id of the request, set in responses
+                served from the cache or from another caller's request
+
+        Returns:
+            httpx.Response: The (possibly cached) response
+        """
+        if method in WRITE_METHODS:
+            try:
+                return self.send(request_kwargs, method)
+            finally:
+                self.invalidate()
+        if method not in CACHED_METHODS:
+            return self.send(request_kwargs, method)
+
+        key = (method, json.dumps(params, sort_keys=True))
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None and time.monotonic() < entry[1]:
+                self._count(method, 'cache_hits')
+                return _replay(entry[0], request_id)
+            future = self._in_flight.get(key)
+            if future is None:
+                future = Future()
+                self._in_flight[key] = future
+                generation = self._cache_generation
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            self._count(method, 'coalesced')
+            return _replay(future.result(), request_id)
+
+        try:
+            response = self.send(request_kwargs, method)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._cache_lock:
+                if self._in_flight.get(key) is future:
+                    del self._in_flight[key]
+        try:
+            body = response.json()
+        except ValueError as e:
+            future.set_exception(RpcError(f"{method} returned an invalid response: {e}"))
+            return response
+        with self._cache_lock:
+            # Responses requested before an invalidation may predate our own writes
+            if 'error' not in body and generation == self._cache_generation:
+                self._cache[key] = (body, time.monotonic() + _commitment_ttl(params))
+                self._cache.move_to_end(key)
+                while len(self._cache) > MAX_CACHED_RESPONSES:
+                    self._cache.popitem(last=False)
+        future.set_result(body)
+        return response
+
+    def invalidate(self):
+        """Drop all cached responses, e.g. after sending a transaction."""
+        with self._cache_lock:
+            self._cache.clear()
+            # Requests still in flight are not joined or cached any more
+            self._in_flight.clear()
+            self._cache_generation += 1
+
+    def call(self, method, params=None):
+        """
+        Send a single JSON-RPC request.
+
+        Returns:
+            The 'result' of the response
+
+        Raises:
+            RpcError: If the node returns an error
+        """
+        params = params or []
+        request_id = next(self._request_ids)
+        response = self.request({'url': self.rpc_url, 'json': {
+            'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params
+        }}, method, params, request_id)
+        body = response.json()
+        if 'error' in body:
+            raise RpcError(f"{method} failed: {body['error']}")
+        return body['result']
+
+    def batch(self, calls):
+        """
+        Send several JSON-RPC requests in one HTTP request.
+
+        Args:
+            calls (list): (method, params) tuples
+
+        Returns:
+            list: Result of each call in order, None for calls that failed
+        """
+        if not calls:
+            return []
+        payload = [
+            {'jsonrpc': '2.0', 'id': i, 'method': method, 'params': params}
+            for i, (method, params) in enumerate(calls)
+        ]
+        label = _batch_label(method for method, _ in calls)
+        response = self.send({'url': self.rpc_url, 'json': payload}, label)
+
+        # Responses of a batch may arrive in any order
+        results = [None] * len(calls)
+        body = response.json()
+        if not isinstance(body, list):
+            # The node rejected the batch as a whole, e.g. with a single error object
+            error = body.get('error', body) if isinstance(body, dict) else body
+            logging.error(f"RPC {label} failed: {error}")
+            return results
+        for item in body:
+            if 'error' in item:
+                logging.error(f"{calls[item['id']][0]} failed: {item['error']}")
+            else:
+                results[item['id']] = item.get('result')
+        return results
+
+    def client(self, commitment=None):
+        """
+        Create a solana-py Client whose requests go through this gateway.
+
+        Args:
+            commitment (optional): Default commitment of the client
+
+        Returns:
+            Client: The client
+        """
+        client = Client(self.rpc_url, commitment=commitment)
+        client._provider = GatewayHTTPProvider(self)
+        return client
+
+    def _metrics_entry(self, label):
+        """Metrics of a label, created on first use (call with _metrics_lock held)."""
+        return self._metrics.setdefault(label, {
+            'calls': 0, 'errors': 0, 'retries': 0, 'cache_hits': 0, 'coalesced': 0,
+            'total_time': 0.0, 'max_time': 0.0
+        })
+
+    def _count(self, label, counter):
+        """Increment a counter of a label's metrics."""
+        with self._metrics_lock:
+            self._metrics_entry(label)[counter] += 1
+
+    def _record(self, label, elapsed, retries, error):
+        """Add one request to the metrics of its label."""
+        with self._metrics_lock:
+            entry = self._metrics_entry(label)
+            entry['calls'] += 1
+            entry['errors'] += int(error)
+            entry['retries'] += retries
+            entry['total_time'] += elapsed
+            entry['max_time'] = max(entry['max_time'], elapsed)
+
+    def metrics(self):
+        """
+        Get per-method request statistics.
+
+        Returns:
+            dict: Method -> requests sent, errors, retries, cache hits, coalesced
+            duplicates, and average and maximum latency in ms of the requests sent
+        """
+        with self._metrics_lock:
+            return {
+                label: {
+                    'calls': entry['calls'],
+                    'errors': entry['errors'],
+                    'retries': entry['retries'],
+                    'cache_hits': entry['cache_hits'],
+                    'coalesced': entry['coalesced'],
+                    'avg_ms': 1000 * entry['total_time'] / entry['calls'] if entry['calls'] else 0.0,
+                    'max_ms': 1000 * entry['max_time'],
+                }
+                for label, entry in self._metrics.items()
+            }
+
+    def close(self):
+        """Close the pooled connections."""
+        self.session.close()
+
+
+class GatewayHTTPProvider(HTTPProvider):
+    """
+    solana-py HTTP provider that sends its requests through an RpcGateway
+    instead of opening a new connection per request.
+    """
+
+    def __init__(self, gateway):
+        super().__init__(gateway.rpc_url)
+        self.gateway = gateway
+
+    def make_request_unparsed(self, body):
+        request_kwargs = self._before_request(body=body)
+        request = json.loads(request_kwargs['content'])
+        return self.gateway.request(request_kwargs, request['method'], request.get('params', []),
+                                    request.get('id')).text
+
+    def make_batch_request_unparsed(self, reqs):
+        return self.gateway.send(self._before_batch_request(reqs),
+                                 _batch_label(_method_name(body) for body in reqs)).text
+
+    def is_connected(self):
+        try:
+            response = self.gateway.session.get(str(self.health_uri))
+            response.raise_for_status()
+        except (IOError, httpx.HTTPError) as e:
+            logging.error(f"Health check failed with error: {e}")
+            return False
+        return response.status_code == httpx.codes.OK
+
+
+def _replay(body, request_id):
+    """Response for a cached or shared JSON-RPC response body, with the caller's request id."""
+    return httpx.Response(200, json=dict(body, id=request_id))
+
+
+def _commitment_ttl(params):
+    """Freshness of a cached response, from the commitment in the request's config object."""
+    config = params[-1] if params and isinstance(params[-1], dict) else {}
+    return COMMITMENT_TTLS.get(config.get('commitment'), COMMITMENT_TTLS['finalized'])
+
+
+def _method_name(body):
+    """JSON-RPC method of a solders request object (GetBalance -> getBalance)."""
+    name = type(body).__name__
+    return name[:1].lower() + name[1:]
+
+
+def _batch_label(methods):
+    """Metrics label of a batch request: 'batch:<method>', or 'batch:mixed'."""
+    methods = set(methods)
+    return f"batch:{methods.pop()}" if len(methods) == 1 else 'batch:mixed'
+
+
+_gateways = {}  # rpc_url -> RpcGateway
+_gateways_lock = threading.Lock()
+
+
+def get_gateway(network=DEFAULT_NETWORK, rpc_url=None):
+    """
+    Get the shared gateway of a network (or of an explicit endpoint), creating it
+    on first use.
+
+    Args:
+        network (str): Key of config.SOLANA_NETWORKS
+        rpc_url (str, optional): Endpoint to use instead of the network's
+
+    Returns:
+        RpcGateway: The gateway
+    """
+    rpc_url = rpc_url or SOLANA_NETWORKS[network]['rpc_url']
+    with _gateways_lock:
+        gateway = _gateways.get(rpc_url)
+        if gateway is None:
+            gateway = RpcGateway(rpc_url)
+            _gateways[rpc_url] = gateway
+        return gateway
+
+
+def gateway_metrics():
+    """
+    Returns:
+        dict: Endpoint -> per-method metrics of every gateway created so far
+    """
+    with _gateways_lock:
+        gateways = list(_gateways.values())
+    return {gateway.rpc_url: gateway.metrics() for gateway in gateways}
@@ -0,0 +1,263 @@
+"""
+This module implements the event scheduler that drives the trading loop.
+
+Instead of re-running the whole pipeline every second, work is attached to the
+events that invalidate it:
+- Candle-close events fire once per interval boundary and only refresh that interval
+- Price ticks fire on a short cadence (or whenever a price feed posts one)
+- Low-priority jobs such as chart rendering run on their own slow cadence in a
+  background worker, so they never delay the trading jobs
+
+Between events the scheduler thread blocks on a threading.Event, so an idle bot
+uses essentially no CPU.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import INTERVAL_SECONDS
+
+# Job priorities (lower runs first when several jobs are due at the same time)
+PRIORITY_HIGH = 0  # Price ticks, stop-loss/take-profit checks
+PRIORITY_NORMAL = 1  # Candle-close signal updates
+PRIORITY_LOW = 2  # Charts and other housekeeping, run in the background worker
+
+# Delay after a candle boundary before the closed candle is requested, so the
+# data source has published it
+CANDLE_CLOSE_DELAY = 1.0
+
+
+class Job:
+    """
+    A scheduled callback.
+    """
+
+    def __init__(self, name, callback, priority=PRIORITY_NORMAL, period=None, next_run=None):
+        """
+        Args:
+            name (str): Job name, used in logs
+            callback (callable): Function to call when the job is due
+            priority (int): Job priority
+            period (callable, optional): Function returning the next run time given the
+                current time; None for a one-off job
+            next_run (float, optional): UNIX time of the first run
+        """
+        self.name = name
+        self.callback = callback
+        self.priority = priority
+        self.period = period
+        self.next_run = next_run
+        self.cancelled = False
+
+    def cancel(self):
+        """Stop the job from running again."""
+        self.cancelled = True
+
+
+def next_candle_boundary(interval, now=None, delay=CANDLE_CLOSE_DELAY):
+    """
+    Get the time at which the interval's current candle closes, plus `delay`.
+
+    Args:
+        interval (str): Candle interval (e.g. '1m', '1h')
+        now (float, optional): Current UNIX time
+        delay (float): Seconds to wait after the boundary
+
+    Returns:
+        float: UNIX time of the next candle-close event
+    """
+    seconds = INTERVAL_SECONDS[interval]
+    now = time.time() if now is None else now
+    boundary = (now - delay) // seconds * seconds + seconds
+    return boundary + delay
+
+
+class EventScheduler:
+    """
+    Priority-queue scheduler that runs jobs in a single thread and sleeps until
+    the next job is due or a new event is posted.
+    """
+
+    def __init__(self):
+        self._queue = []  # Heap of (next_run, priority, sequence, job)
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        # Low-priority jobs run here; a job that is still running is not started again
+        self._background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='scheduler-low')
+        self._background_running = set()
+
+    def _push(self, job):
+        with self._lock:
+            heapq.heappush(self._queue, (job.next_run, job.priority, next(self._sequence), job))
+        self._wakeup.set()
+
+    def schedule(self, name, callback, priority=PRIORITY_NORMAL, period=None, at=None):
+        """
+        Schedule a job.
+
+        Args:
+            name (str): Job name
+            callback (callable): Function called with no arguments
+            priority (int): Job priority
+            period (callable, optional): Function mapping the current time to the next run time
+            at (float, optional): UNIX time of the first run (defaults to now)
+
+        Returns:
+            Job: The scheduled job
+        """
+        job = Job(name, callback, priority, period, time.time() if at is None else at)
+        self._push(job)
+        return job
+
+    def every(self, name, seconds, callback, priority=PRIORITY_NORMAL, run_now=True):
+        """
+        Run a job at a fixed cadence.
+
+        Args:
+            name (str): Job name
+            seconds (float): Seconds between runs
+            callback (callable): Function called with no arguments
+            priority (int): Job priority
+            run_now (bool): Run the first time immediately instead of after one period
+
+        Returns:
+            Job: The scheduled job
+        """
+        now = time.time()
+        return self.schedule(name, callback, priority, period=lambda t: t + seconds,
+                             at=now if run_now else now + seconds)
+
+    def on_candle_close(self, intervals, callback, priority=PRIORITY_NORMAL, delay=CANDLE_CLOSE_DELAY):
+        """
+        Run a job each time a candle of one of the intervals closes. Intervals whose
+        candles close at the same time (e.g. '1m' and '5m' on a 5-minute boundary)
+        are delivered in a single call.
+
+        Args:
+            intervals (str or list): Candle interval(s)
+            callback (callable): Function called with the list of intervals that closed
+            priority (int): Job priority
+            delay (float): Seconds to wait after each candle boundary
+
+        Returns:
+            Job: The scheduled job
+        """
+        intervals = [intervals] if isinstance(intervals, str) else list(intervals)
+
+        def next_close(now):
+            return min(next_candle_boundary(interval, now, delay) for interval in intervals)
+
+        def fire():
+            boundary = round(job.next_run - delay)
+            callback([interval for interval in intervals
+                      if boundary % INTERVAL_SECONDS[interval] == 0])
+
+        job = Job(f"candle_close_{'_'.join(intervals)}", fire, priority, next_close,
+                  next_close(time.time()))
+        self._push(job)
+        return job
+
+    def post(self, name, callback, priority=PRIORITY_HIGH):
+        """
+        Run a one-off job as soon as possible, e.g. for a price update pushed by a
+        feed. Safe to call from any thread.
+
+        Returns:
+            Job: The scheduled job
+        """
+        return self.schedule(name, callback, priority)
+
+    def _pop_due(self, now):
+        """
+        Pop the next due job.
+
+        Returns:
+            tuple: (job or None, seconds until the next job or None if the queue is empty)
+        """
+        with self._lock:
+            while self._queue:
+                next_run, _, _, job = self._queue[0]
+                if job.cancelled:
+                    heapq.heappop(self._queue)
+                    continue
+                if next_run > now:
+                    return None, next_run - now
+                heapq.heappop(self._queue)
+                return job, 0
+            return None, None
+
+    def _execute(self, job):
+        """Run a job and log any error so one failure cannot stop the loop."""
+        try:
+            job.callback()
+        except Exception as e:
+            logging.error(f"Error in scheduled job {job.name}: {e}")
+
+    def _run_background(self, job):
+        try:
+            self._execute(job)
+        finally:
+            with self._lock:
+                self._background_running.discard(job.name)
+
+    def _dispatch(self, job):
+        if job.priority >= PRIORITY_LOW:
+            with self._lock:
+                if job.name in self._background_running:
+                    logging.debug(f"Skipping {job.name}: previous run still in progress")
+                    return
+                self._background_running.add(job.name)
+            self._background.submit(self._run_background, job)
+        else:
+            self._execute(job)
+
+    def run(self):
+        """
+        Run jobs until stop() is called. Blocks the calling thread.
+        """
+        logging.info("Event scheduler started")
+        while not self._stopped.is_set():
+            self._wakeup.clear()
+            job, wait = self._pop_due(time.time())
+            if job is None:
+                # Sleep until the next job is due or a new job is scheduled
+                self._wakeup.wait(wait)
+                continue
+
+            self._dispatch(job)
+            if job.period is not None and not job.cancelled:
+                job.next_run = job.period(max(time.time(), job.next_run))
+                self._push(job)
+        logging.info("Event scheduler stopped")
+
+    def start(self):
+        """
+        Run the scheduler in a daemon thread.
+
+        Returns:
+            threading.Thread: The scheduler thread
+        """
+        self._thread = threading.Thread(target=self.run, name='event-scheduler', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=None):
+        """
+        Stop the scheduler and wait for the running job to finish. A stopped
+        scheduler cannot be restarted.
+
+        Args:
+            timeout (float, optional): Seconds to wait for the scheduler thread
+        """
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._background.shutdown(wait=False)
@@ -0,0 +1,23 @@
+// Subscribe to the server-sent live updates (see live_updates.py).
+// `handlers` maps a topic ('status', 'signals', 'order_book', 'open_orders') to a
+// function called with the topic's complete state after every update. The server
+// sends the full state on connect and only the changed keys afterwards; the
+// browser reconnects by itself and then receives the full state again.
+function subscribeLiveUpdates(handlers) {
+    const state = {};
+    const source = new EventSource('/api/stream');
+
+    Object.keys(handlers).forEach(topic => {
+        source.addEventListener(topic, event => {
+            const message = JSON.parse(event.data);
+            const current = message.full ? {} : (state[topic] || {});
+            Object.assign(current, message.changed);
+            message.removed.forEach(key => delete current[key]);
+            state[topic] = current;
+            handlers[topic](current);
+        });
+    });
+
+    source.onerror = () => console.warn('Live updates disconnected, reconnecting...');
+    return source;
+}
@@ -6,7 +6,16 @@ signals based on a combination of multiple indicators with weighted importance.
 
 import pandas as pd
 import numpy as np
-import ta
+
+import kernels
+from compact_candles import as_frame
+
+# Weights of the sub-signals combined by generate_signal:
+# SMA crossover, RSI, MACD crossover, Bollinger Bands, Stochastic, Volume
+SIGNAL_WEIGHTS = [0.3, 0.2, 0.2, 0.15, 0.1, 0.05]
+# Weighted signal above BUY_THRESHOLD is a buy, below SELL_THRESHOLD a sell
+BUY_THRESHOLD = 0.3
+SELL_THRESHOLD = -0.3
 
 def calculate_additional_indicators(df):
     """
@@ -15,36 +24,41 @@ def calculate_additional_indicators(df):
     in the trading strategy.
 
     Args:
-        df (pandas.DataFrame): DataFrame containing OHLCV data
+        df (pandas.DataFrame): DataFrame containing OHLCV data, or CompactCandles
 
     Returns:
         pandas.DataFrame: DataFrame with added technical indicators
     """
+    df = as_frame(df)
+    close = kernels.as_array(df['close'])
+    high = kernels.as_array(df['high'])
+    low = kernels.as_array(df['low'])
+
     # Relative Strength Index (RSI) - Momentum indicator
-    df['rsi'] = ta.momentum.rsi(df['close'], window=14)
+    df['rsi'] = kernels.rsi(close, 14)
     
     # Moving Average Convergence Divergence (MACD)
-    macd = ta.trend.MACD(df['close'])
-    df['macd'] = macd.macd()  # MACD line
-    df['macd_signal'] = macd.macd_signal()  # Signal line
-    df['macd_diff'] = macd.macd_diff()  # MACD histogram
+    macd, macd_signal, macd_diff = kernels.macd(close)
+    df['macd'] = macd  # MACD line
+    df['macd_signal'] = macd_signal  # Signal line
+    df['macd_diff'] = macd_diff  # MACD histogram
     
     # Bollinger Bands - Volatility indicator
-    bollinger = ta.volatility.BollingerBands(df['close'])
-    df['bb_upper'] = bollinger.bollinger_hband()  # Upper band
-    df['bb_middle'] = bollinger.bollinger_mavg()  # Middle band
-    df['bb_lower'] = bollinger.bollinger_lband()  # Lower band
+    bollinger = kernels.bollinger_bands(close)
+    df['bb_upper'] = bollinger['hband']  # Upper band
+    df['bb_middle'] = bollinger['mavg']  # Middle band
+    df['bb_lower'] = bollinger['lband']  # Lower band
     
     # Stochastic Oscillator - Momentum indicator
-    stoch = ta.momentum.StochasticOscillator(df['high'], df['low'], df['close'])
-    df['stoch_k'] = stoch.stoch()  # %K line
-    df['stoch_d'] = stoch.stoch_signal()  # %D line
+    stoch_k, stoch_d = kernels.stochastic(high, low, close)
+    df['stoch_k'] = stoch_k  # %K line
+    df['stoch_d'] = stoch_d  # %D line
     
     # Average True Range (ATR) - Volatility indicator
-    df['atr'] = ta.volatility.average_true_range(df['high'], df['low'], df['close'])
+    df['atr'] = kernels.atr(high, low, close)
     
     # On-Balance Volume (OBV) - Volume indicator
-    df['obv'] = ta.volume.on_balance_volume(df['close'], df['volume'])
+    df['obv'] = kernels.obv(close, df['volume'])
     
     return df
 
@@ -63,8 +77,13 @@ def generate_signal(df):
     signals = []
     
     # SMA Crossover Strategy
-    sma_fast = df['close'].rolling(window=5).mean()  # 5-period SMA
-    sma_slow = df['close'].rolling(window=20).mean()  # 20-period SMA
+    # Reuse precomputed SMAs (e.g. from features.FeatureCache) when available
+    if 'sma_fast' in df.columns and 'sma_slow' in df.columns:
+        sma_fast = df['sma_fast']
+        sma_slow = df['sma_slow']
+    else:
+        sma_fast = df['close'].rolling(window=5).mean()  # 5-period SMA
+        sma_slow = df['close'].rolling(window=20).mean()  # 20-period SMA
     sma_signal = 1 if sma_fast.iloc[-1] > sma_slow.iloc[-1] and sma_fast.iloc[-2] <= sma_slow.iloc[-2] else \
                 -1 if sma_fast.iloc[-1] < sma_slow.iloc[-1] and sma_fast.iloc[-2] >= sma_slow.iloc[-2] else 0
     signals.append(sma_signal)
@@ -94,14 +113,13 @@ def generate_signal(df):
     signals.append(volume_signal)
     
     # Combine signals using weighted average
-    # Weights can be adjusted based on strategy preference and backtesting results
-    weights = [0.3, 0.2, 0.2, 0.15, 0.1, 0.05]  # SMA, RSI, MACD, BB, Stochastic, Volume
-    weighted_signal = np.average(signals, weights=weights)
+    # Weights can be adjusted based on strategy preference and backtesting results (see backtest.py)
+    weighted_signal = np.average(signals, weights=SIGNAL_WEIGHTS)
     
     # Generate final signal based on weighted average threshold
-    if weighted_signal > 0.3:  # Strong buy signal
+    if weighted_signal > BUY_THRESHOLD:  # Strong buy signal
         return 'buy'
-    elif weighted_signal < -0.3:  # Strong sell signal
+    elif weighted_signal < SELL_THRESHOLD:  # Strong sell signal
         return 'sell'
     return 'hold'  # Neutral signal
 
@@ -0,0 +1,555 @@
+"""
+This module provides incremental (streaming) versions of the technical indicators
+used by the trading bot. Each indicator keeps just enough state to update itself
+from one new candle in O(1) time, instead of recomputing over the whole lookback
+window through `ta` on every tick.
+
+The indicators reproduce the definitions used by the `ta` library (warm-up
+periods, Wilder smoothing, population standard deviation, etc.) so their output
+matches `features.calculate_technical_features` and
+`strategy.calculate_additional_indicators` numerically.
+"""
+
+import math
+from collections import deque
+
+import pandas as pd
+
+from compact_candles import as_frame
+
+NAN = float('nan')
+
+# Feature columns produced by IndicatorEngine, in the order they are emitted.
+# This is the union of the features used by the ML model and by the strategy.
+FEATURE_COLUMNS = [
+    'sma_fast', 'sma_slow', 'rsi', 'macd', 'macd_signal', 'macd_diff',
+    'bb_upper', 'bb_middle', 'bb_lower', 'bb_width', 'bb_pband',
+    'stoch_k', 'stoch_d', 'atr', 'obv'
+]
+
+
+def _divide(numerator, denominator):
+    """
+    Divide two floats with the same semantics as pandas/NumPy (x/0 -> +/-inf, 0/0 -> NaN).
+    """
+    if denominator == 0:
+        if numerator == 0 or math.isnan(numerator):
+            return NAN
+        return math.copysign(math.inf, numerator)
+    return numerator / denominator
+
+
+class RollingWindow:
+    """
+    Fixed-size rolling window that maintains the sum and sum of squares of its values.
+
+    The sums are taken relative to a reference value (the first value seen) to limit
+    floating point cancellation, and are resynchronised from the window contents
+    once per full cycle so rounding errors cannot accumulate over long runs.
+    """
+
+    def __init__(self, window):
+        """
+        Args:
+            window (int): Number of values kept in the window
+        """
+        self.window = window
+        self.values = deque(maxlen=window)
+        self._ref = None
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._updates = 0
+
+    def push(self, value):
+        """
+        Add a value to the window, evicting the oldest one when full.
+
+        Args:
+            value (float): New value
+        """
+        if self._ref is None:
+            self._ref = value
+        if len(self.values) == self.window:
+            old = self.values[0] - self._ref
+            self._sum -= old
+            self._sumsq -= old * old
+        self.values.append(value)
+        delta = value - self._ref
+        self._sum += delta
+        self._sumsq += delta * delta
+
+        self._updates += 1
+        if self._updates >= self.window:
+            self._resync()
+
+    def _resync(self):
+        """Recompute the running sums exactly from the window contents."""
+        self._updates = 0
+        self._ref = self.values[-1]
+        self._sum = 0.0
+        self._sumsq = 0.0
+        for value in self.values:
+            delta = value - self._ref
+            self._sum += delta
+            self._sumsq += delta * delta
+
+    @property
+    def full(self):
+        """bool: True once the window holds `window` values."""
+        return len(self.values) == self.window
+
+    def mean(self):
+        """
+        Returns:
+            float: Mean of the window, or NaN until the window is full
+        """
+        if not self.full:
+            return NAN
+        return self._ref + self._sum / self.window
+
+    def std(self):
+        """
+        Returns:
+            float: Population standard deviation (ddof=0), or NaN until the window is full
+        """
+        if not self.full:
+            return NAN
+        mean_delta = self._sum / self.window
+        variance = self._sumsq / self.window - mean_delta * mean_delta
+        return math.sqrt(variance) if variance > 0 else 0.0
+
+
+class RollingExtremum:
+    """
+    Rolling minimum or maximum over a fixed window using a monotonic deque
+    (amortised O(1) per update).
+    """
+
+    def __init__(self, window, mode='min'):
+        """
+        Args:
+            window (int): Window length
+            mode (str): 'min' or 'max'
+        """
+        if mode not in ('min', 'max'):
+            raise ValueError(f"Invalid mode: {mode}")
+        self.window = window
+        self.mode = mode
+        self._candidates = deque()  # (index, value) pairs
+        self._index = 0
+
+    def push(self, value):
+        """
+        Add a value and return the current extremum.
+
+        Args:
+            value (float): New value
+
+        Returns:
+            float: Window minimum/maximum, or NaN until `window` values were seen
+        """
+        if self.mode == 'min':
+            while self._candidates and self._candidates[-1][1] >= value:
+                self._candidates.pop()
+        else:
+            while self._candidates and self._candidates[-1][1] <= value:
+                self._candidates.pop()
+        self._candidates.append((self._index, value))
+        if self._candidates[0][0] <= self._index - self.window:
+            self._candidates.popleft()
+        self._index += 1
+        if self._index < self.window:
+            return NAN
+        return self._candidates[0][1]
+
+
+class StreamingSMA:
+    """Simple moving average (matches `ta.trend.sma_indicator`)."""
+
+    def __init__(self, window):
+        """
+        Args:
+            window (int): Averaging window
+        """
+        self._window = RollingWindow(window)
+
+    def update(self, value):
+        """
+        Args:
+            value (float): New close price
+
+        Returns:
+            float: Current SMA, NaN during warm-up
+        """
+        self._window.push(value)
+        return self._window.mean()
+
+
+class StreamingEMA:
+    """
+    Exponential moving average with `adjust=False` semantics, as used by `ta`
+    (span-based EMAs for MACD, alpha-based Wilder smoothing for RSI).
+    """
+
+    def __init__(self, span=None, alpha=None, min_periods=None):
+        """
+        Args:
+            span (int, optional): EMA span, alpha = 2 / (span + 1)
+            alpha (float, optional): Smoothing factor, used when span is not given
+            min_periods (int, optional): Observations required before a value is
+                reported (defaults to span)
+        """
+        if span is None and alpha is None:
+            raise ValueError("Either span or alpha must be given")
+        self.alpha = alpha if span is None else 2.0 / (span + 1.0)
+        self.min_periods = min_periods if min_periods is not None else (span or 0)
+        self.value = NAN  # Internal state, available before min_periods is reached
+        self.count = 0
+
+    def update(self, value):
+        """
+        Args:
+            value (float): New observation
+
+        Returns:
+            float: Current EMA, NaN until `min_periods` observations were seen
+        """
+        if self.count == 0:
+            self.value = value
+        else:
+            self.value = (1.0 - self.alpha) * self.value + self.alpha * value
+        self.count += 1
+        return self.value if self.count >= self.min_periods else NAN
+
+
+class StreamingRSI:
+    """Wilder's Relative Strength Index (matches `ta.momentum.rsi`)."""
+
+    def __init__(self, window=14):
+        """
+        Args:
+            window (int): RSI period
+        """
+        self._prev_close = None
+        self._up = StreamingEMA(alpha=1.0 / window, min_periods=window)
+        self._down = StreamingEMA(alpha=1.0 / window, min_periods=window)
+
+    def update(self, close):
+        """
+        Args:
+            close (float): New close price
+
+        Returns:
+            float: Current RSI, NaN during warm-up
+        """
+        diff = 0.0 if self._prev_close is None else close - self._prev_close
+        self._prev_close = close
+        ema_up = self._up.update(diff if diff > 0 else 0.0)
+        ema_down = self._down.update(-diff if diff < 0 else 0.0)
+        if math.isnan(ema_down):
+            return NAN
+        if ema_down == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + ema_up / ema_down)
+
+
+class StreamingMACD:
+    """MACD line, signal line and histogram (matches `ta.trend.MACD`)."""
+
+    def __init__(self, window_slow=26, window_fast=12, window_sign=9):
+        """
+        Args:
+            window_slow (int): Slow EMA span
+            window_fast (int): Fast EMA span
+            window_sign (int): Signal EMA span
+        """
+        self._fast = StreamingEMA(span=window_fast)
+        self._slow = StreamingEMA(span=window_slow)
+        self._signal = StreamingEMA(span=window_sign)
+
+    def update(self, close):
+        """
+        Args:
+            close (float): New close price
+
+        Returns:
+            tuple: (macd, macd_signal, macd_diff), NaN during warm-up
+        """
+        fast = self._fast.update(close)
+        slow = self._slow.update(close)
+        macd = fast - slow
+        if math.isnan(macd):
+            return NAN, NAN, NAN
+        # The signal EMA starts at the first valid MACD value, like pandas' ewm
+        # does when the input series has leading NaNs.
+        signal = self._signal.update(macd)
+        return macd, signal, macd - signal
+
+
+class StreamingBollingerBands:
+    """Bollinger Bands with population standard deviation (matches `ta.volatility.BollingerBands`)."""
+
+    def __init__(self, window=20, window_dev=2):
+        """
+        Args:
+            window (int): Moving average window
+            window_dev (int): Number of standard deviations for the bands
+        """
+        self.window_dev = window_dev
+        self._window = RollingWindow(window)
+
+    def update(self, close):
+        """
+        Args:
+            close (float): New close price
+
+        Returns:
+            tuple: (upper, middle, lower, width, pband), NaN during warm-up
+        """
+        self._window.push(close)
+        middle = self._window.mean()
+        if math.isnan(middle):
+            return NAN, NAN, NAN, NAN, NAN
+        deviation = self.window_dev * self._window.std()
+        upper = middle + deviation
+        lower = middle - deviation
+        width = _divide(upper - lower, middle) * 100
+        pband = (close - lower) / (upper - lower) if upper != lower else NAN
+        return upper, middle, lower, width, pband
+
+
+class StreamingStochastic:
+    """Stochastic oscillator %K and %D (matches `ta.momentum.StochasticOscillator`)."""
+
+    def __init__(self, window=14, smooth_window=3):
+        """
+        Args:
+            window (int): Lookback for the highest high / lowest low
+            smooth_window (int): SMA period applied to %K
+        """
+        self._lowest = RollingExtremum(window, 'min')
+        self._highest = RollingExtremum(window, 'max')
+        self._k_values = deque(maxlen=smooth_window)
+        self._seen = 0
+        self.window = window
+        self.smooth_window = smooth_window
+
+    def update(self, high, low, close):
+        """
+        Args:
+            high (float): Candle high
+            low (float): Candle low
+            close (float): Candle close
+
+        Returns:
+            tuple: (stoch_k, stoch_d), NaN during warm-up
+        """
+        lowest = self._lowest.push(low)
+        highest = self._highest.push(high)
+        self._seen += 1
+        if math.isnan(lowest):
+            return NAN, NAN
+        stoch_k = 100 * _divide(close - lowest, highest - lowest)
+        self._k_values.append(stoch_k)
+        if len(self._k_values) < self.smooth_window:
+            return stoch_k, NAN
+        return stoch_k, sum(self._k_values) / self.smooth_window
+
+
+class StreamingATR:
+    """
+    Average True Range with Wilder smoothing (matches `ta.volatility.average_true_range`,
+    which reports 0.0 rather than NaN during warm-up).
+    """
+
+    def __init__(self, window=14):
+        """
+        Args:
+            window (int): ATR period
+        """
+        self.window = window
+        self._prev_close = None
+        self._warmup_sum = 0.0
+        self._count = 0
+        self.value = 0.0
+
+    def update(self, high, low, close):
+        """
+        Args:
+            high (float): Candle high
+            low (float): Candle low
+            close (float): Candle close
+
+        Returns:
+            float: Current ATR
+        """
+        true_range = high - low
+        if self._prev_close is not None:
+            true_range = max(true_range, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = close
+        self._count += 1
+
+        if self._count < self.window:
+            self._warmup_sum += true_range
+            return 0.0
+        if self._count == self.window:
+            self.value = (self._warmup_sum + true_range) / self.window
+        else:
+            self.value = (self.value * (self.window - 1) + true_range) / float(self.window)
+        return self.value
+
+
+class StreamingOBV:
+    """On-Balance Volume (matches `ta.volume.on_balance_volume`)."""
+
+    def __init__(self):
+        self._prev_close = None
+        self.value = 0.0
+
+    def update(self, close, volume):
+        """
+        Args:
+            close (float): Candle close
+            volume (float): Candle volume
+
+        Returns:
+            float: Current OBV
+        """
+        if self._prev_close is not None and close < self._prev_close:
+            self.value -= volume
+        else:
+            self.value += volume
+        self._prev_close = close
+        return self.value
+
+
+def candle_timestamps(df):
+    """
+    Return the candle timestamps of a market data frame, which carries them either
+    as the index (DataManager) or as a 'timestamp' column (CSV/Binance data).
+    """
+    if 'timestamp' in df.columns:
+        return pd.DatetimeIndex(pd.to_datetime(df['timestamp']))
+    return pd.DatetimeIndex(df.index)
+
+
+class IndicatorEngine:
+    """
+    Incremental indicator engine for a single symbol/interval.
+
+    Holds one streaming indicator per feature and updates all of them from one
+    new candle at a time. It produces the union of the features computed by
+    `features.calculate_technical_features` and
+    `strategy.calculate_additional_indicators` (see FEATURE_COLUMNS).
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Discard all indicator state."""
+        self._sma_fast = StreamingSMA(5)
+        self._sma_slow = StreamingSMA(20)
+        self._rsi = StreamingRSI(14)
+        self._macd = StreamingMACD()
+        self._bollinger = StreamingBollingerBands()
+        self._stochastic = StreamingStochastic()
+        self._atr = StreamingATR()
+        self._obv = StreamingOBV()
+        self.last_timestamp = None
+        self.latest = None
+
+    def update(self, candle, timestamp=None):
+        """
+        Update every indicator from one new candle.
+
+        Args:
+            candle: Mapping (dict or pd.Series) with 'high', 'low', 'close' and 'volume'
+            timestamp (optional): Timestamp of the candle, used by update_frame to
+                detect which rows are new
+
+        Returns:
+            dict: Latest value of each feature in FEATURE_COLUMNS
+        """
+        high = float(candle['high'])
+        low = float(candle['low'])
+        close = float(candle['close'])
+        volume = float(candle['volume'])
+
+        macd, macd_signal, macd_diff = self._macd.update(close)
+        bb_upper, bb_middle, bb_lower, bb_width, bb_pband = self._bollinger.update(close)
+        stoch_k, stoch_d = self._stochastic.update(high, low, close)
+
+        self.latest = {
+            'sma_fast': self._sma_fast.update(close),
+            'sma_slow': self._sma_slow.update(close),
+            'rsi': self._rsi.update(close),
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'macd_diff': macd_diff,
+            'bb_upper': bb_upper,
+            'bb_middle': bb_middle,
+            'bb_lower': bb_lower,
+            'bb_width': bb_width,
+            'bb_pband': bb_pband,
+            'stoch_k': stoch_k,
+            'stoch_d': stoch_d,
+            'atr': self._atr.update(high, low, close),
+            'obv': self._obv.update(close, volume),
+        }
+        if timestamp is not None:
+            self.last_timestamp = timestamp
+        return self.latest
+
+    def update_frame(self, df):
+        """
+        Feed only the candles of `df` that the engine has not seen yet.
+
+        If the frame does not continue the candles already consumed (first call,
+        gap, or data source reset), the engine is reset and warmed up on the
+        whole frame.
+
+        Args:
+            df (pd.DataFrame): OHLCV data ordered by time, with the timestamps
+                either as index or in a 'timestamp' column (or CompactCandles)
+
+        Returns:
+            dict: Latest feature values, or None if the frame is empty
+        """
+        df = as_frame(df)
+        if df.empty:
+            return self.latest
+
+        timestamps = candle_timestamps(df)
+        if self.last_timestamp is None or self.last_timestamp not in timestamps:
+            self.reset()
+            start = 0
+        else:
+            start = timestamps.get_loc(self.last_timestamp) + 1
+
+        columns = df[['high', 'low', 'close', 'volume']].to_numpy(dtype=float)
+        for i in range(start, len(df)):
+            high, low, close, volume = columns[i]
+            self.update({'high': high, 'low': low, 'close': close, 'volume': volume},
+                        timestamp=timestamps[i])
+        return self.latest
+
+    def warm_up(self, df):
+        """
+        Reset the engine and feed every candle of `df`, collecting the feature rows.
+
+        Args:
+            df (pd.DataFrame): OHLCV data ordered by time (or CompactCandles)
+
+        Returns:
+            pd.DataFrame: One row of features per candle, indexed like `df`
+        """
+        df = as_frame(df)
+        self.reset()
+        timestamps = candle_timestamps(df) if not df.empty else []
+        columns = df[['high', 'low', 'close', 'volume']].to_numpy(dtype=float)
+        rows = []
+        for i, (high, low, close, volume) in enumerate(columns):
+            rows.append(self.update({'high': high, 'low': low, 'close': close, 'volume': volume},
+                                    timestamp=timestamps[i]))
+        return pd.DataFrame(rows, columns=FEATURE_COLUMNS, index=df.index)
@@ -1,82 +1,283 @@
 """
 This module implements the training pipeline for the trading model.
 It includes functionality for:
-- Fetching historical market data from Binance
+- Fetching historical market data from Binance, incrementally synced into the candle store
 - Calculating technical indicators as features
 - Creating target variables for classification
 - Training and evaluating a Random Forest model
-- Saving the trained model and scaler for later use
+- Publishing the trained model, scaler and a compiled NumPy export as a new
+  version in the model registry
 """
 
 import pandas as pd
 import numpy as np
 from binance.client import Client
-from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import classification_report, accuracy_score
-import joblib
+from sklearn.metrics import classification_report, accuracy_score, balanced_accuracy_score, f1_score
+import argparse
+import hashlib
+import os
 import time
+import json
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from binance.helpers import date_to_milliseconds
 
 # Import configuration and feature calculation functions
 from config import API_KEY, API_SECRET 
 from features import calculate_technical_features
+from candle_store import CandleStore
+from compiled_model import COMPILED_MODEL_FILENAME
+from model_registry import ModelRegistry
 
 # --- Configuration Parameters ---
 SYMBOL = 'BTCUSDT'  # Trading pair to analyze
 INTERVAL = Client.KLINE_INTERVAL_1HOUR  # Using 1-hour interval for more substantial data
 DATA_START_STRING = "2 years ago UTC"  # Historical data start time
-MODEL_FILENAME = 'trading_model.joblib'  # Output file for trained model
-SCALER_FILENAME = 'scaler.joblib'  # Output file for feature scaler
+MODEL_REGISTRY_DIR = 'model_registry'  # Versioned model store read by the bot
+CANDLE_STORE_DIR = 'candle_store'  # Persistent candle store shared with DataManager
 TARGET_SHIFT_PERIODS = 1  # Number of periods ahead to predict
 PRICE_CHANGE_THRESHOLD = 0.005  # 0.5% price change threshold for buy/sell signals
 
-# Initialize Binance client
-client = Client(API_KEY, API_SECRET)
+KLINE_PAGE_SIZE = 1000  # Klines converted to typed arrays at a time while streaming
 
-def get_historical_data(symbol, interval, start_str):
+# --- Walk-forward training ---
+FEATURE_CACHE_DIR = 'feature_cache'  # Cached feature matrices, reused across folds and runs
+WALK_FORWARD_RESULTS_DIR = 'walk_forward_results'  # Per-fold metrics output
+HORIZON_RESULTS_DIR = 'horizon_results'  # Per-horizon metrics output
+WALK_FORWARD_TRAIN_SIZE = 2000  # Candles in each training window
+WALK_FORWARD_TEST_SIZE = 500  # Candles in each test window
+N_ESTIMATORS = 100  # Trees in the random forest
+LABELS = [-1, 0, 1]  # Sell, hold, buy
+
+# Binance client, created on first use so importing this module needs no network access
+client = None
+
+def get_client():
+    """
+    Get the shared Binance client, creating it on first use.
+    
+    Returns:
+        Client: Binance API client
+    """
+    global client
+    if client is None:
+        client = Client(API_KEY, API_SECRET)
+    return client
+
+
+class RecordedKlineClient:
+    """
+    Offline stand-in for the Binance client that replays klines from a recorded
+    JSON fixture (a list of klines in the Binance REST format).
+    
+    It implements the get_historical_klines_generator method used by this module,
+    so the sync logic can be exercised without network access.
+    """
+    
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Path of the JSON fixture file
+        """
+        with open(path) as f:
+            self.klines = json.load(f)
+        self.requests = []  # (symbol, interval, start_ms) of every request, for inspection
+    
+    def get_historical_klines_generator(self, symbol, interval, start_str=None, end_str=None):
+        """
+        Yield the recorded klines opened at or after `start_str`.
+        """
+        start_ms = _to_milliseconds(start_str) if start_str is not None else 0
+        end_ms = _to_milliseconds(end_str) if end_str is not None else None
+        self.requests.append((symbol, interval, start_ms))
+        for kline in self.klines:
+            if kline[0] >= start_ms and (end_ms is None or kline[0] <= end_ms):
+                yield kline
+
+
+def record_klines(path, symbol, interval, start_str, end_str=None):
+    """
+    Record klines from the Binance API to a JSON fixture for RecordedKlineClient.
+    
+    Args:
+        path (str): Output file path
+        symbol (str): Trading pair symbol
+        interval (str): Candlestick interval
+        start_str (str): Start time of the recording
+        end_str (str, optional): End time of the recording
+    """
+    klines = list(get_client().get_historical_klines_generator(symbol, interval, start_str, end_str))
+    with open(path, 'w') as f:
+        json.dump(klines, f)
+
+
+def _to_milliseconds(value):
+    """Convert a Binance date string (e.g. '2 years ago UTC') or epoch ms to epoch ms."""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return date_to_milliseconds(value)
+
+
+def _kline_pages(kline_client, symbol, interval, start, page_size=KLINE_PAGE_SIZE, closed_only=False,
+                 end=None):
+    """
+    Stream klines from the API and convert each page straight into typed arrays.
+    
+    Args:
+        kline_client: Binance client (or RecordedKlineClient)
+        symbol (str): Trading pair symbol
+        interval (str): Candlestick interval
+        start (str or int): Start time (Binance date string or epoch ms)
+        page_size (int): Klines per page
+        closed_only (bool): Drop klines whose candle has not closed yet
+        end (int, optional): Open time (epoch ms) of the last kline to fetch
+        
+    Yields:
+        dict: 'timestamp' (int64 epoch ms) and float64 OHLCV arrays for one page
+    """
+    klines = kline_client.get_historical_klines_generator(symbol, interval, start, end)
+    now_ms = int(time.time() * 1000)
+    while True:
+        page = list(itertools.islice(klines, page_size))
+        if not page:
+            return
+        columns = list(zip(*page))
+        arrays = {'timestamp': np.array(columns[0], dtype=np.int64)}
+        for position, name in enumerate(['open', 'high', 'low', 'close', 'volume'], start=1):
+            arrays[name] = np.array(columns[position], dtype=np.float64)
+        
+        valid = ~np.isnan(np.column_stack([arrays[name] for name in arrays if name != 'timestamp'])).any(axis=1)
+        if closed_only:
+            valid &= np.array(columns[6], dtype=np.int64) < now_ms
+        if not valid.all():
+            arrays = {name: values[valid] for name, values in arrays.items()}
+        yield arrays
+
+
+def sync_historical_data(symbol, interval, start_str, store, kline_client=None, page_size=KLINE_PAGE_SIZE):
+    """
+    Bring the candle store up to date by fetching only the candles after the last stored one.
+    
+    Each page of klines is converted to typed arrays and appended to the store as
+    it streams in, so the full history is never held in memory as Python lists.
+    Only closed candles are stored. If `start_str` is before the first stored
+    candle (e.g. the store was seeded from a CSV of recent candles), the older
+    range is backfilled first.
+    
+    Args:
+        symbol (str): Trading pair symbol
+        interval (str): Candlestick interval
+        start_str (str): Start time of the history the store should hold
+        store (CandleStore): Candle store to update
+        kline_client (optional): Binance client or RecordedKlineClient (defaults to get_client())
+        page_size (int): Klines converted and appended per page
+        
+    Returns:
+        int: Number of candles added to the store
+    """
+    kline_client = kline_client or get_client()
+    added = 0
+
+    first_timestamp = store.first_timestamp(symbol, interval)
+    if first_timestamp is not None and _to_milliseconds(start_str) < first_timestamp:
+        print(f"Backfilling {symbol} {interval} from {start_str} to {pd.to_datetime(first_timestamp, unit='ms')}")
+        # The older range is prepended in one rewrite of the store
+        pages = list(_kline_pages(kline_client, symbol, interval, start_str, page_size,
+                                  closed_only=True, end=first_timestamp - 1))
+        if pages:
+            added += store.prepend(symbol, interval, {
+                name: np.concatenate([page[name] for page in pages]) for name in pages[0]
+            })
+
+    last_timestamp = store.last_timestamp(symbol, interval)
+    start = start_str if last_timestamp is None else last_timestamp + 1
+    print(f"Syncing {symbol} {interval} from {start_str if last_timestamp is None else pd.to_datetime(start, unit='ms')}")
+    
+    for page in _kline_pages(kline_client, symbol, interval, start, page_size, closed_only=True):
+        added += store.append(symbol, interval, page)
+    return added
+
+
+def get_historical_data(symbol, interval, start_str, store=None, kline_client=None):
     """
     Fetches historical klines (candlestick data) from Binance.
     
-    This function uses a generator to efficiently fetch large amounts of historical data
-    and converts it into a pandas DataFrame with proper data types.
+    With a candle store, only the candles missing since the last stored one are
+    downloaded (see sync_historical_data) and the requested range is read back
+    from the store. Without one, the full range is streamed page by page into
+    typed arrays.
     
     Args:
         symbol (str): Trading pair symbol (e.g., 'BTCUSDT')
         interval (str): Candlestick interval (e.g., '1h', '4h', '1d')
         start_str (str): Start time for historical data
+        store (CandleStore, optional): Candle store to sync and read from
+        kline_client (optional): Binance client or RecordedKlineClient (defaults to get_client())
         
     Returns:
         pd.DataFrame: DataFrame containing OHLCV data with proper data types
     """
     print(f"Fetching historical data for {symbol} from {start_str} with interval {interval}")
-    klines_generator = client.get_historical_klines_generator(symbol, interval, start_str)
-    all_klines = list(klines_generator) 
+    
+    if store is not None:
+        added = sync_historical_data(symbol, interval, start_str, store, kline_client)
+        print(f"Stored {added} new candles for {symbol} {interval}")
+        df = store.read(symbol, interval, start=_to_milliseconds(start_str))
+    else:
+        pages = list(_kline_pages(kline_client or get_client(), symbol, interval, start_str))
+        if not pages:
+            df = pd.DataFrame()
+        else:
+            df = pd.DataFrame({name: np.concatenate([page[name] for page in pages]) for name in pages[0]})
+            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
 
-    if not all_klines:
+    if df.empty:
         print(f"No kline data returned for {symbol} with start_str {start_str} and interval {interval}.")
         return pd.DataFrame()
+        
+    return df[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
+
 
-    # Convert API response to DataFrame
-    df = pd.DataFrame(all_klines, columns=[
-        'timestamp', 'open', 'high', 'low', 'close', 'volume',
-        'close_time', 'quote_asset_volume', 'number_of_trades',
-        'taker_buy_base_volume', 'taker_buy_quote_volume', 'ignore'
-    ])
+def create_target_matrix(close, pairs):
+    """
+    Create classification labels for many (shift_periods, threshold) pairs at once.
     
-    # Convert timestamp to datetime
-    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    For each pair the label of row i is:
+    - 1 (Buy): If the price rises by more than threshold in shift_periods rows
+    - -1 (Sell): If the price falls by more than threshold in shift_periods rows
+    - 0 (Hold): Otherwise
     
-    # Convert numeric columns
-    cols_to_numeric = ['open', 'high', 'low', 'close', 'volume']
-    for col in cols_to_numeric:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-    # Remove rows with missing values
-    df.dropna(subset=['open', 'high', 'low', 'close', 'volume'], inplace=True)
+    The forward return of each distinct horizon is computed once and every
+    pair is then labelled with one vectorized comparison, without touching
+    the feature frame.
+    
+    Args:
+        close (array-like): Closing prices ordered by time
+        pairs (list): (shift_periods, threshold) tuples
         
-    return df[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
-
+    Returns:
+        tuple: (labels, valid) arrays of shape (n_rows, n_pairs); labels are int8
+        and valid is False for rows whose future price is not known yet (their
+        label is 0)
+    """
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    shifts = np.array([shift for shift, _ in pairs], dtype=np.int64)
+    thresholds = np.array([threshold for _, threshold in pairs], dtype=np.float64)
+    
+    # Forward return of each distinct horizon, NaN where the future is unknown
+    horizons, horizon_index = np.unique(shifts, return_inverse=True)
+    returns = np.full((n, len(horizons)), np.nan)
+    for column, shift in enumerate(horizons):
+        if 0 < shift < n:
+            returns[:n - shift, column] = (close[shift:] - close[:n - shift]) / close[:n - shift]
+    
+    pair_returns = returns[:, horizon_index]
+    valid = ~np.isnan(pair_returns)
+    labels = (pair_returns > thresholds).astype(np.int8) - (pair_returns < -thresholds).astype(np.int8)
+    return labels, valid
 
 def create_target_variable(df, shift_periods=1, price_change_threshold=0.005):
     """
@@ -85,31 +286,463 @@ def create_target_variable(df, shift_periods=1, price_change_threshold=0.005):
     The target variable is defined as:
     - 1 (Buy): If price increases by threshold% in N periods
     - -1 (Sell): If price decreases by threshold% in N periods
-    - 0 (Hold): If price change is within threshold%
+    - 0 (Hold): If price change is within threshold%, or the future price is
+      not known yet (the last N rows)
     
     Args:
-        df (pd.DataFrame): DataFrame with OHLCV data
+        df (pd.DataFrame): DataFrame with OHLCV data; the target column is added in place
         shift_periods (int): Number of periods to look ahead
         price_change_threshold (float): Minimum price change to trigger buy/sell signal
         
     Returns:
         pd.DataFrame: DataFrame with added target variable
     """
-    # Calculate future closing price
-    df['future_close'] = df['close'].shift(-shift_periods)
+    labels, _ = create_target_matrix(df['close'].to_numpy(), [(shift_periods, price_change_threshold)])
+    df['target'] = labels[:, 0]
+    return df
+
+def flatten_forest(model, scaler, feature_names):
+    """
+    Flatten a fitted RandomForestClassifier and StandardScaler into NumPy arrays
+    for compiled_model.CompiledForest and CompiledScaler.
     
-    # Calculate percentage change
-    df['price_change_pct'] = (df['future_close'] - df['close']) / df['close']
+    Args:
+        model (RandomForestClassifier): Trained model
+        scaler (StandardScaler): Fitted feature scaler
+        feature_names (list): Feature columns in training order
+        
+    Returns:
+        dict: Array name -> np.ndarray (see compiled_model.COMPILED_ARRAYS)
+    """
+    roots, features, thresholds, lefts, rights, values = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        
+        # Leaves loop back to themselves so traversal can run a fixed number of steps
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+        
+        # Normalize node class weights to probabilities, as predict_proba does
+        value = tree.value[:, 0, :]
+        totals = value.sum(axis=1, keepdims=True)
+        values.append(value / np.where(totals == 0, 1, totals))
+        
+        roots.append(offset)
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+    
+    n_features = len(feature_names)
+    mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(n_features)
+    scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+    # Node indices are stored as int64 so memory-mapped arrays are used without conversion
+    return {
+        'roots': np.array(roots, dtype=np.int64),
+        'feature': np.concatenate(features).astype(np.int64),
+        'threshold': np.concatenate(thresholds).astype(np.float64),
+        'left': np.concatenate(lefts).astype(np.int64),
+        'right': np.concatenate(rights).astype(np.int64),
+        'value': np.concatenate(values).astype(np.float64),
+        'classes': np.asarray(model.classes_),
+        'max_depth': np.array(max_depth),
+        'scaler_mean': np.asarray(mean, dtype=np.float64),
+        'scaler_scale': np.asarray(scale, dtype=np.float64),
+        'feature_names': np.array(feature_names, dtype=str),
+    }
 
-    # Define target variable
-    df['target'] = 0  # Default to hold
-    df.loc[df['price_change_pct'] > price_change_threshold, 'target'] = 1  # Buy signal
-    df.loc[df['price_change_pct'] < -price_change_threshold, 'target'] = -1  # Sell signal
+def export_compiled_model(model, scaler, feature_names, path=COMPILED_MODEL_FILENAME):
+    """
+    Write the flattened model and scaler to a .npz file for compiled_model.
     
-    # Clean up intermediate columns
-    df.drop(columns=['future_close', 'price_change_pct'], inplace=True)
-    return df
+    Args:
+        model (RandomForestClassifier): Trained model
+        scaler (StandardScaler): Fitted feature scaler
+        feature_names (list): Feature columns in training order
+        path (str): Output .npz file
+        
+    Returns:
+        str: Path of the written file
+    """
+    np.savez(path, **flatten_forest(model, scaler, feature_names))
+    return path
+
+def build_feature_matrix(df_raw, shift_periods=TARGET_SHIFT_PERIODS,
+                         price_change_threshold=PRICE_CHANGE_THRESHOLD, cache_dir=FEATURE_CACHE_DIR):
+    """
+    Build the feature matrix and labels for a candle range, or load them from the cache.
+    
+    The matrices are cached on disk as .npy files keyed by a hash of the candles
+    and the target parameters, so walk-forward folds (and repeated experiments
+    on the same data) compute the indicators only once.
+    
+    Args:
+        df_raw (pd.DataFrame): OHLCV data ordered by time
+        shift_periods (int): Number of periods to look ahead for the target
+        price_change_threshold (float): Minimum price change for a buy/sell label
+        cache_dir (str): Feature cache directory
+        
+    Returns:
+        tuple: (directory of the cached matrices, list of feature columns)
+    """
+    ohlcv = df_raw[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=np.float64)
+    timestamps = pd.to_datetime(df_raw['timestamp']).to_numpy(dtype='datetime64[ms]').astype(np.int64)
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(ohlcv).tobytes())
+    digest.update(timestamps.tobytes())
+    digest.update(f'{shift_periods}:{price_change_threshold}'.encode())
+    path = os.path.join(cache_dir, digest.hexdigest()[:16])
+    
+    columns_path = os.path.join(path, 'columns.json')
+    if os.path.exists(columns_path):
+        with open(columns_path) as f:
+            return path, json.load(f)
+    
+    df_features = calculate_technical_features(df_raw.copy())
+    df_processed = create_target_variable(df_features, shift_periods, price_change_threshold)
+    
+    # The last rows have no future price to label them with
+    df_processed = df_processed.iloc[:len(df_processed) - shift_periods]
+    df_processed = df_processed.dropna()
+    feature_columns = [col for col in df_processed.columns if col not in 
+                      ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'target']]
+    
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    os.makedirs(tmp_path, exist_ok=True)
+    np.save(os.path.join(tmp_path, 'X.npy'), df_processed[feature_columns].to_numpy(dtype=np.float64))
+    np.save(os.path.join(tmp_path, 'y.npy'), df_processed['target'].to_numpy(dtype=np.int8))
+    np.save(os.path.join(tmp_path, 'timestamp.npy'),
+            pd.to_datetime(df_processed['timestamp']).to_numpy(dtype='datetime64[ms]').astype(np.int64))
+    with open(os.path.join(tmp_path, 'columns.json'), 'w') as f:
+        json.dump(feature_columns, f)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # Another process cached the same matrix first
+        for name in os.listdir(tmp_path):
+            os.remove(os.path.join(tmp_path, name))
+        os.rmdir(tmp_path)
+    return path, feature_columns
+
+def load_feature_matrix(path, mmap_mode='r'):
+    """
+    Load a cached feature matrix written by build_feature_matrix.
+    
+    Returns:
+        tuple: (X, y, timestamps) arrays, memory-mapped by default
+    """
+    return tuple(np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+                 for name in ('X', 'y', 'timestamp'))
+
+def walk_forward_splits(n_samples, train_size, test_size, step=None, window='rolling', gap=0):
+    """
+    Generate time-ordered train/test folds.
+    
+    Each test window follows its training window; `gap` rows between them are
+    purged so that training labels (which look `gap` periods ahead) never use
+    prices from the test window.
+    
+    Args:
+        n_samples (int): Number of rows
+        train_size (int): Rows in each training window (the first window for 'expanding')
+        test_size (int): Rows in each test window
+        step (int, optional): Rows between consecutive folds (defaults to test_size)
+        window (str): 'rolling' for a fixed-size training window, 'expanding' to
+            train on all rows before the test window
+        gap (int): Rows purged between the training and test windows
+        
+    Yields:
+        tuple: (train_start, train_end, test_start, test_end) row indices, end exclusive
+    """
+    if window not in ('rolling', 'expanding'):
+        raise ValueError(f"Unknown window type: {window}")
+    step = step or test_size
+    test_start = train_size + gap
+    while test_start + test_size <= n_samples:
+        train_end = test_start - gap
+        train_start = 0 if window == 'expanding' else train_end - train_size
+        yield train_start, train_end, test_start, test_start + test_size
+        test_start += step
+
+# Feature matrix attached in each walk-forward worker process
+_fold_state = {}
+
+def _init_fold_worker(path):
+    """
+    Process pool initializer: memory-map the cached feature matrix once per worker.
+    """
+    _fold_state['X'], _fold_state['y'], _fold_state['timestamp'] = load_feature_matrix(path)
+
+def _train_fold(fold, train_start, train_end, test_start, test_end, n_estimators=N_ESTIMATORS):
+    """
+    Worker task: train and evaluate one walk-forward fold.
+    
+    Returns:
+        dict: Fold boundaries and test metrics
+    """
+    X, y, timestamps = _fold_state['X'], _fold_state['y'], _fold_state['timestamp']
+    X_train, y_train = X[train_start:train_end], y[train_start:train_end]
+    X_test, y_test = X[test_start:test_end], y[test_start:test_end]
+    
+    start = time.perf_counter()
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    model = RandomForestClassifier(
+        n_estimators=n_estimators,
+        random_state=42,
+        class_weight='balanced',
+        n_jobs=1  # Folds already run in parallel
+    )
+    model.fit(X_train_scaled, y_train)
+    fit_seconds = time.perf_counter() - start
+    
+    y_pred = model.predict(scaler.transform(X_test))
+    f1_per_class = f1_score(y_test, y_pred, labels=LABELS, average=None, zero_division=0)
+    return {
+        'fold': fold,
+        'train_start': pd.to_datetime(timestamps[train_start], unit='ms'),
+        'train_end': pd.to_datetime(timestamps[train_end - 1], unit='ms'),
+        'test_start': pd.to_datetime(timestamps[test_start], unit='ms'),
+        'test_end': pd.to_datetime(timestamps[test_end - 1], unit='ms'),
+        'train_rows': train_end - train_start,
+        'test_rows': test_end - test_start,
+        'accuracy': accuracy_score(y_test, y_pred),
+        'balanced_accuracy': balanced_accuracy_score(y_test, y_pred),
+        'f1_macro': f1_score(y_test, y_pred, labels=LABELS, average='macro', zero_division=0),
+        'f1_sell': f1_per_class[0],
+        'f1_hold': f1_per_class[1],
+        'f1_buy': f1_per_class[2],
+        'fit_seconds': fit_seconds,
+    }
+
+def run_walk_forward(df_raw, train_size=WALK_FORWARD_TRAIN_SIZE, test_size=WALK_FORWARD_TEST_SIZE,
+                     step=None, window='rolling', workers=None, n_estimators=N_ESTIMATORS,
+                     shift_periods=TARGET_SHIFT_PERIODS, price_change_threshold=PRICE_CHANGE_THRESHOLD,
+                     cache_dir=FEATURE_CACHE_DIR):
+    """
+    Evaluate the model with walk-forward validation, training the folds in parallel.
+    
+    Args:
+        df_raw (pd.DataFrame): OHLCV data ordered by time
+        train_size (int): Rows in each training window
+        test_size (int): Rows in each test window
+        step (int, optional): Rows between folds (defaults to test_size)
+        window (str): 'rolling' or 'expanding'
+        workers (int, optional): Worker processes (defaults to CPU count)
+        n_estimators (int): Trees per fold model
+        shift_periods (int): Number of periods to look ahead for the target
+        price_change_threshold (float): Minimum price change for a buy/sell label
+        cache_dir (str): Feature cache directory
+        
+    Returns:
+        tuple: (pd.DataFrame of per-fold metrics, feature matrix cache path, feature columns)
+    """
+    path, feature_columns = build_feature_matrix(df_raw, shift_periods, price_change_threshold, cache_dir)
+    X, _, _ = load_feature_matrix(path)
+    folds = list(walk_forward_splits(len(X), train_size, test_size, step, window, gap=shift_periods))
+    if not folds:
+        return pd.DataFrame(), path, feature_columns
+    
+    with ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count(),
+        initializer=_init_fold_worker,
+        initargs=(path,)
+    ) as executor:
+        futures = [executor.submit(_train_fold, fold, *bounds, n_estimators=n_estimators)
+                   for fold, bounds in enumerate(folds)]
+        rows = [future.result() for future in futures]
+    return pd.DataFrame(rows), path, feature_columns
+
+def save_results(results, symbol, interval, results_dir=WALK_FORWARD_RESULTS_DIR):
+    """
+    Write per-fold or per-horizon metrics to a timestamped CSV file.
+    
+    Returns:
+        str: Path of the written file
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    timestamp = time.strftime('%Y%m%d_%H%M%S')
+    path = os.path.join(results_dir, f'{symbol}_{interval}_{timestamp}.csv')
+    results.to_csv(path, index=False)
+    return path
+
+# Feature matrix and label matrix shared with each horizon worker process
+_horizon_state = {}
+
+def _init_horizon_worker(X, labels, valid):
+    """
+    Process pool initializer: receive the feature and label matrices once per worker.
+    """
+    _horizon_state['X'], _horizon_state['labels'], _horizon_state['valid'] = X, labels, valid
 
+def _train_horizon(column, shift_periods, threshold, test_fraction, n_estimators, return_model):
+    """
+    Worker task: train and evaluate the model of one (shift_periods, threshold) pair.
+    
+    Returns:
+        tuple: (metrics dict, (model, scaler) or None)
+    """
+    X = _horizon_state['X']
+    rows = np.flatnonzero(_horizon_state['valid'][:, column] & np.isfinite(X).all(axis=1))
+    y = _horizon_state['labels'][rows, column]
+    
+    # Chronological split, purging training rows whose labels look into the test period
+    split = int(len(rows) * (1 - test_fraction))
+    train, test = slice(0, max(0, split - shift_periods)), slice(split, len(rows))
+    metrics = {
+        'shift_periods': shift_periods,
+        'threshold': threshold,
+        'train_rows': train.stop,
+        'test_rows': len(rows) - split,
+        'buy_ratio': float((y == 1).mean()) if len(y) else np.nan,
+        'sell_ratio': float((y == -1).mean()) if len(y) else np.nan,
+    }
+    if train.stop == 0 or split == len(rows) or len(np.unique(y[train])) < 2:
+        return metrics, None
+    
+    scaler = StandardScaler()
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=42,
+                                   class_weight='balanced', n_jobs=1)
+    model.fit(scaler.fit_transform(X[rows[train]]), y[train])
+    y_pred = model.predict(scaler.transform(X[rows[test]]))
+    metrics.update({
+        'accuracy': accuracy_score(y[test], y_pred),
+        'balanced_accuracy': balanced_accuracy_score(y[test], y_pred),
+        'f1_macro': f1_score(y[test], y_pred, labels=LABELS, average='macro', zero_division=0),
+    })
+    return metrics, (model, scaler) if return_model else None
+
+def train_horizon_models(df_features, pairs, feature_columns=None, test_fraction=0.2,
+                         workers=None, n_estimators=N_ESTIMATORS, return_models=False):
+    """
+    Train one model per (shift_periods, threshold) pair from a single feature
+    matrix and a single label matrix, in parallel.
+    
+    Args:
+        df_features (pd.DataFrame): Candles with technical features, ordered by time
+        pairs (list): (shift_periods, threshold) tuples
+        feature_columns (list, optional): Feature columns (defaults to all non-OHLCV columns)
+        test_fraction (float): Most recent fraction of rows used for testing
+        workers (int, optional): Worker processes (defaults to CPU count)
+        n_estimators (int): Trees per model
+        return_models (bool): Also return the trained models and scalers
+        
+    Returns:
+        pd.DataFrame or tuple: Metrics per pair; with return_models, also a dict
+        mapping each pair to its (model, scaler)
+    """
+    if feature_columns is None:
+        feature_columns = [col for col in df_features.columns if col not in
+                          ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'target']]
+    X = df_features[feature_columns].to_numpy(dtype=np.float64)
+    labels, valid = create_target_matrix(df_features['close'].to_numpy(), pairs)
+    
+    with ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count(),
+        initializer=_init_horizon_worker,
+        initargs=(X, labels, valid)
+    ) as executor:
+        futures = [executor.submit(_train_horizon, column, shift, threshold, test_fraction,
+                                   n_estimators, return_models)
+                   for column, (shift, threshold) in enumerate(pairs)]
+        outputs = [future.result() for future in futures]
+    
+    results = pd.DataFrame([metrics for metrics, _ in outputs])
+    if return_models:
+        return results, {pair: trained for pair, (_, trained) in zip(pairs, outputs)}
+    return results
+
+def horizon_main(args, df_raw):
+    """
+    Horizon sweep mode of main(): train a model for every combination of the
+    requested horizons and thresholds and save their metrics.
+    """
+    pairs = list(itertools.product(args.horizons, args.thresholds))
+    print(f"Training {len(pairs)} horizon/threshold models...")
+    df_features = calculate_technical_features(df_raw.copy())
+    
+    start = time.perf_counter()
+    results = train_horizon_models(df_features, pairs, workers=args.workers)
+    print(f"Trained {len(results)} models in {time.perf_counter() - start:.2f}s")
+    
+    results_path = save_results(results, args.symbol, args.interval, HORIZON_RESULTS_DIR)
+    print(results.to_string(index=False))
+    print(f"Per-horizon metrics saved to {results_path}")
+
+def walk_forward_main(args, df_raw):
+    """
+    Walk-forward mode of main(): evaluate the folds, save their metrics and
+    optionally publish a model trained on the most recent training window.
+    """
+    print(f"Running {args.window} walk-forward validation "
+          f"(train {args.train_size}, test {args.test_size}, step {args.step or args.test_size})...")
+    start = time.perf_counter()
+    results, path, feature_columns = run_walk_forward(
+        df_raw, args.train_size, args.test_size, args.step, args.window, args.workers
+    )
+    if results.empty:
+        print("Not enough data for a single fold. Reduce --train-size/--test-size. Exiting.")
+        return
+    print(f"Trained {len(results)} folds in {time.perf_counter() - start:.2f}s")
+    
+    results_path = save_results(results, args.symbol, args.interval)
+    print(results[['fold', 'test_start', 'test_end', 'accuracy', 'balanced_accuracy', 'f1_macro']].to_string(index=False))
+    print(f"Per-fold metrics saved to {results_path}")
+    
+    if not args.publish:
+        return
+    
+    # Train the deployable model on the most recent training window
+    X, y, _ = load_feature_matrix(path)
+    train_start = 0 if args.window == 'expanding' else max(0, len(X) - args.train_size)
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X[train_start:])
+    model = RandomForestClassifier(n_estimators=N_ESTIMATORS, random_state=42,
+                                   class_weight='balanced', n_jobs=-1)
+    model.fit(X_train_scaled, y[train_start:])
+    
+    metrics = {
+        'validation': f'walk_forward_{args.window}',
+        'folds': int(len(results)),
+        'mean_accuracy': float(results['accuracy'].mean()),
+        'mean_balanced_accuracy': float(results['balanced_accuracy'].mean()),
+        'mean_f1_macro': float(results['f1_macro'].mean()),
+        'train_rows': int(len(X) - train_start),
+        'symbol': args.symbol,
+        'interval': args.interval,
+    }
+    registry = ModelRegistry(MODEL_REGISTRY_DIR)
+    version = registry.publish(
+        model, scaler, feature_columns, metrics,
+        compiled=flatten_forest(model, scaler, feature_columns)
+    )
+    print(f"Model version {version} published and activated.")
+
+def parse_args():
+    """Parse the command line options of the training pipeline."""
+    parser = argparse.ArgumentParser(description='Train the trading model')
+    parser.add_argument('--symbol', default=SYMBOL, help='Trading pair symbol')
+    parser.add_argument('--interval', default=INTERVAL, help='Candle interval')
+    parser.add_argument('--start', default=DATA_START_STRING, help='Historical data start time')
+    parser.add_argument('--walk-forward', action='store_true', help='Evaluate with walk-forward validation')
+    parser.add_argument('--window', choices=['rolling', 'expanding'], default='rolling',
+                        help='Walk-forward training window type')
+    parser.add_argument('--train-size', type=int, default=WALK_FORWARD_TRAIN_SIZE, help='Candles per training window')
+    parser.add_argument('--test-size', type=int, default=WALK_FORWARD_TEST_SIZE, help='Candles per test window')
+    parser.add_argument('--step', type=int, default=None, help='Candles between folds (default: test size)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--publish', action='store_true',
+                        help='Walk-forward mode: publish a model trained on the latest window')
+    parser.add_argument('--horizons', type=lambda value: [int(v) for v in value.split(',')],
+                        help='Comma-separated look-ahead periods to sweep (e.g. 1,3,6,12)')
+    parser.add_argument('--thresholds', type=lambda value: [float(v) for v in value.split(',')],
+                        default=[PRICE_CHANGE_THRESHOLD],
+                        help='Comma-separated price change thresholds for --horizons')
+    return parser.parse_args()
 
 def main():
     """
@@ -121,14 +754,27 @@ def main():
     3. Creating target variables
     4. Preprocessing data
     5. Training and evaluating the model
-    6. Saving the model and scaler
+    6. Publishing the model and scaler
+    
+    With --walk-forward the model is instead evaluated on successive
+    time-ordered folds (see run_walk_forward), and with --horizons one model
+    is trained per look-ahead/threshold pair (see train_horizon_models).
     """
-    print(f"Fetching historical data for {SYMBOL}...")
-    df_raw = get_historical_data(SYMBOL, INTERVAL, DATA_START_STRING)
+    args = parse_args()
+    
+    print(f"Fetching historical data for {args.symbol}...")
+    df_raw = get_historical_data(args.symbol, args.interval, args.start, store=CandleStore(CANDLE_STORE_DIR))
     if df_raw.empty:
         print("No data fetched. Exiting.")
         return
     print(f"Fetched {len(df_raw)} data points.")
+    
+    if args.walk_forward:
+        walk_forward_main(args, df_raw)
+        return
+    if args.horizons:
+        horizon_main(args, df_raw)
+        return
 
     print("Calculating technical features...")
     # Calculate technical indicators
@@ -136,13 +782,15 @@ def main():
 
     print("Creating target variable...")
     # Create target variable for classification
-    df_processed = create_target_variable(df_features.copy(), 
+    df_processed = create_target_variable(df_features, 
                                         shift_periods=TARGET_SHIFT_PERIODS, 
                                         price_change_threshold=PRICE_CHANGE_THRESHOLD)
+    # The last rows have no future price to label them with
+    df_processed = df_processed.iloc[:len(df_processed) - TARGET_SHIFT_PERIODS]
 
     # --- Data Preprocessing ---
     # Remove rows with missing values
-    df_processed.dropna(inplace=True)
+    df_processed = df_processed.dropna()
     if df_processed.empty:
         print("DataFrame is empty after NaN removal. Check data, feature calculation, or target definition. Exiting.")
         return
@@ -162,16 +810,11 @@ def main():
         print("Features (X) or target (y) is empty. This could be due to all data being NaNs or an issue in feature selection. Exiting.")
         return
 
-    # Check if we can use stratified sampling
-    unique_classes, counts = np.unique(y, return_counts=True)
-    can_stratify = len(unique_classes) > 1 and all(c >= 2 for c in counts)
-
-    # Split data into training and test sets
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, 
-        stratify=y if can_stratify else None, 
-        shuffle=True
-    )
+    # Split chronologically: the test set is the most recent 20% of the data, and
+    # the training rows whose labels look into the test period are purged
+    split = int(len(X) * 0.8)
+    X_train, y_train = X.iloc[:max(0, split - TARGET_SHIFT_PERIODS)], y.iloc[:max(0, split - TARGET_SHIFT_PERIODS)]
+    X_test, y_test = X.iloc[split:], y.iloc[split:]
 
     if X_train.empty or y_train.empty:
         print("Training set is empty after split. Check data volume or split ratio. Exiting.")
@@ -239,12 +882,23 @@ def main():
     print("\nFeature Importances:")
     print(feature_importance_df.head(10))
 
-    # Save the trained model and scaler
-    print(f"\nSaving model to {MODEL_FILENAME}...")
-    joblib.dump(model, MODEL_FILENAME)
-    print(f"Saving scaler to {SCALER_FILENAME}...")
-    joblib.dump(scaler, SCALER_FILENAME) 
-    print("Model and scaler saved.")
+    # Publish the trained model and scaler as a new registry version;
+    # running bots switch to it without restarting
+    print(f"\nPublishing model to {MODEL_REGISTRY_DIR}...")
+    metrics = {
+        'train_accuracy': float(accuracy_score(y_train, y_pred_train)),
+        'test_accuracy': float(accuracy_score(y_test, y_pred_test)),
+        'train_rows': int(len(X_train)),
+        'test_rows': int(len(X_test)),
+        'symbol': args.symbol,
+        'interval': args.interval,
+    }
+    registry = ModelRegistry(MODEL_REGISTRY_DIR)
+    version = registry.publish(
+        model, scaler, feature_columns, metrics,
+        compiled=flatten_forest(model, scaler, feature_columns)
+    )
+    print(f"Model version {version} published and activated.")
 
 if __name__ == "__main__":
     main()
@@ -13,6 +13,17 @@ from datetime import datetime
 import webbrowser
 import os
 
+# Indicator columns overlaid on the price panels when present in the data
+# (e.g. frames produced by features.FeatureCache)
+OVERLAY_INDICATORS = ['sma_fast', 'sma_slow', 'bb_upper', 'bb_lower']
+
+def _timestamps(df: pd.DataFrame):
+    """
+    Return the candle timestamps, stored either in a 'timestamp' column or as the
+    index (DataManager frames and CompactCandles).
+    """
+    return df['timestamp'] if 'timestamp' in df.columns else df.index
+
 class MarketVisualizer:
     """
     A class for creating interactive market data visualizations.
@@ -49,7 +60,7 @@ class MarketVisualizer:
         - Lower panel: Volume bars
         
         Args:
-            df (pd.DataFrame): OHLCV data
+            df (pd.DataFrame): OHLCV data (a DataFrame or CompactCandles)
             symbol (str): Trading pair symbol
             interval (str): Time interval
             indicators (Dict, optional): Dictionary of technical indicators to plot
@@ -67,7 +78,7 @@ class MarketVisualizer:
             # Add candlestick chart
             fig.add_trace(
                 go.Candlestick(
-                    x=df['timestamp'],
+                    x=_timestamps(df),
                     open=df['open'],
                     high=df['high'],
                     low=df['low'],
@@ -80,7 +91,7 @@ class MarketVisualizer:
             # Add volume bars
             fig.add_trace(
                 go.Bar(
-                    x=df['timestamp'],
+                    x=_timestamps(df),
                     y=df['volume'],
                     name='Volume'
                 ),
@@ -93,7 +104,7 @@ class MarketVisualizer:
                     if isinstance(data, pd.Series):
                         fig.add_trace(
                             go.Scatter(
-                                x=df['timestamp'],
+                                x=_timestamps(df),
                                 y=data,
                                 name=name,
                                 line=dict(width=1)
@@ -129,10 +140,12 @@ class MarketVisualizer:
         Create a chart showing multiple timeframes for the same symbol.
         
         This method creates a stacked chart with one panel per timeframe,
-        each showing candlestick data and volume.
+        each showing candlestick data and volume, plus the SMA and Bollinger
+        Band lines when the dataframes already contain them.
         
         Args:
-            data_dict (Dict[str, pd.DataFrame]): Dictionary of dataframes for each timeframe
+            data_dict (Dict[str, pd.DataFrame]): Dictionary of dataframes (or CompactCandles)
+                for each timeframe
             symbol (str): Trading pair symbol
             
         Returns:
@@ -150,7 +163,7 @@ class MarketVisualizer:
                 # Add candlestick chart
                 fig.add_trace(
                     go.Candlestick(
-                        x=df['timestamp'],
+                        x=_timestamps(df),
                         open=df['open'],
                         high=df['high'],
                         low=df['low'],
@@ -163,7 +176,7 @@ class MarketVisualizer:
                 # Add volume bars
                 fig.add_trace(
                     go.Bar(
-                        x=df['timestamp'],
+                        x=_timestamps(df),
                         y=df['volume'],
                         name=f'Volume {interval}',
                         showlegend=False
@@ -171,6 +184,19 @@ class MarketVisualizer:
                     row=i, col=1
                 )
 
+                # Overlay precomputed indicators, if the frame carries them
+                for name in OVERLAY_INDICATORS:
+                    if name in df.columns:
+                        fig.add_trace(
+                            go.Scatter(
+                                x=_timestamps(df),
+                                y=df[name],
+                                name=f'{name} {interval}',
+                                line=dict(width=1)
+                            ),
+                            row=i, col=1
+                        )
+
             # Update layout with dark theme
             fig.update_layout(
                 title=f'{symbol} - Multiple Timeframes',
@@ -5,6 +5,12 @@ It includes functionality for:
 - Transaction creation and signing
 - Transaction history tracking
 - Network switching
+
+Transaction history is fetched with JSON-RPC batch requests: one
+getSignaturesForAddress call, then the transactions not seen before in
+batches of RPC_BATCH_SIZE getTransaction calls per HTTP request. Fetched
+transactions are cached per address in transaction_history/<address>.json,
+so a transaction is only ever downloaded once.
 """
 
 from web3 import Web3
@@ -13,27 +19,40 @@ import json
 import logging
 from datetime import datetime
 import os
-from config import SOLANA_NETWORKS, DEFAULT_NETWORK, PROGRAM_IDS
-from solana.rpc.api import Client
-from solana.rpc.commitment import Commitment
+import threading
+from config import SOLANA_NETWORKS, DEFAULT_NETWORK, PROGRAM_IDS, COMMITMENT
+from rpc_gateway import get_gateway
 from solders.transaction import Transaction
 from solders.keypair import Keypair
 from solders.pubkey import Pubkey
 import base58
 
+HISTORY_DIR = 'transaction_history'  # Per-address cache of fetched transactions
+RPC_BATCH_SIZE = 50  # getTransaction calls per JSON-RPC batch request
+
 class WalletManager:
-    def __init__(self):
-        """Initialize the wallet manager with default network settings"""
+    def __init__(self, rpc_url=None, history_dir=HISTORY_DIR):
+        """
+        Initialize the wallet manager with default network settings
+        
+        Args:
+            rpc_url (str, optional): RPC endpoint to use instead of the default
+                network's (e.g. a private node or a local test server)
+            history_dir (str): Directory of the per-address transaction cache
+        """
         self.network = DEFAULT_NETWORK
-        self.web3 = Web3(Web3.HTTPProvider(SOLANA_NETWORKS[DEFAULT_NETWORK]['rpc_url']))
+        self.rpc_url = rpc_url or SOLANA_NETWORKS[DEFAULT_NETWORK]['rpc_url']
+        self.web3 = Web3(Web3.HTTPProvider(self.rpc_url))
         self.connected_wallets = {}
         self.transaction_history = {}
         self.logger = logging.getLogger('WalletManager')
         self.current_network = DEFAULT_NETWORK
-        self.client = Client(SOLANA_NETWORKS[DEFAULT_NETWORK]['rpc_url'])
+        self.gateway = get_gateway(rpc_url=self.rpc_url)  # Connection pool shared with the bot
+        self.client = self.gateway.client()
+        self._history_lock = threading.Lock()  # Guards the transaction cache files
         
         # Create transaction history directory if it doesn't exist
-        self.history_dir = 'transaction_history'
+        self.history_dir = history_dir
         if not os.path.exists(self.history_dir):
             os.makedirs(self.history_dir)
             
@@ -72,16 +91,18 @@ class WalletManager:
             raise ValueError(f"Invalid network: {network}")
             
         self.network = network
-        self.web3 = Web3(Web3.HTTPProvider(SOLANA_NETWORKS[network]['rpc_url']))
+        self.rpc_url = SOLANA_NETWORKS[network]['rpc_url']
+        self.web3 = Web3(Web3.HTTPProvider(self.rpc_url))
         self.current_network = network
-        self.client = Client(SOLANA_NETWORKS[network]['rpc_url'])
+        self.gateway = get_gateway(network)
+        self.client = self.gateway.client()
         
         # Update all connected wallets
         for address in self.connected_wallets:
             try:
                 balance = self.client.get_balance(address)
                 self.connected_wallets[address]['balance'] = balance['result']['value'] / 1e9
-            self.connected_wallets[address]['network'] = network
+                self.connected_wallets[address]['network'] = network
             except Exception as e:
                 logging.error(f"Error updating wallet balance for {address}: {e}")
             
@@ -95,37 +116,94 @@ class WalletManager:
             return 0
             
     def get_transaction_history(self, address, limit=10):
-        """Get transaction history for a wallet"""
+        """
+        Get transaction history for a wallet
+        
+        Only transactions missing from the address's cache are fetched, with
+        batched getTransaction requests.
+        
+        Args:
+            address (str): Wallet address
+            limit (int): Number of most recent transactions
+            
+        Returns:
+            list: Transactions, newest first
+        """
         try:
             # Get recent signatures
-            signatures = self.client.get_signatures_for_address(
-                Pubkey(address),
-                limit=limit
-            )
+            signatures = self.gateway.call('getSignaturesForAddress',
+                                           [address, {'limit': limit, 'commitment': COMMITMENT}])
             
-            transactions = []
-            for sig_info in signatures['result']:
-                # Get transaction details
-                tx = self.client.get_transaction(
-                    sig_info['signature'],
-                    commitment=Commitment("confirmed")
-                )
-                
-                if tx['result']:
-                    transactions.append({
-                        'signature': sig_info['signature'],
-                        'timestamp': sig_info['blockTime'],
-                        'status': 'confirmed',
-                        'fee': tx['result']['meta']['fee'] / 1e9,
-                        'type': self._determine_transaction_type(tx['result'])
-                    })
+            with self._history_lock:
+                cached = self._load_history(address)
+            missing = [sig_info for sig_info in signatures if sig_info['signature'] not in cached]
+            
+            # Fetch outside the lock, so other addresses are not held up by slow RPC calls
+            fetched = {}
+            for start in range(0, len(missing), RPC_BATCH_SIZE):
+                batch = missing[start:start + RPC_BATCH_SIZE]
+                results = self.gateway.batch([
+                    ('getTransaction', [sig_info['signature'], {
+                        'encoding': 'jsonParsed',
+                        'commitment': COMMITMENT,
+                        'maxSupportedTransactionVersion': 0
+                    }])
+                    for sig_info in batch
+                ])
+                for sig_info, tx in zip(batch, results):
+                    # Transactions the node cannot serve yet are retried on the next call
+                    if tx:
+                        fetched[sig_info['signature']] = {
+                            'signature': sig_info['signature'],
+                            'timestamp': sig_info['blockTime'],
+                            'status': 'confirmed',
+                            'fee': tx['meta']['fee'] / 1e9,
+                            'type': self._determine_transaction_type(tx)
+                        }
+            
+            if fetched:
+                with self._history_lock:
+                    # Merge into the file as it is now, which another call may have updated
+                    cached = self._load_history(address)
+                    cached.update(fetched)
+                    self._save_history(address, cached)
                     
-            return transactions
+            return [cached[sig_info['signature']] for sig_info in signatures
+                    if sig_info['signature'] in cached]
             
         except Exception as e:
             logging.error(f"Error getting transaction history for {address}: {e}")
             return []
-            
+    
+    def _history_path(self, address):
+        """Cache file of an address's fetched transactions."""
+        return os.path.join(self.history_dir, f'{address}.json')
+    
+    def _load_history(self, address):
+        """
+        Load the cached transactions of an address.
+        
+        Returns:
+            dict: Signature -> transaction record
+        """
+        path = self._history_path(address)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Error reading transaction cache {path}: {e}")
+            return {}
+    
+    def _save_history(self, address, transactions):
+        """Write the cached transactions of an address atomically."""
+        path = self._history_path(address)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(transactions, f)
+        os.replace(tmp_path, path)
+    
     def _determine_transaction_type(self, tx):
         """Determine the type of transaction"""
         # This is a simplified version - you might want to add more transaction types